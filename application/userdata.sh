@@ -0,0 +1,16 @@
+#!/bin/bash
+# Application server setup: nginx serving HTTP on 8443, the target group and
+# app security group port. Runs at boot (ASG Stack) or at AMI build time
+# (Image Builder Stack).
+set -euo pipefail
+dnf install -y nginx
+cat > /etc/nginx/conf.d/app.conf <<'NGINX'
+server {
+    listen 8443 default_server;
+    root /usr/share/nginx/html;
+}
+NGINX
+cat > /etc/motd <<'MOTD'
+Application server (nginx on port 8443)
+MOTD
+systemctl enable --now nginx
@@ -1,16 +1,59 @@
 #!/usr/bin/env python3
+import dataclasses
 import os
 import aws_cdk as cdk
-from stacks.vpc_stack import VPCStack
-from stacks.pipeline_stack import PipelineStack
-from stacks.alb_stack import ALBStack
+from aws_cdk import aws_ec2 as ec2, aws_elasticloadbalancingv2 as elbv2
+from stacks.vpc_stack import APP_PORT, VPCStack
+from stacks.pipeline_stack import LoadTestProps, PipelineStack
+from stacks.alb_stack import ALBStack, EdgeCacheProps
 from stacks.asg_stack import ASGStack
+from stacks.ecs_stack import EcsStack
+from stacks.environment_profiles import load_profile
 from stacks.rds_stack import RDSStack
+from stacks.cache_stack import CacheStack
+from stacks.image_builder_stack import ImageBuilderStack
+from stacks.observability_stack import ObservabilityStack
 
 app = cdk.App()
 
+# Compute backend for the application: "asg" (EC2 app servers) or "ecs" (containers)
+# cdk deploy -c compute_backend=ecs
+compute_backend = app.node.try_get_context("compute_backend") or "asg"
+if compute_backend not in ("asg", "ecs"):
+    raise ValueError(f"compute_backend must be 'asg' or 'ecs', got {compute_backend!r}")
+
+# Sizing for every stack: dev, staging, prod or a custom profile file
+# cdk deploy -c profile=prod, cdk deploy -c profile=profiles/perf.json
+profile = load_profile(app.node.try_get_context("profile") or "dev")
+# One NAT gateway per AZ (cdk deploy -c nat_per_az=true)
+if str(app.node.try_get_context("nat_per_az")).lower() == "true":
+    profile = dataclasses.replace(profile, egress=dataclasses.replace(profile.egress, nat_per_az=True))
+# AZ count (cdk deploy -c az_count=3)
+if app.node.try_get_context("az_count"):
+    profile = dataclasses.replace(profile, max_azs=int(app.node.try_get_context("az_count")))
+# Graviton build hosts (cdk deploy -c build_arm=true)
+if str(app.node.try_get_context("build_arm")).lower() == "true":
+    profile = dataclasses.replace(profile, build=dataclasses.replace(profile.build, arm=True))
+# CloudFront in front of the ALB with the default cache behaviours (cdk deploy -c edge_cache=true)
+if str(app.node.try_get_context("edge_cache")).lower() == "true" and profile.edge_cache is None:
+    profile = dataclasses.replace(profile, edge_cache=EdgeCacheProps())
+profile.validate(compute_backend)
+# The pipeline synthesizes with the same context, so it deploys what this synth built
+synth_context = {"profile": app.node.try_get_context("profile") or "dev", "compute_backend": compute_backend}
+for key in ("nat_per_az", "az_count", "build_arm", "use_baked_ami", "edge_cache"):
+    if app.node.try_get_context(key) is not None:
+        synth_context[key] = str(app.node.try_get_context(key))
+# Port the ALB forwards to: the container port on ECS, application/userdata.sh otherwise
+app_port = profile.ecs_service.container_port if compute_backend == "ecs" else APP_PORT
+
 # Deploy VPC Stack
 vpc_stack = VPCStack(app, "VPCStack",
+    # With the edge cache, only CloudFront may reach the ALB
+    restrict_alb_to_cloudfront=profile.edge_cache is not None,
+    egress=profile.egress,
+    max_azs=profile.max_azs,
+    subnet_plan=profile.subnet_plan(compute_backend),
+    app_port=app_port,
     env=cdk.Environment(
         account=os.getenv('CDK_DEFAULT_ACCOUNT'),
         region=os.getenv('CDK_DEFAULT_REGION')
@@ -21,27 +64,40 @@ vpc_stack = VPCStack(app, "VPCStack",
 rds_stack = RDSStack(app, "RDSStack",
     vpc=vpc_stack.vpc,
     db_security_group=vpc_stack.db_security_group,
+    instance_type=ec2.InstanceType(profile.database.instance_type),
+    parameter_profile=profile.database.parameter_profile,
+    readers=profile.database.readers,
+    capacity=profile.database.capacity,
+    instrumentation=profile.database.instrumentation,
+    # The app connects through the proxy (export AuroraProxyEndpoint) when the profile has one
+    proxy=profile.database.proxy,
+    app_security_group=vpc_stack.app_security_group,
     env=cdk.Environment(
         account=os.getenv('CDK_DEFAULT_ACCOUNT'),
         region=os.getenv('CDK_DEFAULT_REGION')
     )
 )
 
-# Deploy ALB Stack
-alb_stack = ALBStack(app, "ALBStack",
+# Deploy Cache Stack
+cache_stack = CacheStack(app, "CacheStack",
     vpc=vpc_stack.vpc,
-    alb_sg=vpc_stack.alb_security_group,
+    cache_security_group=vpc_stack.cache_security_group,
+    cache=profile.cache,
     env=cdk.Environment(
         account=os.getenv('CDK_DEFAULT_ACCOUNT'),
         region=os.getenv('CDK_DEFAULT_REGION')
     )
 )
 
-# Deploy ASG Stack
-asg_stack = ASGStack(app, "ASGStack",
+# Deploy ALB Stack
+alb_stack = ALBStack(app, "ALBStack",
     vpc=vpc_stack.vpc,
-    target_group=alb_stack.target_group,
-    app_security_group=vpc_stack.app_security_group,
+    alb_sg=vpc_stack.alb_security_group,
+    # awsvpc tasks register by IP, app servers by instance
+    target_type=elbv2.TargetType.IP if compute_backend == "ecs" else elbv2.TargetType.INSTANCE,
+    target_port=app_port,
+    tuning=profile.alb_tuning,
+    edge_cache=profile.edge_cache,
     env=cdk.Environment(
         account=os.getenv('CDK_DEFAULT_ACCOUNT'),
         region=os.getenv('CDK_DEFAULT_REGION')
@@ -50,11 +106,85 @@ asg_stack = ASGStack(app, "ASGStack",
 
 # Add dependencies
 rds_stack.add_dependency(vpc_stack)
+cache_stack.add_dependency(vpc_stack)
 alb_stack.add_dependency(vpc_stack)
-asg_stack.add_dependency(alb_stack)
 
-# Deploy Pipeline Stack
+if compute_backend == "ecs":
+    # Deploy ECS Stack
+    ecs_stack = EcsStack(app, "EcsStack",
+        vpc=vpc_stack.vpc,
+        target_group=alb_stack.target_group,
+        app_security_group=vpc_stack.app_security_group,
+        service=profile.ecs_service,
+        # Steady state on EC2, bursts on Fargate / Fargate Spot
+        burst=profile.ecs_burst,
+        env=cdk.Environment(
+            account=os.getenv('CDK_DEFAULT_ACCOUNT'),
+            region=os.getenv('CDK_DEFAULT_REGION')
+        )
+    )
+    ecs_stack.add_dependency(alb_stack)
+    compute_stack = ecs_stack
+else:
+    # Deploy Image Builder Stack (opt-in: cdk deploy -c use_baked_ami=true)
+    image_builder_stack = None
+    if str(app.node.try_get_context("use_baked_ami")).lower() == "true":
+        image_builder_stack = ImageBuilderStack(app, "ImageBuilderStack",
+            vpc=vpc_stack.vpc,
+            app_security_group=vpc_stack.app_security_group,
+            env=cdk.Environment(
+                account=os.getenv('CDK_DEFAULT_ACCOUNT'),
+                region=os.getenv('CDK_DEFAULT_REGION')
+            )
+        )
+        image_builder_stack.add_dependency(vpc_stack)
+
+    # Deploy ASG Stack
+    asg_stack = ASGStack(app, "ASGStack",
+        vpc=vpc_stack.vpc,
+        target_group=alb_stack.target_group,
+        app_security_group=vpc_stack.app_security_group,
+        ami_parameter_name=image_builder_stack.ami_parameter_name if image_builder_stack else None,
+        instance_type=ec2.InstanceType(profile.app_instance_type),
+        mixed_instances=profile.app_mixed_instances,
+        launch_options=profile.app_launch_options,
+        scaling=profile.app_scaling,
+        env=cdk.Environment(
+            account=os.getenv('CDK_DEFAULT_ACCOUNT'),
+            region=os.getenv('CDK_DEFAULT_REGION')
+        )
+    )
+    asg_stack.add_dependency(alb_stack)
+    if image_builder_stack:
+        asg_stack.add_dependency(image_builder_stack)
+    compute_stack = asg_stack
+
+# Deploy Observability Stack (dashboard and alarms across all stacks)
+observability_stack = ObservabilityStack(app, "ObservabilityStack",
+    alb=alb_stack.alb,
+    target_group=alb_stack.target_group,
+    aurora_cluster=rds_stack.aurora_cluster,
+    nat_gateway_ids=vpc_stack.nat_gateway_ids,
+    asg=asg_stack.asg if compute_backend == "asg" else None,
+    ecs_service=ecs_stack.service if compute_backend == "ecs" else None,
+    db_max_connections=rds_stack.parameters.max_connections if rds_stack.parameters else None,
+    performance_insights=rds_stack.performance_insights,
+    asg_detailed_monitoring=profile.app_launch_options.detailed_monitoring,
+    env=cdk.Environment(
+        account=os.getenv('CDK_DEFAULT_ACCOUNT'),
+        region=os.getenv('CDK_DEFAULT_REGION')
+    )
+)
+observability_stack.add_dependency(rds_stack)
+observability_stack.add_dependency(compute_stack)
+
+# Deploy Pipeline Stack (deploys every stack above in dependency waves)
 pipeline_stack = PipelineStack(app, "PipelineStack",
+    deploy_stacks=[child for child in app.node.children if isinstance(child, cdk.Stack)],
+    build=profile.build,
+    # Latency-regression gate against the load balancer after every deploy
+    load_test=LoadTestProps(stack_name=alb_stack.stack_name),
+    synth_context=synth_context,
     env=cdk.Environment(
         account=os.getenv('CDK_DEFAULT_ACCOUNT'),
         region=os.getenv('CDK_DEFAULT_REGION')
@@ -0,0 +1,98 @@
+"""
+Fingerprints used by the pipeline to skip work for unchanged infrastructure.
+
+    source-hash PATH...   one hash over the infra sources; an unchanged hash
+                          means the commit touched no infra
+    stack-hashes CDK_OUT  JSON map of stack name to a hash of its synthesized
+                          template, deployment properties and asset hashes
+
+The pipeline compares both against the values it stored in the artifact
+bucket after the last successful deploy (see PipelineStack).
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, Iterator, Sequence
+
+
+# Not inputs to synth
+SKIPPED_DIRS = {"__pycache__", "cdk.out", "tests", ".git", ".venv"}
+SKIPPED_SUFFIXES = (".pyc", ".md")
+
+
+def _source_files(path: str) -> Iterator[str]:
+    if os.path.isfile(path):
+        yield path
+        return
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if d not in SKIPPED_DIRS)
+        for name in sorted(files):
+            if not name.endswith(SKIPPED_SUFFIXES):
+                yield os.path.join(root, name)
+
+
+def source_hash(paths: Sequence[str]) -> str:
+    """Hash of the relative path and content of every source file under `paths`."""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        if not os.path.exists(path):
+            continue
+        for file_path in _source_files(path):
+            digest.update(os.path.normpath(file_path).encode("utf-8") + b"\0")
+            with open(file_path, "rb") as source:
+                digest.update(hashlib.sha256(source.read()).digest())
+    return digest.hexdigest()
+
+
+def stack_hashes(cdk_out: str) -> Dict[str, str]:
+    """Hash of each stack in the cloud assembly at `cdk_out`, by stack name."""
+    with open(os.path.join(cdk_out, "manifest.json")) as manifest_file:
+        artifacts = json.load(manifest_file).get("artifacts", {})
+
+    hashes = {}
+    for artifact_id, artifact in sorted(artifacts.items()):
+        if artifact.get("type") != "aws:cloudformation:stack":
+            continue
+        properties = artifact.get("properties", {})
+        with open(os.path.join(cdk_out, properties["templateFile"]), "rb") as template:
+            template_hash = hashlib.sha256(template.read()).hexdigest()
+
+        # Asset hashes change with the content of every file and image asset
+        asset_hashes = []
+        for dependency in artifact.get("dependencies", []):
+            dependency_artifact = artifacts.get(dependency, {})
+            if dependency_artifact.get("type") != "cdk:asset-manifest":
+                continue
+            with open(os.path.join(cdk_out, dependency_artifact["properties"]["file"])) as assets_file:
+                assets = json.load(assets_file)
+            asset_hashes += list(assets.get("files", {})) + list(assets.get("dockerImages", {}))
+
+        fingerprint = json.dumps({
+            "template": template_hash,
+            "environment": artifact.get("environment"),
+            "properties": properties,
+            "assets": sorted(asset_hashes),
+        }, sort_keys=True)
+        stack_name = properties.get("stackName", artifact_id)
+        hashes[stack_name] = hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+    return hashes
+
+
+def main(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("source-hash").add_argument("paths", nargs="+")
+    commands.add_parser("stack-hashes").add_argument("cdk_out")
+    args = parser.parse_args(argv)
+
+    if args.command == "source-hash":
+        print(source_hash(args.paths))
+    else:
+        print(json.dumps(stack_hashes(args.cdk_out), indent=1, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
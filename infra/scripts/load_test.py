@@ -0,0 +1,279 @@
+"""
+Scripted load test with a latency-regression gate.
+
+    run URL --config FILE [--baseline FILE] [--output FILE] [--promote FILE]
+                                            run the profile against URL and
+                                            exit 1 if it regressed past the
+                                            baseline
+    stub [--port N] [--latency-ms N]        serve a local stub to run against
+
+The config file holds the load profile, how far each result may regress and
+the pinned baseline (see load_test.json). `--baseline` gates against results
+promoted by an earlier run instead. `--promote` writes the results there only
+when they pass and improve on the baseline in every metric, so the baseline
+never drifts towards slower runs; accepting a slower baseline means changing
+the pinned one. The pipeline runs this after every deploy (see PipelineStack);
+the stub lets the gate run offline.
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class LoadStage:
+    """Closed-loop load: `concurrency` clients sending back-to-back requests."""
+    duration_seconds: float
+    concurrency: int
+
+
+@dataclass(frozen=True)
+class LoadProfile:
+    """
+    Requests cycle through `paths`. Results from the warm-up are discarded,
+    so connection setup and cold caches don't count against the gate.
+    """
+    stages: Tuple[LoadStage, ...]
+    paths: Tuple[str, ...] = ("/",)
+    warmup_seconds: float = 0
+    timeout_seconds: float = 5
+
+    def validate(self) -> None:
+        if not self.stages or not self.paths:
+            raise ValueError("A load profile needs at least one stage and one path")
+        for stage in self.stages:
+            if stage.duration_seconds <= 0 or stage.concurrency < 1:
+                raise ValueError(f"Invalid load stage {stage}")
+
+
+@dataclass(frozen=True)
+class LoadResults:
+    requests: int
+    errors: int
+    error_rate_percent: float
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+@dataclass(frozen=True)
+class Tolerance:
+    """How far results may regress: latency and RPS relative, error rate in points."""
+    latency_percent: float = 20
+    rps_percent: float = 20
+    error_rate_points: float = 0.5
+
+
+@dataclass(frozen=True)
+class LoadTestConfig:
+    profile: LoadProfile
+    baseline: Optional[LoadResults] = None
+    tolerance: Tolerance = field(default_factory=Tolerance)
+
+
+def load_config(path: str) -> LoadTestConfig:
+    with open(path) as config_file:
+        raw = json.load(config_file)
+    profile = raw["profile"]
+    config = LoadTestConfig(
+        profile=LoadProfile(
+            stages=tuple(LoadStage(**stage) for stage in profile["stages"]),
+            paths=tuple(profile.get("paths", ("/",))),
+            warmup_seconds=profile.get("warmup_seconds", 0),
+            timeout_seconds=profile.get("timeout_seconds", 5)
+        ),
+        baseline=LoadResults(**raw["baseline"]) if raw.get("baseline") else None,
+        tolerance=Tolerance(**raw.get("tolerance", {}))
+    )
+    config.profile.validate()
+    return config
+
+
+def load_results(path: str) -> LoadResults:
+    """Results written by an earlier `run --output`."""
+    with open(path) as results_file:
+        return LoadResults(**json.load(results_file))
+
+
+def percentile(sorted_values: Sequence[float], percent: float) -> float:
+    """Nearest-rank percentile of an ascending sequence (0 when empty)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _request(url: str, timeout: float) -> Tuple[float, bool]:
+    """Latency in ms and whether the response was an error (non-2xx/3xx or no response)."""
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            failed = response.status >= 400
+    except (urllib.error.URLError, OSError, http.client.HTTPException):
+        # HTTPError (4xx/5xx), timeouts, refused connections and malformed or
+        # truncated responses (BadStatusLine, IncompleteRead)
+        failed = True
+    return (time.perf_counter() - start) * 1000, failed
+
+
+def run_profile(base_url: str, profile: LoadProfile) -> LoadResults:
+    """Run every stage of `profile` against `base_url` and summarize the recorded requests."""
+    urls = [base_url.rstrip("/") + path for path in profile.paths]
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def client(deadline: float, record: bool, offset: int) -> None:
+        nonlocal errors
+        count = offset
+        while time.monotonic() < deadline:
+            latency, failed = _request(urls[count % len(urls)], profile.timeout_seconds)
+            count += 1
+            if record:
+                with lock:
+                    latencies.append(latency)
+                    errors += failed
+
+    def run_stage(stage: LoadStage, record: bool) -> None:
+        deadline = time.monotonic() + stage.duration_seconds
+        with ThreadPoolExecutor(max_workers=stage.concurrency) as pool:
+            clients = [pool.submit(client, deadline, record, offset) for offset in range(stage.concurrency)]
+        # A client that died would silently take its share of the load with it
+        for future in clients:
+            future.result()
+
+    if profile.warmup_seconds:
+        run_stage(LoadStage(profile.warmup_seconds, profile.stages[0].concurrency), record=False)
+    start = time.monotonic()
+    for stage in profile.stages:
+        run_stage(stage, record=True)
+    elapsed = time.monotonic() - start
+
+    latencies.sort()
+    requests = len(latencies)
+    return LoadResults(
+        requests=requests,
+        errors=errors,
+        error_rate_percent=round(100 * errors / requests, 3) if requests else 100.0,
+        rps=round(requests / elapsed, 2) if elapsed else 0.0,
+        p50_ms=round(percentile(latencies, 50), 2),
+        p95_ms=round(percentile(latencies, 95), 2),
+        p99_ms=round(percentile(latencies, 99), 2)
+    )
+
+
+def regressions(results: LoadResults, baseline: LoadResults, tolerance: Tolerance) -> List[str]:
+    """Every way `results` regressed past `baseline` plus `tolerance`; empty when the gate passes."""
+    failures = []
+    for name in ("p50_ms", "p95_ms", "p99_ms"):
+        limit = getattr(baseline, name) * (1 + tolerance.latency_percent / 100)
+        if getattr(results, name) > limit:
+            failures.append(f"{name} {getattr(results, name)} exceeds {limit:.2f} (baseline {getattr(baseline, name)})")
+    error_limit = baseline.error_rate_percent + tolerance.error_rate_points
+    if results.error_rate_percent > error_limit:
+        failures.append(f"error_rate_percent {results.error_rate_percent} exceeds {error_limit:.2f}")
+    rps_floor = baseline.rps * (1 - tolerance.rps_percent / 100)
+    if results.rps < rps_floor:
+        failures.append(f"rps {results.rps} below {rps_floor:.2f} (baseline {baseline.rps})")
+    return failures
+
+
+def improves(results: LoadResults, baseline: LoadResults) -> bool:
+    """Whether `results` are at least as good as `baseline` in every gated metric."""
+    return (
+        all(getattr(results, name) <= getattr(baseline, name) for name in ("p50_ms", "p95_ms", "p99_ms"))
+        and results.error_rate_percent <= baseline.error_rate_percent
+        and results.rps >= baseline.rps
+    )
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    latency_seconds = 0.0
+    status = 200
+
+    def do_GET(self) -> None:
+        time.sleep(self.latency_seconds)
+        body = b"ok\n"
+        self.send_response(self.status)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+@contextlib.contextmanager
+def stub_server(latency_ms: float = 0, status: int = 200, port: int = 0) -> Iterator[str]:
+    """Serve every GET with `status` after `latency_ms`; yields the base URL."""
+    handler = type("StubHandler", (_StubHandler,), {"latency_seconds": latency_ms / 1000, "status": status})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run")
+    run.add_argument("url")
+    run.add_argument("--config", required=True)
+    run.add_argument("--baseline", help="results promoted by an earlier run; ignored when the file does not exist")
+    run.add_argument("--output")
+    run.add_argument("--promote", help="where to write the results when they pass and improve on the baseline")
+    stub = commands.add_parser("stub")
+    stub.add_argument("--port", type=int, default=8080)
+    stub.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "stub":
+        with stub_server(args.latency_ms, port=args.port) as url:
+            print(f"Stub serving on {url}")
+            with contextlib.suppress(KeyboardInterrupt):
+                threading.Event().wait()
+        return 0
+
+    config = load_config(args.config)
+    baseline = config.baseline
+    if args.baseline and os.path.exists(args.baseline):
+        baseline = load_results(args.baseline)
+    results = run_profile(args.url, config.profile)
+    print(json.dumps(asdict(results), indent=1))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(asdict(results), output, indent=1)
+
+    failures = regressions(results, baseline, config.tolerance) if baseline else []
+    for failure in failures:
+        print(f"load-test-regression {failure}")
+    if baseline is None:
+        print("No baseline; results recorded without a gate")
+    if args.promote and not failures and (baseline is None or improves(results, baseline)):
+        with open(args.promote, "w") as promoted:
+            json.dump(asdict(results), promoted, indent=1)
+        print(f"Results promoted to the baseline in {args.promote}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
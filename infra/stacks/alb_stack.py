@@ -1,20 +1,122 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
 from aws_cdk import (
     Stack,
+    aws_cloudfront as cloudfront,
+    aws_cloudfront_origins as origins,
     aws_ec2 as ec2,
     aws_elasticloadbalancingv2 as elbv2,
+    aws_secretsmanager as secretsmanager,
     CfnOutput,
-    Duration
+    Duration,
+    Token
 )
 from constructs import Construct
 
+from stacks.vpc_stack import APP_PORT
+
+
+@dataclass(frozen=True)
+class AlbTuningProps:
+    """
+    Listener and target group performance settings.
+
+    Defaults put a new target in service after two 10s health checks (about
+    20s instead of 5 minutes), route to the target with the fewest in-flight
+    requests and drain connections for 30s on deregistration. Set
+    `certificate_arn` to add an HTTPS listener (HTTP/2) and redirect HTTP to it.
+    """
+    certificate_arn: Optional[str] = None
+    http2_enabled: bool = True
+    load_balancing_algorithm: elbv2.TargetGroupLoadBalancingAlgorithmType = (
+        elbv2.TargetGroupLoadBalancingAlgorithmType.LEAST_OUTSTANDING_REQUESTS
+    )
+    # 0 disables slow start
+    slow_start_seconds: int = 0
+    deregistration_delay_seconds: int = 30
+    idle_timeout_seconds: int = 60
+    health_check_path: str = "/"
+    health_check_interval_seconds: int = 10
+    health_check_timeout_seconds: int = 5
+    healthy_threshold_count: int = 2
+    unhealthy_threshold_count: int = 2
+
+    def validate(self) -> None:
+        if self.slow_start_seconds and not 30 <= self.slow_start_seconds <= 900:
+            raise ValueError(f"slow_start_seconds must be 0 or in [30, 900], got {self.slow_start_seconds}")
+        if self.slow_start_seconds and self.load_balancing_algorithm == \
+                elbv2.TargetGroupLoadBalancingAlgorithmType.LEAST_OUTSTANDING_REQUESTS:
+            raise ValueError("Slow start cannot be combined with least outstanding requests routing")
+        if not 0 <= self.deregistration_delay_seconds <= 3600:
+            raise ValueError(
+                f"deregistration_delay_seconds must be in [0, 3600], got {self.deregistration_delay_seconds}"
+            )
+        if not 1 <= self.idle_timeout_seconds <= 4000:
+            raise ValueError(f"idle_timeout_seconds must be in [1, 4000], got {self.idle_timeout_seconds}")
+        if not 5 <= self.health_check_interval_seconds <= 300:
+            raise ValueError(
+                f"health_check_interval_seconds must be in [5, 300], got {self.health_check_interval_seconds}"
+            )
+        if not 2 <= self.health_check_timeout_seconds < self.health_check_interval_seconds:
+            raise ValueError("health_check_timeout_seconds must be at least 2 and less than the interval")
+        for name in ("healthy_threshold_count", "unhealthy_threshold_count"):
+            if not 2 <= getattr(self, name) <= 10:
+                raise ValueError(f"{name} must be in [2, 10], got {getattr(self, name)}")
+
+
+@dataclass(frozen=True)
+class EdgeCacheProps:
+    """
+    CloudFront distribution in front of the ALB.
 
-# TODO: Add HTTPS listener and redirect HTTP to HTTPS
+    Static paths are cached for long periods with a cache key of path only.
+    API paths (and everything else) honour the origin's Cache-Control headers
+    up to `api_max_ttl_seconds` and key on query strings and Authorization.
+    Deploy VPCStack with `restrict_alb_to_cloudfront` so the ALB only accepts
+    CloudFront traffic; app.py sets both from the profile's `edge_cache`.
+    """
+    static_path_patterns: Tuple[str, ...] = ("/static/*", "/assets/*")
+    api_path_patterns: Tuple[str, ...] = ("/api/*",)
+    static_default_ttl_seconds: int = 86400
+    static_max_ttl_seconds: int = 31536000
+    api_max_ttl_seconds: int = 60
+    # Defaults to the stack's region
+    origin_shield_region: Optional[str] = None
+    price_class: cloudfront.PriceClass = cloudfront.PriceClass.PRICE_CLASS_100
+
+    def validate(self) -> None:
+        if not self.static_path_patterns and not self.api_path_patterns:
+            raise ValueError("At least one static or API path pattern is required")
+        overlap = set(self.static_path_patterns) & set(self.api_path_patterns)
+        if overlap:
+            raise ValueError(f"Path patterns cannot be both static and API: {sorted(overlap)}")
+        if not 0 < self.static_default_ttl_seconds <= self.static_max_ttl_seconds:
+            raise ValueError("static_default_ttl_seconds must be positive and at most static_max_ttl_seconds")
+        if self.api_max_ttl_seconds < 0:
+            raise ValueError(f"api_max_ttl_seconds must not be negative, got {self.api_max_ttl_seconds}")
 
 
 class ALBStack(Stack):
-    def __init__(self, scope: Construct, construct_id: str, vpc: ec2.Vpc, alb_sg: ec2.SecurityGroup, **kwargs) -> None:
+    # Header CloudFront adds to origin requests; the listener rejects requests without it
+    ORIGIN_VERIFY_HEADER = "X-Origin-Verify"
+
+    def __init__(self, scope: Construct, construct_id: str, vpc: ec2.Vpc, alb_sg: ec2.SecurityGroup,
+                 edge_cache: Optional[EdgeCacheProps] = None,
+                 tuning: Optional[AlbTuningProps] = None,
+                 target_type: elbv2.TargetType = elbv2.TargetType.INSTANCE,
+                 target_port: int = APP_PORT,
+                 **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        tuning = tuning or AlbTuningProps()
+        tuning.validate()
+        if edge_cache is not None:
+            edge_cache.validate()
+            if tuning.certificate_arn:
+                # CloudFront terminates TLS and reaches the ALB over HTTP
+                raise ValueError("certificate_arn cannot be combined with edge_cache")
+
         # Create Application Load Balancer
         self.alb = elbv2.ApplicationLoadBalancer(
             self, "ApplicationLoadBalancer",
@@ -23,39 +125,182 @@ class ALBStack(Stack):
             security_group=alb_sg,
             vpc_subnets=ec2.SubnetSelection(
                 subnets=vpc.public_subnets
-            )
+            ),
+            http2_enabled=tuning.http2_enabled,
+            idle_timeout=Duration.seconds(tuning.idle_timeout_seconds)
         )
 
-        # Create target group with minimal health check settings
+        # Create target group with fast health checks so new instances take traffic within seconds
         self.target_group = elbv2.ApplicationTargetGroup(
             self, "DefaultTargetGroup",
             vpc=vpc,
-            port=8443,
+            port=target_port,
             protocol=elbv2.ApplicationProtocol.HTTP,
-            target_type=elbv2.TargetType.INSTANCE,
+            # INSTANCE for the ASG app servers, IP for awsvpc ECS tasks
+            target_type=target_type,
+            load_balancing_algorithm_type=tuning.load_balancing_algorithm,
+            slow_start=Duration.seconds(tuning.slow_start_seconds) if tuning.slow_start_seconds else None,
+            # Time given to in-flight requests before a deregistering target is removed
+            deregistration_delay=Duration.seconds(tuning.deregistration_delay_seconds),
             health_check=elbv2.HealthCheck(
                 enabled=True,
                 protocol=elbv2.Protocol.HTTP,
-                healthy_threshold_count=5,
-                unhealthy_threshold_count=2,
-                timeout=Duration.seconds(10),
-                interval=Duration.seconds(60),
-                path="/",
-                port="8443"
+                healthy_threshold_count=tuning.healthy_threshold_count,
+                unhealthy_threshold_count=tuning.unhealthy_threshold_count,
+                timeout=Duration.seconds(tuning.health_check_timeout_seconds),
+                interval=Duration.seconds(tuning.health_check_interval_seconds),
+                path=tuning.health_check_path,
+                port=str(target_port)
             )
         )
 
-        # Add HTTP listener with target group
-        http_listener = self.alb.add_listener(
-            "HttpListener",
-            port=80,
-            open=True,
-            default_target_groups=[self.target_group]
-        )
+        if edge_cache is not None:
+            self._add_edge_cache(edge_cache)
+        elif tuning.certificate_arn:
+            # HTTPS listener (HTTP/2 is negotiated over TLS) with target group
+            https_listener = self.alb.add_listener(
+                "HttpsListener",
+                port=443,
+                open=True,
+                certificates=[elbv2.ListenerCertificate.from_arn(tuning.certificate_arn)],
+                ssl_policy=elbv2.SslPolicy.RECOMMENDED_TLS,
+                default_target_groups=[self.target_group]
+            )
+
+            # Redirect HTTP to HTTPS
+            http_listener = self.alb.add_redirect(
+                source_port=80,
+                target_port=443
+            )
+        else:
+            # Add HTTP listener with target group
+            http_listener = self.alb.add_listener(
+                "HttpListener",
+                port=80,
+                open=True,
+                default_target_groups=[self.target_group]
+            )
 
         # Output the ALB DNS name
         CfnOutput(
             self, "LoadBalancerDNS",
             value=self.alb.load_balancer_dns_name,
             description="DNS name of the load balancer"
-        ) 
\ No newline at end of file
+        )
+
+    def _add_edge_cache(self, edge_cache: EdgeCacheProps) -> None:
+        """Serve the ALB through CloudFront and only accept CloudFront traffic."""
+        # Shared secret CloudFront sends to prove a request came through the distribution
+        origin_verify_secret = secretsmanager.Secret(
+            self, "OriginVerifySecret",
+            description="Header value CloudFront sends to the ALB",
+            generate_secret_string=secretsmanager.SecretStringGenerator(
+                exclude_punctuation=True,
+                password_length=32
+            )
+        )
+        # The templates only carry a dynamic reference that CloudFormation resolves
+        # at deploy time, but the value then sits in plaintext in the listener rule
+        # and the distribution's origin config (readable with elasticloadbalancing:
+        # DescribeRules / cloudfront:GetDistributionConfig). It only proves a request
+        # came through the distribution; both sides read it at deploy, so rotating
+        # the secret takes a redeploy of this stack.
+        origin_verify_value = origin_verify_secret.secret_value.unsafe_unwrap()
+
+        # HTTP listener: the ingress rule comes from VPCStack (CloudFront prefix list),
+        # and requests without the secret header are rejected
+        http_listener = self.alb.add_listener(
+            "HttpListener",
+            port=80,
+            open=False,
+            default_action=elbv2.ListenerAction.fixed_response(
+                403,
+                content_type="text/plain",
+                message_body="Forbidden"
+            )
+        )
+        http_listener.add_action(
+            "FromCloudFront",
+            priority=1,
+            conditions=[
+                elbv2.ListenerCondition.http_header(self.ORIGIN_VERIFY_HEADER, [origin_verify_value])
+            ],
+            action=elbv2.ListenerAction.forward([self.target_group])
+        )
+
+        origin_shield_region = edge_cache.origin_shield_region or self.region
+        if Token.is_unresolved(origin_shield_region):
+            raise ValueError("Set the stack region or EdgeCacheProps.origin_shield_region to enable origin shield")
+
+        # Origin shield adds a regional cache layer in front of the ALB
+        alb_origin = origins.LoadBalancerV2Origin(
+            self.alb,
+            protocol_policy=cloudfront.OriginProtocolPolicy.HTTP_ONLY,
+            origin_shield_enabled=True,
+            origin_shield_region=origin_shield_region,
+            custom_headers={self.ORIGIN_VERIFY_HEADER: origin_verify_value}
+        )
+
+        # Static assets: long TTL, cache key is the path only
+        static_cache_policy = cloudfront.CachePolicy(
+            self, "StaticCachePolicy",
+            comment="Static assets",
+            default_ttl=Duration.seconds(edge_cache.static_default_ttl_seconds),
+            max_ttl=Duration.seconds(edge_cache.static_max_ttl_seconds),
+            min_ttl=Duration.seconds(0),
+            query_string_behavior=cloudfront.CacheQueryStringBehavior.none(),
+            header_behavior=cloudfront.CacheHeaderBehavior.none(),
+            cookie_behavior=cloudfront.CacheCookieBehavior.none(),
+            enable_accept_encoding_gzip=True,
+            enable_accept_encoding_brotli=True
+        )
+
+        # Dynamic/API responses: cached only when the origin allows it, briefly
+        api_cache_policy = cloudfront.CachePolicy(
+            self, "ApiCachePolicy",
+            comment="Dynamic and API responses",
+            default_ttl=Duration.seconds(0),
+            max_ttl=Duration.seconds(edge_cache.api_max_ttl_seconds),
+            min_ttl=Duration.seconds(0),
+            query_string_behavior=cloudfront.CacheQueryStringBehavior.all(),
+            header_behavior=cloudfront.CacheHeaderBehavior.allow_list("Authorization"),
+            cookie_behavior=cloudfront.CacheCookieBehavior.none(),
+            enable_accept_encoding_gzip=True,
+            enable_accept_encoding_brotli=True
+        )
+
+        static_behavior = cloudfront.BehaviorOptions(
+            origin=alb_origin,
+            cache_policy=static_cache_policy,
+            allowed_methods=cloudfront.AllowedMethods.ALLOW_GET_HEAD_OPTIONS,
+            viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+            compress=True
+        )
+        api_behavior = cloudfront.BehaviorOptions(
+            origin=alb_origin,
+            cache_policy=api_cache_policy,
+            # Forward cookies and the remaining viewer headers without adding them to the cache key
+            origin_request_policy=cloudfront.OriginRequestPolicy.ALL_VIEWER_EXCEPT_HOST_HEADER,
+            allowed_methods=cloudfront.AllowedMethods.ALLOW_ALL,
+            viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+            compress=True
+        )
+
+        additional_behaviors = {pattern: static_behavior for pattern in edge_cache.static_path_patterns}
+        additional_behaviors.update({pattern: api_behavior for pattern in edge_cache.api_path_patterns})
+
+        self.distribution = cloudfront.Distribution(
+            self, "EdgeDistribution",
+            comment="Edge cache for the application load balancer",
+            default_behavior=api_behavior,
+            additional_behaviors=additional_behaviors,
+            price_class=edge_cache.price_class,
+            http_version=cloudfront.HttpVersion.HTTP2_AND_3
+        )
+
+        # Output the CloudFront domain name
+        CfnOutput(
+            self, "DistributionDomainName",
+            value=self.distribution.distribution_domain_name,
+            description="Domain name of the CloudFront distribution"
+        )
@@ -1,25 +1,426 @@
+from dataclasses import dataclass
+
 from aws_cdk import (
     Stack,
     aws_ec2 as ec2,
     aws_autoscaling as autoscaling,
     aws_elasticloadbalancingv2 as elbv2,
+    aws_cloudwatch as cloudwatch,
     aws_iam as iam,
+    aws_ssm as ssm,
+    ArnFormat,
     CfnOutput,
     Duration
 )
 from constructs import Construct
+from typing import List, Optional, Tuple
+import json
+import math
 import os
 
+from stacks.userdata_builder import SetupStage, build_user_data_base64
+
+
+# Application setup script, shared with the Image Builder stack that bakes it into the AMI
+USERDATA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'application', 'userdata.sh'
+)
+
+# Where the baked AMI keeps the application script; its presence marks a baked AMI
+BAKED_APPLICATION_PATH = "/opt/app/userdata.sh"
+
+
+def unless_baked(script: str) -> str:
+    """`script`, exiting early on instances launched from the baked AMI."""
+    guard = f"[ -e {BAKED_APPLICATION_PATH} ] && exit 0"
+    if script.startswith("#!"):
+        shebang, _, body = script.partition("\n")
+        return f"{shebang}\n{guard}\n{body}"
+    return f"{guard}\n{script}"
+
+
+@dataclass(frozen=True)
+class InstanceTypeOption:
+    """Instance type in a mixed instances policy, counting `weight` capacity units (vCPUs)."""
+    instance_type: str
+    weight: int = 1
+
+    @property
+    def is_arm(self) -> bool:
+        return ec2.InstanceType(self.instance_type).architecture == ec2.InstanceArchitecture.ARM_64
+
+
+@dataclass(frozen=True)
+class MixedInstancesProps:
+    """
+    Mixed instances policy for AppServerASG.
+
+    Types are listed in order of preference for on-demand capacity; arm64
+    (Graviton) types launch from an arm64 AL2023 template. Weights are
+    vCPUs, so the group's capacity bounds and scheduled capacities count
+    vCPUs rather than instances. `on_demand_base_capacity` (in vCPUs) is
+    always on-demand; above it, `on_demand_percentage_above_base` percent is
+    on-demand and the rest Spot, from the pools least likely to be
+    interrupted.
+    """
+    instance_types: Tuple[InstanceTypeOption, ...] = (
+        InstanceTypeOption("m7g.large", 2),
+        InstanceTypeOption("m6g.large", 2),
+        InstanceTypeOption("c7g.large", 2),
+        InstanceTypeOption("m6i.large", 2),
+        InstanceTypeOption("m5.large", 2),
+    )
+    on_demand_base_capacity: int = 2
+    on_demand_percentage_above_base: int = 25
+    spot_allocation_strategy: autoscaling.SpotAllocationStrategy = autoscaling.SpotAllocationStrategy.CAPACITY_OPTIMIZED
+    # Replace Spot instances proactively when AWS signals elevated interruption risk
+    capacity_rebalance: bool = True
+
+    @property
+    def min_weight(self) -> int:
+        return min(option.weight for option in self.instance_types)
+
+    @property
+    def uses_arm(self) -> bool:
+        return any(option.is_arm for option in self.instance_types)
+
+    def validate(self) -> None:
+        if not self.instance_types:
+            raise ValueError("A mixed instances policy needs at least one instance type")
+        names = [option.instance_type for option in self.instance_types]
+        if len(names) != len(set(names)):
+            raise ValueError(f"Instance types must be unique, got {names}")
+        for option in self.instance_types:
+            if not 1 <= option.weight <= 999:
+                raise ValueError(f"Weight of {option.instance_type} must be in [1, 999], got {option.weight}")
+        if self.on_demand_base_capacity < 0:
+            raise ValueError(f"on_demand_base_capacity must not be negative, got {self.on_demand_base_capacity}")
+        if not 0 <= self.on_demand_percentage_above_base <= 100:
+            raise ValueError(
+                f"on_demand_percentage_above_base must be in [0, 100], got {self.on_demand_percentage_above_base}"
+            )
+
+
+@dataclass(frozen=True)
+class Gp3VolumeProps:
+    """
+    Encrypted gp3 EBS volume with provisioned IOPS and throughput.
+
+    Data volumes with a `mount_point` are formatted (XFS) on first boot if
+    blank and mounted there.
+    """
+    size_gib: int
+    iops: int = 3000
+    throughput_mibps: int = 125
+    mount_point: Optional[str] = None
+
+    def validate(self) -> None:
+        # gp3 limits
+        if not 1 <= self.size_gib <= 16384:
+            raise ValueError(f"gp3 size must be in [1, 16384] GiB, got {self.size_gib}")
+        if not 3000 <= self.iops <= min(16000, 500 * self.size_gib):
+            raise ValueError(
+                f"gp3 IOPS must be in [3000, 16000] and at most 500 per GiB, got {self.iops} for {self.size_gib} GiB"
+            )
+        if not 125 <= self.throughput_mibps <= min(1000, self.iops // 4):
+            raise ValueError(
+                f"gp3 throughput must be in [125, 1000] MiB/s and at most IOPS / 4, got {self.throughput_mibps}"
+            )
+
+
+@dataclass(frozen=True)
+class LaunchOptionsProps:
+    """
+    Storage and networking options for the app server launch templates.
+
+    `instance_store_mount_point` formats the instance's NVMe instance store
+    (striped when there are several) on every boot, since its contents do
+    not survive a stop. A spread placement group holds at most 7 running
+    instances per AZ; a cluster placement group keeps the group in a single
+    AZ for the lowest latency between instances.
+    """
+    # None keeps the AMI's root volume
+    root_volume: Optional[Gp3VolumeProps] = None
+    data_volumes: Tuple[Gp3VolumeProps, ...] = ()
+    instance_store_mount_point: Optional[str] = None
+    placement_strategy: Optional[ec2.PlacementGroupStrategy] = None
+    # One-minute EC2 metrics
+    detailed_monitoring: bool = False
+    require_imdsv2: bool = False
+    # 2 lets containers on the instance reach IMDS
+    metadata_hop_limit: Optional[int] = None
+
+    def validate(self) -> None:
+        if self.root_volume is not None:
+            self.root_volume.validate()
+            if self.root_volume.mount_point is not None:
+                raise ValueError("The root volume has no mount_point")
+        if len(self.data_volumes) > len(DATA_VOLUME_DEVICES):
+            raise ValueError(f"At most {len(DATA_VOLUME_DEVICES)} data volumes are supported")
+        for volume in self.data_volumes:
+            volume.validate()
+        mount_points = [volume.mount_point for volume in self.data_volumes if volume.mount_point]
+        mount_points += [self.instance_store_mount_point] if self.instance_store_mount_point else []
+        if len(mount_points) != len(set(mount_points)):
+            raise ValueError(f"Mount points must be unique, got {mount_points}")
+        if self.metadata_hop_limit is not None and not 1 <= self.metadata_hop_limit <= 64:
+            raise ValueError(f"metadata_hop_limit must be in [1, 64], got {self.metadata_hop_limit}")
+
+
+# Data volume device names; AL2023 links the NVMe devices to these names
+DATA_VOLUME_DEVICES = tuple(f"/dev/sd{letter}" for letter in "fghijklmnop")
+
+# Running instances per AZ in a spread placement group
+SPREAD_INSTANCES_PER_AZ = 7
+
+# Root volume size of the Amazon Linux 2023 AMI
+AL2023_ROOT_VOLUME_GIB = 8
+
+# Memory per vCPU by instance family class, and memory of the burstable (t) sizes
+MEMORY_PER_VCPU_GIB = {"c": 2, "m": 4, "r": 8}
+BURSTABLE_MEMORY_GIB = {"nano": 0.5, "micro": 1, "small": 2, "medium": 4, "large": 8, "xlarge": 16, "2xlarge": 32}
+
+
+def instance_memory_gib(instance_type: str) -> float:
+    """
+    Memory of a burstable (t), general purpose (m), compute (c) or memory
+    optimized (r) instance type, e.g. 8 for "m6i.large".
+    """
+    family, _, size = instance_type.partition(".")
+    if family.startswith("t") and size in BURSTABLE_MEMORY_GIB:
+        return BURSTABLE_MEMORY_GIB[size]
+    vcpus = {"medium": 1, "large": 2, "xlarge": 4}.get(size)
+    if vcpus is None and size.endswith("xlarge") and size[:-len("xlarge")].isdigit():
+        vcpus = 4 * int(size[:-len("xlarge")])
+    if family[:1] not in MEMORY_PER_VCPU_GIB or vcpus is None:
+        raise ValueError(f"No memory specification for instance type {instance_type}")
+    return vcpus * MEMORY_PER_VCPU_GIB[family[:1]]
+
+
+@dataclass(frozen=True)
+class WarmPoolProps:
+    """
+    Warm pool of pre-initialized instances for AppServerASG.
+
+    Instances run the full user data once, then wait stopped (or hibernated)
+    in the pool. A launch lifecycle hook keeps every instance out of service
+    until the application answers on `ready_check_url`. Hibernated instances
+    keep their RAM on the root volume, which is sized for it.
+    """
+    pool_state: autoscaling.PoolState = autoscaling.PoolState.STOPPED
+    min_size: int = 1
+    # Defaults to the group's max capacity
+    max_group_prepared_capacity: Optional[int] = None
+    reuse_on_scale_in: bool = True
+    ready_check_url: str = "http://localhost:8443/"
+    # How long an instance may take to report ready before it is abandoned
+    ready_timeout_seconds: int = 600
+    # The grace period starts once the lifecycle hook completes
+    health_check_grace_seconds: int = 30
+
+    def validate(self) -> None:
+        if self.min_size < 0:
+            raise ValueError(f"min_size must not be negative, got {self.min_size}")
+        if self.max_group_prepared_capacity is not None and self.max_group_prepared_capacity < self.min_size:
+            raise ValueError("max_group_prepared_capacity must be at least min_size")
+        # Lifecycle hook heartbeat limits
+        if not 30 <= self.ready_timeout_seconds <= 7200:
+            raise ValueError(f"ready_timeout_seconds must be in [30, 7200], got {self.ready_timeout_seconds}")
+
+
+@dataclass(frozen=True)
+class HostMetricsProps:
+    """
+    CloudWatch agent configuration for the app servers.
+
+    The agent config is stored in SSM Parameter Store and fetched at boot.
+    Metrics are collected every `collection_interval_seconds` (below 60 they
+    are published as high-resolution metrics) with the Auto Scaling group
+    name as their only instance dimension, so they aggregate per group.
+    """
+    namespace: str = "AppServer"
+    # Defaults to /<stack name>/cloudwatch-agent-config, unique per environment
+    parameter_name: Optional[str] = None
+    collection_interval_seconds: int = 10
+    # Process name patterns for procstat; patterns that match nothing publish nothing
+    procstat_patterns: Tuple[str, ...] = ("nginx", "httpd", "java", "node")
+
+    def validate(self) -> None:
+        if self.collection_interval_seconds not in (1, 5, 10, 30) and self.collection_interval_seconds % 60:
+            raise ValueError(
+                "collection_interval_seconds must be 1, 5, 10, 30 or a multiple of 60, "
+                f"got {self.collection_interval_seconds}"
+            )
+        if self.parameter_name is not None and not self.parameter_name.startswith("/"):
+            raise ValueError(f"parameter_name must be a path, got {self.parameter_name!r}")
+
+
+def cloudwatch_agent_config(host_metrics: HostMetricsProps) -> dict:
+    """CloudWatch agent configuration document for `host_metrics`."""
+    return {
+        "agent": {
+            "metrics_collection_interval": host_metrics.collection_interval_seconds,
+            # Per-group metrics: no per-host dimension
+            "omit_hostname": True
+        },
+        "metrics": {
+            "namespace": host_metrics.namespace,
+            "append_dimensions": {"AutoScalingGroupName": "${aws:AutoScalingGroupName}"},
+            # Also publish device/interface metrics rolled up per group
+            "aggregation_dimensions": [["AutoScalingGroupName"]],
+            "metrics_collected": {
+                "mem": {"measurement": ["mem_used_percent", "mem_available_percent"]},
+                "swap": {"measurement": ["swap_used_percent"]},
+                "diskio": {
+                    "resources": ["*"],
+                    "measurement": ["reads", "writes", "read_bytes", "write_bytes", "io_time"]
+                },
+                "disk": {"resources": ["/"], "measurement": ["used_percent"]},
+                "net": {
+                    "resources": ["*"],
+                    "measurement": ["bytes_sent", "bytes_recv", "packets_sent", "packets_recv",
+                                    "drop_in", "drop_out", "err_in", "err_out"]
+                },
+                "netstat": {"measurement": ["tcp_established", "tcp_time_wait", "tcp_close_wait"]},
+                "procstat": [
+                    {"pattern": pattern, "measurement": ["cpu_usage", "memory_rss", "num_threads", "pid_count"]}
+                    for pattern in host_metrics.procstat_patterns
+                ]
+            }
+        }
+    }
+
+
+@dataclass(frozen=True)
+class ScheduledScalingProps:
+    """
+    Recurring capacity change for a known peak.
+
+    `schedule` is a Unix cron expression (minute hour day month weekday)
+    evaluated in `time_zone`. Unset bounds are left unchanged.
+    """
+    name: str
+    schedule: str
+    min_capacity: Optional[int] = None
+    max_capacity: Optional[int] = None
+    desired_capacity: Optional[int] = None
+    time_zone: str = "UTC"
+
+
+@dataclass(frozen=True)
+class AsgScalingProps:
+    """
+    Capacity bounds and scaling policies for AppServerASG.
+
+    Target tracking on ALB requests per target is the primary policy, since
+    the application is I/O-bound and CPU lags real load. CPU tracking stays as
+    a backstop. Predictive scaling forecasts the request count from history
+    and launches capacity ahead of the forecast peak.
+    """
+    min_capacity: int = 1
+    max_capacity: int = 2
+    # Setting this resets the group to it on every deploy; None keeps the current size
+    desired_capacity: Optional[int] = 1
+    requests_per_target: Optional[int] = 500
+    cpu_target_percent: Optional[float] = 70
+    memory_target_percent: Optional[float] = None
+    # Average established TCP connections per instance
+    connections_per_instance: Optional[int] = None
+    predictive: bool = True
+    # Launch this long before the forecast capacity is needed
+    predictive_buffer_seconds: int = 300
+    # Let forecasts raise max capacity by this share (0 keeps max_capacity)
+    predictive_max_capacity_buffer_percent: int = 0
+    estimated_instance_warmup_seconds: int = 300
+    scheduled_actions: Tuple[ScheduledScalingProps, ...] = ()
+
+    def validate(self) -> None:
+        if not 0 <= self.min_capacity <= self.max_capacity:
+            raise ValueError(
+                f"Capacity bounds must satisfy 0 <= min <= max, got {self.min_capacity}/{self.max_capacity}"
+            )
+        if self.desired_capacity is not None and not self.min_capacity <= self.desired_capacity <= self.max_capacity:
+            raise ValueError(f"desired_capacity must be within [{self.min_capacity}, {self.max_capacity}]")
+        if self.requests_per_target is not None and self.requests_per_target <= 0:
+            raise ValueError(f"requests_per_target must be positive, got {self.requests_per_target}")
+        if self.cpu_target_percent is not None and not 0 < self.cpu_target_percent < 100:
+            raise ValueError(f"cpu_target_percent must be in (0, 100), got {self.cpu_target_percent}")
+        if self.memory_target_percent is not None and not 0 < self.memory_target_percent < 100:
+            raise ValueError(f"memory_target_percent must be in (0, 100), got {self.memory_target_percent}")
+        if self.connections_per_instance is not None and self.connections_per_instance <= 0:
+            raise ValueError(f"connections_per_instance must be positive, got {self.connections_per_instance}")
+        if self.predictive and self.requests_per_target is None:
+            raise ValueError("Predictive scaling forecasts request count and needs requests_per_target")
+        if not 0 <= self.predictive_buffer_seconds <= 3600:
+            raise ValueError(f"predictive_buffer_seconds must be in [0, 3600], got {self.predictive_buffer_seconds}")
+        if not 0 <= self.predictive_max_capacity_buffer_percent <= 100:
+            raise ValueError("predictive_max_capacity_buffer_percent must be in [0, 100]")
+        names = [action.name for action in self.scheduled_actions]
+        if len(names) != len(set(names)):
+            raise ValueError(f"Scheduled action names must be unique, got {names}")
+        for action in self.scheduled_actions:
+            if all(value is None for value in (action.min_capacity, action.max_capacity, action.desired_capacity)):
+                raise ValueError(f"Scheduled action {action.name!r} must set at least one capacity")
+            if len(action.schedule.split()) != 5:
+                raise ValueError(f"Scheduled action {action.name!r} needs a 5-field cron expression")
+
+
+# Runs the ready signal again when an instance resumes from hibernation
+SLEEP_HOOK_PATH = "/usr/lib/systemd/system-sleep/app-ready-signal"
 
 
 class ASGStack(Stack):
+    # Launch lifecycle hook completed by the instance once the application is ready
+    READY_HOOK_NAME = "app-ready"
+
     def __init__(self, scope: Construct, construct_id: str, 
                  vpc: ec2.Vpc, 
                  target_group: elbv2.ApplicationTargetGroup,
                  app_security_group: ec2.SecurityGroup,
+                 warm_pool: Optional[WarmPoolProps] = None,
+                 ami_parameter_name: Optional[str] = None,
+                 scaling: Optional[AsgScalingProps] = None,
+                 host_metrics: Optional[HostMetricsProps] = None,
+                 instance_type: Optional[ec2.InstanceType] = None,
+                 mixed_instances: Optional[MixedInstancesProps] = None,
+                 launch_options: Optional[LaunchOptionsProps] = None,
                  **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        scaling = scaling or AsgScalingProps()
+        scaling.validate()
+        host_metrics = host_metrics or HostMetricsProps()
+        host_metrics.validate()
+        if warm_pool is not None:
+            warm_pool.validate()
+        if mixed_instances is not None:
+            mixed_instances.validate()
+            if warm_pool is not None:
+                raise ValueError("Warm pools are not supported with a mixed instances policy")
+            if mixed_instances.uses_arm and ami_parameter_name is not None:
+                raise ValueError("Graviton instance types need an arm64 AMI; the baked AMI is x86_64 only")
+        launch_options = launch_options or LaunchOptionsProps()
+        launch_options.validate()
+        # Cost-effective instance type by default
+        instance_type = instance_type or ec2.InstanceType("t3.micro")
+        hibernation_root_gib = None
+        if self._hibernates(warm_pool):
+            # RAM is written to the root volume, next to the AMI's own contents
+            hibernation_root_gib = AL2023_ROOT_VOLUME_GIB + math.ceil(instance_memory_gib(instance_type.to_string()))
+            if launch_options.root_volume and launch_options.root_volume.size_gib < hibernation_root_gib:
+                raise ValueError(
+                    f"Hibernating {instance_type.to_string()} needs a root volume of at least {hibernation_root_gib} GiB"
+                )
+        if launch_options.placement_strategy == ec2.PlacementGroupStrategy.SPREAD:
+            max_instances = scaling.max_capacity
+            if mixed_instances is not None:
+                max_instances = math.ceil(max_instances / mixed_instances.min_weight)
+            if max_instances > SPREAD_INSTANCES_PER_AZ * len(vpc.availability_zones):
+                raise ValueError(
+                    f"A spread placement group holds {SPREAD_INSTANCES_PER_AZ} instances per AZ, "
+                    f"fewer than the {max_instances} the group can scale to"
+                )
+
         # Create IAM role for EC2 instances
         # This role enables AWS Systems Manager (SSM) which is useful for:
         # 1. Production environments: 
@@ -59,64 +460,171 @@ class ASGStack(Stack):
             iam.ManagedPolicy.from_aws_managed_policy_name("AmazonS3FullAccess")
         )
 
-        # Get the absolute path to userdata.sh
-        current_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-        userdata_path = os.path.join(current_dir, 'application', 'userdata.sh')
-        
-        # Read and process userdata script
-        with open(userdata_path, "r") as f:
-            user_data = f.readlines()
-            
-        # Add each line from the script to ec2 UserData
-        ec2_user_data = ec2.UserData.for_linux()
-        for line in user_data:
-            if line.strip() and not line.strip().startswith('#'):
-                ec2_user_data.add_commands(line.strip())
-        
-        # Create Launch Template
-        launch_template = ec2.LaunchTemplate(
-            self, "AppServerTemplate",
-            instance_type=ec2.InstanceType("t3.micro"),  # Cost-effective instance type
-            machine_image=ec2.AmazonLinuxImage(
-                generation=ec2.AmazonLinuxGeneration.AMAZON_LINUX_2023
-            ),
-            role=ec2_role,
-            user_data=ec2_user_data,
-            security_group=app_security_group
+        # CloudWatch agent: publish metrics and read its configuration
+        ec2_role.add_managed_policy(
+            iam.ManagedPolicy.from_aws_managed_policy_name("CloudWatchAgentServerPolicy")
         )
-
-        # Add CloudWatch logging to the launch template
-        launch_template.user_data.add_commands(
-            "yum install -y aws-cfn-bootstrap",
-            "yum install -y amazon-cloudwatch-agent",
-            "systemctl enable amazon-cloudwatch-agent",
-            "systemctl start amazon-cloudwatch-agent"
+        agent_config_name = host_metrics.parameter_name or f"/{self.stack_name}/cloudwatch-agent-config"
+        agent_config = ssm.StringParameter(
+            self, "CloudWatchAgentConfig",
+            parameter_name=agent_config_name,
+            description="CloudWatch agent configuration for the app servers",
+            string_value=json.dumps(cloudwatch_agent_config(host_metrics), separators=(",", ":"))
+        )
+        agent_config.grant_read(ec2_role)
+        start_agent = (
+            "/opt/aws/amazon-cloudwatch-agent/bin/amazon-cloudwatch-agent-ctl "
+            f"-a fetch-config -m ec2 -s -c ssm:{agent_config_name}"
         )
 
+        # Boot-time setup runs as stages; independent stages run concurrently.
+        # The application script is kept intact (heredocs, functions, continuations)
+        with open(USERDATA_PATH, "r") as f:
+            application_script = f.read()
+        setup_stages = []
+        if ami_parameter_name is None:
+            setup_stages.append(SetupStage("application", application_script))
+
+            # Add CloudWatch logging, independent of the application setup
+            setup_stages.append(SetupStage("cloudwatch-agent", "\n".join([
+                "yum install -y aws-cfn-bootstrap",
+                "yum install -y amazon-cloudwatch-agent",
+                "systemctl enable amazon-cloudwatch-agent",
+                start_agent
+            ])))
+
+            machine_image = ec2.AmazonLinuxImage(
+                generation=ec2.AmazonLinuxGeneration.AMAZON_LINUX_2023
+            )
+        else:
+            # Pre-baked AMI (ImageBuilderStack) already contains the application
+            # and the CloudWatch agent; the latest build is published to SSM.
+            # EC2 resolves the parameter at each launch: a deploy-time parameter
+            # would only change when this stack is deployed again.
+            machine_image = ec2.MachineImage.resolve_ssm_parameter_at_launch(
+                ami_parameter_name, os=ec2.OperatingSystemType.LINUX
+            )
+
+            # Only per-instance configuration remains at boot. Until the first
+            # build publishes, the parameter holds the stock AMI and the full
+            # setup runs instead.
+            setup_stages.append(SetupStage("application", unless_baked(application_script)))
+            setup_stages.append(SetupStage("cloudwatch-agent", "\n".join([
+                "rpm -q amazon-cloudwatch-agent || yum install -y aws-cfn-bootstrap amazon-cloudwatch-agent",
+                start_agent
+            ])))
+
+        # Data volumes and instance store, independent of the application setup
+        storage_commands = self._storage_commands(launch_options)
+        if storage_commands:
+            setup_stages.append(SetupStage("storage", "\n".join(storage_commands)))
+
+        if warm_pool is not None:
+            # Must run last: the instance reports ready after setup
+            setup_stages.append(SetupStage(
+                "ready-signal",
+                "\n".join(self._ready_signal_commands(warm_pool)),
+                depends_on=tuple(stage.name for stage in setup_stages)
+            ))
+
+        user_data = build_user_data_base64(setup_stages)
+        block_devices = self._block_devices(launch_options, hibernation_root_gib)
+
+        placement_group = None
+        if launch_options.placement_strategy is not None:
+            placement_group = ec2.PlacementGroup(
+                self, "AppServerPlacementGroup",
+                strategy=launch_options.placement_strategy
+            )
+
+        def app_server_template(template_id: str, image: ec2.IMachineImage,
+                                template_instance_type: Optional[ec2.InstanceType]) -> ec2.LaunchTemplate:
+            template = ec2.LaunchTemplate(
+                self, template_id,
+                instance_type=template_instance_type,
+                machine_image=image,
+                role=ec2_role,
+                security_group=app_security_group,
+                hibernation_configured=self._hibernates(warm_pool),
+                block_devices=block_devices,
+                placement_group=placement_group,
+                detailed_monitoring=launch_options.detailed_monitoring or None,
+                require_imdsv2=launch_options.require_imdsv2 or None,
+                http_put_response_hop_limit=launch_options.metadata_hop_limit
+            )
+            # Gzip-compressed multipart cloud-init document; ec2.UserData only renders
+            # plain text, so the encoded document is set on the template directly
+            template.node.default_child.add_property_override("LaunchTemplateData.UserData", user_data)
+            return template
+
+        # Create Launch Template
+        launch_template = app_server_template("AppServerTemplate", machine_image, instance_type)
+
+        mixed_instances_policy = None
+        if mixed_instances is not None:
+            # Graviton types launch from the same setup on the arm64 AL2023 image
+            arm_template = None
+            if mixed_instances.uses_arm:
+                arm_template = app_server_template(
+                    "AppServerArmTemplate",
+                    ec2.AmazonLinuxImage(
+                        generation=ec2.AmazonLinuxGeneration.AMAZON_LINUX_2023,
+                        cpu_type=ec2.AmazonLinuxCpuType.ARM_64
+                    ),
+                    None
+                )
+            mixed_instances_policy = autoscaling.MixedInstancesPolicy(
+                launch_template=launch_template,
+                instances_distribution=autoscaling.InstancesDistribution(
+                    on_demand_allocation_strategy=autoscaling.OnDemandAllocationStrategy.PRIORITIZED,
+                    on_demand_base_capacity=mixed_instances.on_demand_base_capacity,
+                    on_demand_percentage_above_base_capacity=mixed_instances.on_demand_percentage_above_base,
+                    spot_allocation_strategy=mixed_instances.spot_allocation_strategy
+                ),
+                launch_template_overrides=[
+                    autoscaling.LaunchTemplateOverrides(
+                        instance_type=ec2.InstanceType(option.instance_type),
+                        weighted_capacity=option.weight,
+                        launch_template=arm_template if option.is_arm else None
+                    )
+                    for option in mixed_instances.instance_types
+                ]
+            )
+
         # Create Auto Scaling Group
         self.asg = autoscaling.AutoScalingGroup(
             self, "AppServerASG",
             vpc=vpc,
             # Place ASG instances in the private subnets created in VPC Stack
             # These subnets have NAT Gateway access for updates but no direct internet access
+            # A cluster placement group lives in a single AZ
             vpc_subnets=ec2.SubnetSelection(
-                subnets=vpc.private_subnets
+                subnets=vpc.private_subnets[:1]
+                if launch_options.placement_strategy == ec2.PlacementGroupStrategy.CLUSTER
+                else vpc.private_subnets
             ),
-            launch_template=launch_template,
+            # The mixed instances policy carries the launch templates when set
+            launch_template=None if mixed_instances_policy else launch_template,
+            mixed_instances_policy=mixed_instances_policy,
+            capacity_rebalance=mixed_instances.capacity_rebalance if mixed_instances else None,
             # Minimum number of instances running at all times
             # Set to 1 for cost optimization, increase to 2+ for high availability
-            min_capacity=1,
+            min_capacity=scaling.min_capacity,
             # Maximum number of instances that ASG can scale to
             # Limits the scaling to control costs
-            max_capacity=2,
+            max_capacity=scaling.max_capacity,
             # Initial and desired number of instances
             # Starts with 1 instance and scales based on demand
-            desired_capacity=1,
+            desired_capacity=scaling.desired_capacity,
             # Health check settings for the ALB to monitor instance health
             # Grace period gives instance 300 seconds to start up before checking
             health_check=autoscaling.HealthCheck.elb(
-                grace=Duration.seconds(300)
+                grace=Duration.seconds(
+                    warm_pool.health_check_grace_seconds if warm_pool else 300
+                )
             ),
+            # Publish group metrics (capacity, in-service instances) for dashboards and alarms
+            group_metrics=[autoscaling.GroupMetrics.all()],
             # Cooldown period between scaling activities (in seconds)
             # Prevents rapid scaling up/down by waiting 5 minutes between actions
             cooldown=Duration.seconds(300)
@@ -125,16 +633,295 @@ class ASGStack(Stack):
         # Add ASG to ALB target group
         self.asg.attach_to_application_target_group(target_group)
 
+        if warm_pool is not None:
+            self._add_warm_pool(warm_pool, ec2_role)
+
         # Add scaling policies
-        self.asg.scale_on_cpu_utilization(
-            "CpuScaling",
-            target_utilization_percent=70,
-            cooldown=Duration.seconds(300)
-        )
+        self._add_scaling_policies(scaling, target_group, host_metrics)
 
         # Output ASG name
         CfnOutput(
             self, "AutoScalingGroupName",
             value=self.asg.auto_scaling_group_name,
             description="Name of the Auto Scaling Group"
-        ) 
\ No newline at end of file
+        )
+
+    def _add_scaling_policies(self, scaling: AsgScalingProps,
+                              target_group: elbv2.ApplicationTargetGroup,
+                              host_metrics: HostMetricsProps) -> None:
+        """Target tracking on requests, CPU, memory and connections, predictive and scheduled scaling."""
+        warmup = Duration.seconds(scaling.estimated_instance_warmup_seconds)
+
+        # Primary signal: requests per instance track load before CPU does
+        if scaling.requests_per_target is not None:
+            self.asg.scale_on_request_count(
+                "RequestCountScaling",
+                target_requests_per_minute=scaling.requests_per_target,
+                estimated_instance_warmup=warmup
+            )
+
+        # Backstop for CPU-heavy requests
+        if scaling.cpu_target_percent is not None:
+            self.asg.scale_on_cpu_utilization(
+                "CpuScaling",
+                target_utilization_percent=scaling.cpu_target_percent,
+                estimated_instance_warmup=warmup
+            )
+
+        # Host metrics published by the CloudWatch agent, averaged over the group
+        for policy_id, metric_name, target in (
+            ("MemoryScaling", "mem_used_percent", scaling.memory_target_percent),
+            ("ConnectionScaling", "netstat_tcp_established", scaling.connections_per_instance),
+        ):
+            if target is None:
+                continue
+            self.asg.scale_to_track_metric(
+                policy_id,
+                metric=cloudwatch.Metric(
+                    namespace=host_metrics.namespace,
+                    metric_name=metric_name,
+                    dimensions_map={"AutoScalingGroupName": self.asg.auto_scaling_group_name},
+                    statistic="Average",
+                    period=Duration.minutes(1)
+                ),
+                target_value=target,
+                estimated_instance_warmup=warmup
+            )
+
+        if scaling.predictive:
+            # Forecast ALB request count per target from up to 14 days of history.
+            # Not modelled by the L2 group, so the policy is added as an L1 resource.
+            resource_label = (
+                f"{target_group.first_load_balancer_full_name}/{target_group.target_group_full_name}"
+            )
+            autoscaling.CfnScalingPolicy(
+                self, "PredictiveScaling",
+                auto_scaling_group_name=self.asg.auto_scaling_group_name,
+                policy_type="PredictiveScaling",
+                predictive_scaling_configuration=autoscaling.CfnScalingPolicy.PredictiveScalingConfigurationProperty(
+                    mode="ForecastAndScale",
+                    scheduling_buffer_time=scaling.predictive_buffer_seconds,
+                    max_capacity_breach_behavior=(
+                        "IncreaseMaxCapacity" if scaling.predictive_max_capacity_buffer_percent
+                        else "HonorMaxCapacity"
+                    ),
+                    max_capacity_buffer=scaling.predictive_max_capacity_buffer_percent or None,
+                    metric_specifications=[
+                        autoscaling.CfnScalingPolicy.PredictiveScalingMetricSpecificationProperty(
+                            target_value=scaling.requests_per_target,
+                            predefined_metric_pair_specification=(
+                                autoscaling.CfnScalingPolicy.PredictiveScalingPredefinedMetricPairProperty(
+                                    predefined_metric_type="ALBRequestCount",
+                                    resource_label=resource_label
+                                )
+                            )
+                        )
+                    ]
+                )
+            )
+
+        # Known daily peaks
+        for action in scaling.scheduled_actions:
+            self.asg.scale_on_schedule(
+                f"Scheduled{action.name}",
+                schedule=autoscaling.Schedule.expression(action.schedule),
+                time_zone=action.time_zone,
+                min_capacity=action.min_capacity,
+                max_capacity=action.max_capacity,
+                desired_capacity=action.desired_capacity
+            )
+
+    @staticmethod
+    def _block_devices(launch_options: LaunchOptionsProps,
+                       hibernation_root_gib: Optional[int]) -> Optional[List[ec2.BlockDevice]]:
+        """Root and data volumes; None keeps the AMI's block device mapping."""
+        def gp3(volume: Gp3VolumeProps) -> ec2.BlockDeviceVolume:
+            return ec2.BlockDeviceVolume.ebs(
+                volume.size_gib,
+                volume_type=ec2.EbsDeviceVolumeType.GP3,
+                iops=volume.iops,
+                throughput=volume.throughput_mibps,
+                encrypted=True
+            )
+
+        root_volume = launch_options.root_volume
+        # Hibernation needs an encrypted root volume large enough for RAM
+        if root_volume is None and hibernation_root_gib is not None:
+            root_volume = Gp3VolumeProps(hibernation_root_gib)
+        block_devices = [ec2.BlockDevice(device_name="/dev/xvda", volume=gp3(root_volume))] if root_volume else []
+        block_devices += [
+            ec2.BlockDevice(device_name=device, volume=gp3(volume))
+            for device, volume in zip(DATA_VOLUME_DEVICES, launch_options.data_volumes)
+        ]
+        return block_devices or None
+
+    @staticmethod
+    def _storage_commands(launch_options: LaunchOptionsProps) -> List[str]:
+        """User data that mounts the data volumes and installs the instance store service."""
+        commands = []
+        for device, volume in zip(DATA_VOLUME_DEVICES, launch_options.data_volumes):
+            if volume.mount_point is None:
+                continue
+            # EBS volumes persist: format only when blank, mount by UUID on every boot
+            commands += [
+                f"for i in $(seq 60); do [ -e {device} ] && break; sleep 1; done",
+                f"blkid {device} || mkfs.xfs {device}",
+                f"mkdir -p {volume.mount_point}",
+                f"echo \"UUID=$(blkid -s UUID -o value {device}) {volume.mount_point} xfs defaults,noatime,nofail 0 2\" >> /etc/fstab",
+                f"mount {volume.mount_point}",
+            ]
+        if launch_options.instance_store_mount_point is None:
+            return commands
+
+        # Instance store is blank after every stop, so format it from a boot-time service
+        script = """#!/bin/bash
+set -euo pipefail
+mountpoint -q "$MOUNT_POINT" && exit 0
+mapfile -t devices < <(lsblk -dpno NAME,MODEL | awk '/Instance Storage/ {print $1}')
+if [ ${#devices[@]} -eq 0 ]; then
+    echo "No instance store volumes"
+    exit 0
+fi
+if [ ${#devices[@]} -eq 1 ]; then
+    device=${devices[0]}
+else
+    # Stripe the volumes for throughput
+    device=/dev/md/instance-store
+    [ -e "$device" ] || mdadm --create "$device" --run --level=0 --raid-devices=${#devices[@]} "${devices[@]}"
+fi
+blkid "$device" >/dev/null || mkfs.xfs -f "$device"
+mkdir -p "$MOUNT_POINT"
+mount -o noatime "$device" "$MOUNT_POINT"
+"""
+        unit = f"""[Unit]
+Description=Format and mount the instance store
+After=local-fs.target
+Before=cloud-final.service
+
+[Service]
+Type=oneshot
+RemainAfterExit=yes
+Environment=MOUNT_POINT={launch_options.instance_store_mount_point}
+ExecStart=/usr/local/bin/instance-store.sh
+
+[Install]
+WantedBy=multi-user.target
+"""
+        return commands + [
+            "command -v mdadm || dnf install -y mdadm",
+            f"cat > /usr/local/bin/instance-store.sh <<'EOF'\n{script}EOF",
+            "chmod +x /usr/local/bin/instance-store.sh",
+            f"cat > /etc/systemd/system/instance-store.service <<'EOF'\n{unit}EOF",
+            "systemctl daemon-reload",
+            "systemctl enable instance-store.service",
+            # First boot: mount now so the rest of the setup can use it
+            "systemctl start instance-store.service"
+        ]
+
+    @staticmethod
+    def _hibernates(warm_pool: Optional[WarmPoolProps]) -> bool:
+        return warm_pool is not None and warm_pool.pool_state == autoscaling.PoolState.HIBERNATED
+
+    def _add_warm_pool(self, warm_pool: WarmPoolProps, ec2_role: iam.Role) -> None:
+        """Keep pre-initialized instances ready and gate InService on app readiness."""
+        self.asg.add_warm_pool(
+            min_size=warm_pool.min_size,
+            max_group_prepared_capacity=warm_pool.max_group_prepared_capacity,
+            pool_state=warm_pool.pool_state,
+            reuse_on_scale_in=warm_pool.reuse_on_scale_in
+        )
+
+        # Instances stay Pending until the ready signal completes this hook;
+        # instances that never become ready are abandoned (terminated)
+        self.asg.add_lifecycle_hook(
+            "LaunchReadyHook",
+            lifecycle_hook_name=self.READY_HOOK_NAME,
+            lifecycle_transition=autoscaling.LifecycleTransition.INSTANCE_LAUNCHING,
+            heartbeat_timeout=Duration.seconds(warm_pool.ready_timeout_seconds),
+            default_result=autoscaling.DefaultResult.ABANDON
+        )
+
+        # Allow the instances to complete the hook for their own group. The group
+        # is matched by its generated name prefix: referencing the group itself
+        # would make the launch template (and so the group) wait on this policy.
+        # Group ARNs are autoScalingGroup:<uuid>:autoScalingGroupName/<name>.
+        ec2_role.add_to_policy(iam.PolicyStatement(
+            actions=["autoscaling:CompleteLifecycleAction"],
+            resources=[self.format_arn(
+                service="autoscaling",
+                resource="autoScalingGroup",
+                resource_name=f"*:autoScalingGroupName/{self.stack_name}-AppServerASG*",
+                arn_format=ArnFormat.COLON_RESOURCE_NAME
+            )]
+        ))
+        ec2_role.add_to_policy(iam.PolicyStatement(
+            actions=["autoscaling:DescribeAutoScalingInstances"],
+            resources=["*"]
+        ))
+
+    def _ready_signal_commands(self, warm_pool: WarmPoolProps) -> list:
+        """
+        User data that installs a service completing the launch hook.
+
+        Instances leaving the warm pool do not run user data again, so the
+        service runs on every boot (stopped pool) and is started again on
+        resume by a systemd sleep hook (hibernated pool). Instances heading
+        into the warm pool signal right away so they can be stopped; instances
+        heading into service wait for the application first.
+        """
+        script = f"""#!/bin/bash
+TOKEN=$(curl -s -X PUT http://169.254.169.254/latest/api/token -H 'X-aws-ec2-metadata-token-ttl-seconds: 300')
+imds() {{ curl -sf -H "X-aws-ec2-metadata-token: $TOKEN" "http://169.254.169.254/latest/$1"; }}
+INSTANCE_ID=$(imds meta-data/instance-id)
+REGION=$(imds meta-data/placement/region)
+TARGET_STATE=$(imds meta-data/autoscaling/target-lifecycle-state)
+if [[ "$TARGET_STATE" != Warmed:* ]]; then
+    deadline=$(( $(date +%s) + {warm_pool.ready_timeout_seconds} ))
+    until curl -sf -o /dev/null {warm_pool.ready_check_url}; do
+        [ "$(date +%s)" -ge "$deadline" ] && exit 1
+        sleep 2
+    done
+fi
+ASG_NAME=$(aws autoscaling describe-auto-scaling-instances --region "$REGION" --instance-ids "$INSTANCE_ID" \\
+    --query 'AutoScalingInstances[0].AutoScalingGroupName' --output text)
+for attempt in 1 2 3 4 5; do
+    aws autoscaling complete-lifecycle-action --region "$REGION" --instance-id "$INSTANCE_ID" \\
+        --auto-scaling-group-name "$ASG_NAME" --lifecycle-hook-name {self.READY_HOOK_NAME} \\
+        --lifecycle-action-result CONTINUE && exit 0
+    sleep $(( attempt * 5 ))
+done
+exit 1
+"""
+        unit = """[Unit]
+Description=Complete the Auto Scaling launch lifecycle hook once the application is ready
+After=cloud-final.service network-online.target
+Wants=network-online.target
+
+[Service]
+Type=oneshot
+ExecStart=/usr/local/bin/app-ready-signal.sh
+
+[Install]
+WantedBy=multi-user.target
+"""
+        commands = [
+            f"cat > /usr/local/bin/app-ready-signal.sh <<'EOF'\n{script}EOF",
+            "chmod +x /usr/local/bin/app-ready-signal.sh",
+            f"cat > /etc/systemd/system/app-ready-signal.service <<'EOF'\n{unit}EOF",
+            "systemctl daemon-reload",
+            "systemctl enable app-ready-signal.service",
+            # Queue the first run behind cloud-final (which is running this script)
+            "systemctl start --no-block app-ready-signal.service"
+        ]
+        if self._hibernates(warm_pool):
+            # Resuming from hibernation is not a boot: systemd-sleep runs this with "post"
+            sleep_hook = """#!/bin/bash
+if [ "$1" = post ]; then
+    systemctl start --no-block app-ready-signal.service
+fi
+"""
+            commands += [
+                f"cat > {SLEEP_HOOK_PATH} <<'EOF'\n{sleep_hook}EOF",
+                f"chmod +x {SLEEP_HOOK_PATH}"
+            ]
+        return commands
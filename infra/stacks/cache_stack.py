@@ -0,0 +1,136 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from aws_cdk import (
+    Stack,
+    aws_ec2 as ec2,
+    aws_elasticache as elasticache,
+    CfnOutput
+)
+from constructs import Construct
+
+
+@dataclass(frozen=True)
+class CacheProps:
+    """
+    Replication group sizing.
+
+    With `cluster_mode` the keyspace is split over `shards` node groups, each
+    with `replicas_per_shard` replicas. Without it there is a single primary
+    and `replicas_per_shard` read replicas.
+    """
+    engine: str = "valkey"
+    engine_version: str = "8.0"
+    node_type: str = "cache.t4g.micro"
+    cluster_mode: bool = False
+    shards: int = 1
+    replicas_per_shard: int = 1
+
+    def validate(self) -> None:
+        if self.engine not in ("redis", "valkey"):
+            raise ValueError(f"engine must be 'redis' or 'valkey', got {self.engine!r}")
+        if not 0 <= self.replicas_per_shard <= 5:
+            raise ValueError(f"replicas_per_shard must be in [0, 5], got {self.replicas_per_shard}")
+        if self.cluster_mode and not 1 <= self.shards <= 500:
+            raise ValueError(f"shards must be in [1, 500], got {self.shards}")
+        if not self.cluster_mode and self.shards != 1:
+            raise ValueError("Multiple shards require cluster_mode")
+
+    @property
+    def parameter_group_family(self) -> str:
+        major_version = self.engine_version.split(".")[0]
+        return f"{self.engine}{major_version}"
+
+
+class CacheStack(Stack):
+    """
+    Cache Stack for an ElastiCache (Redis/Valkey) replication group.
+
+    This stack:
+    1. Creates the replication group in the isolated subnets
+       - Same subnets as the database, no internet access
+       - Accessible only from application servers (VPC Stack cache security group)
+
+    2. Keeps a replica in another AZ when replicas are configured
+       - Automatic failover and Multi-AZ
+       - Encryption at rest and in transit
+
+    3. Exports the endpoints for the application
+       - Primary and reader endpoints (cluster mode disabled)
+       - Configuration endpoint (cluster mode enabled)
+
+    Dependencies:
+    - VPC Stack (network, subnets, security groups)
+    """
+    CACHE_PORT = 6379
+
+    def __init__(self, scope: Construct, construct_id: str,
+                 vpc: ec2.Vpc,
+                 cache_security_group: ec2.SecurityGroup,
+                 cache: Optional[CacheProps] = None,
+                 **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        cache = cache or CacheProps()
+        cache.validate()
+
+        # Subnet group in the isolated subnets created by VPC Stack
+        subnet_group = elasticache.CfnSubnetGroup(
+            self, "CacheSubnetGroup",
+            description="Isolated subnets for ElastiCache",
+            subnet_ids=[subnet.subnet_id for subnet in vpc.isolated_subnets]
+        )
+
+        has_replicas = cache.replicas_per_shard > 0
+        # The default parameter group for cluster mode enables sharding
+        parameter_group_name = f"default.{cache.parameter_group_family}"
+        if cache.cluster_mode:
+            parameter_group_name += ".cluster.on"
+
+        self.replication_group = elasticache.CfnReplicationGroup(
+            self, "CacheReplicationGroup",
+            replication_group_description="Application cache",
+            engine=cache.engine,
+            engine_version=cache.engine_version,
+            cache_node_type=cache.node_type,
+            cache_parameter_group_name=parameter_group_name,
+            cache_subnet_group_name=subnet_group.ref,
+            security_group_ids=[cache_security_group.security_group_id],
+            port=self.CACHE_PORT,
+            cluster_mode="enabled" if cache.cluster_mode else "disabled",
+            # Shards and replicas (cluster mode) or primary plus replicas
+            num_node_groups=cache.shards if cache.cluster_mode else None,
+            replicas_per_node_group=cache.replicas_per_shard if cache.cluster_mode else None,
+            num_cache_clusters=None if cache.cluster_mode else 1 + cache.replicas_per_shard,
+            # Failover needs a replica to promote
+            automatic_failover_enabled=cache.cluster_mode or has_replicas,
+            multi_az_enabled=has_replicas,
+            at_rest_encryption_enabled=True,
+            transit_encryption_enabled=True
+        )
+        self.replication_group.add_dependency(subnet_group)
+
+        if cache.cluster_mode:
+            # Output the configuration endpoint (cluster-aware clients discover shards from it)
+            CfnOutput(
+                self, "CacheConfigurationEndpoint",
+                value=self.replication_group.attr_configuration_end_point_address,
+                description="ElastiCache Configuration Endpoint",
+                export_name="CacheConfigurationEndpoint"
+            )
+        else:
+            # Output the primary endpoint for writes
+            CfnOutput(
+                self, "CachePrimaryEndpoint",
+                value=self.replication_group.attr_primary_end_point_address,
+                description="ElastiCache Primary Endpoint",
+                export_name="CachePrimaryEndpoint"
+            )
+
+            # Output the reader endpoint to spread reads over the replicas
+            CfnOutput(
+                self, "CacheReaderEndpoint",
+                value=self.replication_group.attr_reader_end_point_address,
+                description="ElastiCache Reader Endpoint",
+                export_name="CacheReaderEndpoint"
+            )
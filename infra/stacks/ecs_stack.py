@@ -1,54 +1,219 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
 from aws_cdk import (
     aws_autoscaling as autoscaling,
     aws_ec2 as ec2,
     aws_elasticloadbalancingv2 as elbv2,
     aws_ecs as ecs,
     aws_iam as iam,
-    App, CfnOutput, Duration, Stack
+    CfnOutput, Duration, Stack
 )
 from constructs import Construct
 
+
+# Fargate CPU units and the memory sizes (MiB) each supports
+FARGATE_TASK_SIZES = {
+    256: (512, 1024, 2048),
+    512: tuple(range(1024, 4096 + 1, 1024)),
+    1024: tuple(range(2048, 8192 + 1, 1024)),
+    2048: tuple(range(4096, 16384 + 1, 1024)),
+    4096: tuple(range(8192, 30720 + 1, 1024)),
+    8192: tuple(range(16384, 61440 + 1, 4096)),
+    16384: tuple(range(32768, 122880 + 1, 8192)),
+}
+
+# Network interfaces per container instance. Each awsvpc task takes one; the
+# primary interface stays with the instance
+MAX_ENIS = {
+    "t3.medium": 3, "t3.large": 3, "t3.xlarge": 4, "t3.2xlarge": 4,
+    **{f"{family}.{size}": enis
+       for family in ("c6i", "m6i", "c7g", "m7g")
+       for size, enis in (("large", 3), ("xlarge", 4), ("2xlarge", 4), ("4xlarge", 8))},
+}
+
+
+def fargate_task_size(container_cpu: int, container_memory_mib: int) -> Tuple[int, int]:
+    """
+    Smallest valid Fargate (cpu, memory MiB) that fits the container.
+
+    Raises ValueError if the container is larger than any Fargate task size.
+    """
+    for cpu, memory_sizes in FARGATE_TASK_SIZES.items():
+        if cpu < container_cpu:
+            continue
+        for memory in memory_sizes:
+            if memory >= container_memory_mib:
+                return cpu, memory
+    raise ValueError(
+        f"No Fargate task size fits {container_cpu} CPU units and {container_memory_mib} MiB"
+    )
+
+
+@dataclass(frozen=True)
+class CapacityProviderWeight:
+    """
+    Share of a service's tasks on one capacity provider.
+
+    `base` tasks are placed on the provider first; tasks beyond all bases are
+    split in proportion to `weight`.
+    """
+    base: int = 0
+    weight: int = 1
+
+    def validate(self, name: str) -> None:
+        if not 0 <= self.base <= 100000:
+            raise ValueError(f"{name} base must be in [0, 100000], got {self.base}")
+        if not 0 <= self.weight <= 1000:
+            raise ValueError(f"{name} weight must be in [0, 1000], got {self.weight}")
+
+
+@dataclass(frozen=True)
+class FargateBurstProps:
+    """
+    Fargate service that absorbs bursts while EC2 capacity catches up.
+
+    ECS does not allow Auto Scaling group and Fargate capacity providers in
+    one strategy, so burst tasks run as a second service in the same target
+    group. It scales out on requests per target once load passes
+    `requests_per_target` (default: 125% of the EC2 service target), which
+    only happens while the EC2 service is behind, and scales back in as EC2
+    tasks take over.
+    """
+    fargate: CapacityProviderWeight = CapacityProviderWeight(base=0, weight=1)
+    fargate_spot: CapacityProviderWeight = CapacityProviderWeight(base=0, weight=3)
+    min_tasks: int = 0
+    max_tasks: int = 10
+    requests_per_target: Optional[int] = None
+
+    def validate(self) -> None:
+        self.fargate.validate("fargate")
+        self.fargate_spot.validate("fargate_spot")
+        if self.fargate.weight + self.fargate_spot.weight == 0:
+            raise ValueError("At least one of fargate and fargate_spot needs a positive weight")
+        if not 0 <= self.min_tasks <= self.max_tasks:
+            raise ValueError(f"Task bounds must satisfy 0 <= min <= max, got {self.min_tasks}/{self.max_tasks}")
+
+
+@dataclass(frozen=True)
+class EcsServiceProps:
+    """
+    Container service sizing and scaling.
+
+    Tasks use awsvpc networking and register as IP targets, so every task
+    takes an ENI on its container instance; validate() rejects a `max_tasks`
+    the instances cannot hold at `max_instances`. `container_port` is the
+    port the image listens on (80 for the sample image); deploy VPCStack
+    with `app_port` and ALBStack with `target_port` set to it.
+    """
+    container_image: str = "amazon/amazon-ecs-sample"
+    container_port: int = 80
+    task_cpu: int = 256
+    task_memory_mib: int = 512
+    min_tasks: int = 2
+    max_tasks: int = 8
+    # Service autoscaling targets; None disables that policy
+    cpu_target_percent: Optional[float] = 60
+    memory_target_percent: Optional[float] = 75
+    requests_per_target: Optional[int] = 500
+    instance_type: str = "t3.medium"
+    min_instances: int = 1
+    max_instances: int = 4
+    # awsvpc tasks one instance holds; None derives it from MAX_ENIS. Set it
+    # with ENI trunking or for instance types MAX_ENIS does not list
+    tasks_per_instance: Optional[int] = None
+    # Managed scaling keeps the cluster at this share of reserved capacity
+    target_capacity_percent: int = 90
+    # "memory" or "cpu": the resource tasks are packed on
+    binpack_on: str = "memory"
+    spread_across_azs: bool = True
+    ec2: CapacityProviderWeight = CapacityProviderWeight(base=0, weight=1)
+
+    def validate(self) -> None:
+        self.ec2.validate("ec2")
+        if not 1 <= self.min_tasks <= self.max_tasks:
+            raise ValueError(f"Task bounds must satisfy 1 <= min <= max, got {self.min_tasks}/{self.max_tasks}")
+        if not 0 <= self.min_instances <= self.max_instances:
+            raise ValueError(
+                f"Instance bounds must satisfy 0 <= min <= max, got {self.min_instances}/{self.max_instances}"
+            )
+        if not 1 <= self.target_capacity_percent <= 100:
+            raise ValueError(f"target_capacity_percent must be in [1, 100], got {self.target_capacity_percent}")
+        if self.binpack_on not in ("memory", "cpu"):
+            raise ValueError(f"binpack_on must be 'memory' or 'cpu', got {self.binpack_on!r}")
+        ec2_tasks = self.max_ec2_tasks()
+        if ec2_tasks < self.max_tasks:
+            raise ValueError(
+                f"{self.max_instances} {self.instance_type} instances have ENIs for {ec2_tasks} awsvpc tasks, "
+                f"but max_tasks is {self.max_tasks}; raise max_instances, use a larger instance type "
+                f"or lower max_tasks"
+            )
+
+    def max_ec2_tasks(self) -> int:
+        """awsvpc tasks the EC2 capacity holds at max_instances."""
+        if self.tasks_per_instance is not None:
+            return self.tasks_per_instance * self.max_instances
+        if self.instance_type not in MAX_ENIS:
+            raise ValueError(
+                f"No ENI limit known for {self.instance_type!r}; set tasks_per_instance, "
+                f"or use one of {sorted(MAX_ENIS)}"
+            )
+        return (MAX_ENIS[self.instance_type] - 1) * self.max_instances
+
+
 class EcsStack(Stack):
-    def __init__(self, scope: Construct, id: str, **kwargs) -> None:
-        super().__init__(scope, id, **kwargs)
-
-        # Create VPC with 2 Availability Zones
-        vpc = ec2.Vpc(
-            self, "MyVpc",
-            max_azs=2,
-            nat_gateways=1,
-            subnet_configuration=[
-                ec2.SubnetConfiguration(
-                    name="Public",
-                    subnet_type=ec2.SubnetType.PUBLIC,
-                    cidr_mask=24
-                ),
-                ec2.SubnetConfiguration(
-                    name="Private",
-                    subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS,
-                    cidr_mask=24
-                )
-            ]
-        )
+    """
+    ECS Stack, the container compute backend (alternative to ASG Stack).
+
+    This stack:
+    1. Runs an ECS cluster on EC2 capacity in the private subnets
+       - Capacity provider with managed scaling to a target capacity
+       - Managed termination protection, so scale-in never drains running tasks
+
+    2. Runs the application as an ECS service behind the shared ALB
+       - awsvpc tasks with the app security group, registered as IP targets
+       - Tasks packed on memory (or CPU), spread across AZs first
+
+    3. Scales the service on CPU, memory and ALB requests per target
+
+    4. Optionally runs a Fargate / Fargate Spot burst service
+       - Same container and target group, sized to a valid Fargate task size
+       - Takes bursts within seconds while EC2 instances launch
+
+    Dependencies:
+    - VPC Stack (network, subnets, security groups)
+    - ALB Stack (target group with IP target type)
+    """
+    def __init__(self, scope: Construct, construct_id: str,
+                 vpc: ec2.Vpc,
+                 target_group: elbv2.ApplicationTargetGroup,
+                 app_security_group: ec2.SecurityGroup,
+                 service: Optional[EcsServiceProps] = None,
+                 burst: Optional[FargateBurstProps] = None,
+                 **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        service = service or EcsServiceProps()
+        service.validate()
+        if burst is not None:
+            burst.validate()
 
         # Create ECS cluster in the VPC
-        cluster = ecs.Cluster(
+        self.cluster = ecs.Cluster(
             self, 'EcsCluster',
             vpc=vpc,
-            container_insights=True
+            container_insights=True,
+            # Registers the FARGATE and FARGATE_SPOT capacity providers
+            enable_fargate_capacity_providers=burst is not None
         )
 
-        
-        # Create Auto Scaling Group for ECS cluster
+        # Create Auto Scaling Group for ECS cluster; the capacity provider sets its size
         asg = autoscaling.AutoScalingGroup(
             self, "DefaultAutoScalingGroup",
             vpc=vpc,
             launch_template=ec2.LaunchTemplate(
                 self, "LaunchTemplate",
-                instance_type=ec2.InstanceType.of(
-                    ec2.InstanceClass.BURSTABLE3,
-                    ec2.InstanceSize.MICRO
-                ),
+                instance_type=ec2.InstanceType(service.instance_type),
                 machine_image=ecs.EcsOptimizedImage.amazon_linux2023(),
                 user_data=ec2.UserData.for_linux(),
                 role=iam.Role(
@@ -60,22 +225,24 @@ class EcsStack(Stack):
                     ]
                 )
             ),
-            min_capacity=1,
-            max_capacity=4,
-            desired_capacity=2,
+            min_capacity=service.min_instances,
+            max_capacity=service.max_instances,
             vpc_subnets=ec2.SubnetSelection(
-                subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS
+                subnets=vpc.private_subnets
             )
         )
 
-        # Add capacity provider to the cluster
+        # Add capacity provider to the cluster; managed scaling adds instances
+        # when tasks cannot be placed and removes them once they are empty
         capacity_provider = ecs.AsgCapacityProvider(
             self, "AsgCapacityProvider",
             auto_scaling_group=asg,
+            enable_managed_scaling=True,
+            target_capacity_percent=service.target_capacity_percent,
             enable_managed_termination_protection=True,
-            capacity_provider_name="my-ecs-capacity-provider"
+            capacity_provider_name="app-capacity-provider"
         )
-        cluster.add_asg_capacity_provider(capacity_provider)
+        self.cluster.add_asg_capacity_provider(capacity_provider)
 
         # Create ECS Task Definition
         task_definition = ecs.Ec2TaskDefinition(
@@ -86,96 +253,176 @@ class EcsStack(Stack):
         # Add container to task definition
         container = task_definition.add_container(
             "web",
-            image=ecs.ContainerImage.from_registry("amazon/amazon-ecs-sample"),
-            memory_limit_mib=256,
-            cpu=256,
+            image=ecs.ContainerImage.from_registry(service.container_image),
+            memory_limit_mib=service.task_memory_mib,
+            cpu=service.task_cpu,
             essential=True
         )
 
         # Add port mapping
         container.add_port_mappings(
             ecs.PortMapping(
-                container_port=80,
+                container_port=service.container_port,
                 protocol=ecs.Protocol.TCP
             )
         )
 
-        # Create security group for the ECS service
-        service_sg = ec2.SecurityGroup(
-            self, "ServiceSG",
-            vpc=vpc,
-            description="Security group for ECS service",
-            allow_all_outbound=True
+        # Spread over AZs for availability, then fill instances before using new ones
+        placement_strategies = []
+        if service.spread_across_azs:
+            placement_strategies.append(
+                ecs.PlacementStrategy.spread_across(ecs.BuiltInAttributes.AVAILABILITY_ZONE)
+            )
+        placement_strategies.append(
+            ecs.PlacementStrategy.packed_by_memory() if service.binpack_on == "memory"
+            else ecs.PlacementStrategy.packed_by_cpu()
         )
 
-        # Create Application Load Balancer
-        alb = elbv2.ApplicationLoadBalancer(
-            self, "ALB",
-            vpc=vpc,
-            internet_facing=True,
+        # Create ECS Service in the private subnets with the shared app security group
+        self.service = ecs.Ec2Service(
+            self, "Service",
+            cluster=self.cluster,
+            task_definition=task_definition,
+            desired_count=service.min_tasks,
+            security_groups=[app_security_group],
             vpc_subnets=ec2.SubnetSelection(
-                subnet_type=ec2.SubnetType.PUBLIC
-            )
+                subnets=vpc.private_subnets
+            ),
+            capacity_provider_strategies=[
+                ecs.CapacityProviderStrategy(
+                    capacity_provider=capacity_provider.capacity_provider_name,
+                    base=service.ec2.base or None,
+                    weight=service.ec2.weight
+                )
+            ],
+            placement_strategies=placement_strategies,
+            circuit_breaker=ecs.DeploymentCircuitBreaker(rollback=True)
         )
 
-        # Add listener to ALB
-        listener = alb.add_listener(
-            "Listener",
-            port=80,
-            open=True
+        # Register tasks as IP targets in the shared ALB target group
+        self.service.attach_to_application_target_group(target_group)
+
+        self._add_service_scaling(service, target_group)
+
+        self.burst_service = None
+        if burst is not None:
+            self._add_burst_service(service, burst, target_group, app_security_group, vpc)
+
+        # Output the cluster and service names
+        CfnOutput(
+            self, "ClusterName",
+            value=self.cluster.cluster_name,
+            description="ECS cluster name"
         )
 
-        # Create target group
-        target_group = elbv2.ApplicationTargetGroup(
-            self, "TargetGroup",
-            vpc=vpc,
-            port=80,
-            protocol=elbv2.ApplicationProtocol.HTTP,
-            target_type=elbv2.TargetType.IP,
-            health_check=elbv2.HealthCheck(
-                path="/",
-                interval=Duration.seconds(30),
-                timeout=Duration.seconds(5),
-                healthy_threshold_count=2,
-                unhealthy_threshold_count=3
-            )
+        CfnOutput(
+            self, "ServiceName",
+            value=self.service.service_name,
+            description="ECS service name"
         )
 
-        # Create ECS Service
-        service = ecs.Ec2Service(
-            self, "Service",
-            cluster=cluster,
-            task_definition=task_definition,
-            desired_count=2,
-            security_groups=[service_sg],
-            vpc_subnets=ec2.SubnetSelection(
-                subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS
+        if self.burst_service is not None:
+            CfnOutput(
+                self, "BurstServiceName",
+                value=self.burst_service.service_name,
+                description="Fargate burst service name"
             )
+
+    def _add_service_scaling(self, service: EcsServiceProps,
+                             target_group: elbv2.ApplicationTargetGroup) -> None:
+        """Target tracking on CPU, memory and ALB requests per task."""
+        task_count = self.service.auto_scale_task_count(
+            min_capacity=service.min_tasks,
+            max_capacity=service.max_tasks
         )
 
-        # Add service to target group
-        target_group.add_target(service)
+        if service.cpu_target_percent is not None:
+            task_count.scale_on_cpu_utilization(
+                "CpuScaling",
+                target_utilization_percent=service.cpu_target_percent,
+                scale_out_cooldown=Duration.seconds(60),
+                scale_in_cooldown=Duration.seconds(300)
+            )
 
-        # Add target group to listener
-        listener.add_target_groups(
-            "DefaultTargetGroup",
-            target_groups=[target_group]
-        )
+        if service.memory_target_percent is not None:
+            task_count.scale_on_memory_utilization(
+                "MemoryScaling",
+                target_utilization_percent=service.memory_target_percent,
+                scale_out_cooldown=Duration.seconds(60),
+                scale_in_cooldown=Duration.seconds(300)
+            )
+
+        if service.requests_per_target is not None:
+            task_count.scale_on_request_count(
+                "RequestCountScaling",
+                requests_per_target=service.requests_per_target,
+                target_group=target_group,
+                scale_out_cooldown=Duration.seconds(60),
+                scale_in_cooldown=Duration.seconds(300)
+            )
 
-        # Allow traffic from ALB to ECS service
-        service_sg.add_ingress_rule(
-            peer=ec2.Peer.security_group_id(alb.connections.security_groups[0].security_group_id),
-            connection=ec2.Port.tcp(80),
-            description="Allow traffic from ALB"
+    def _add_burst_service(self, service: EcsServiceProps,
+                           burst: FargateBurstProps,
+                           target_group: elbv2.ApplicationTargetGroup,
+                           app_security_group: ec2.SecurityGroup,
+                           vpc: ec2.Vpc) -> None:
+        """Fargate / Fargate Spot service behind the same target group."""
+        # Fargate only accepts fixed CPU/memory combinations
+        task_cpu, task_memory = fargate_task_size(service.task_cpu, service.task_memory_mib)
+        task_definition = ecs.FargateTaskDefinition(
+            self, "BurstTaskDef",
+            cpu=task_cpu,
+            memory_limit_mib=task_memory
+        )
+        container = task_definition.add_container(
+            "web",
+            image=ecs.ContainerImage.from_registry(service.container_image),
+            memory_limit_mib=service.task_memory_mib,
+            cpu=service.task_cpu,
+            essential=True
+        )
+        container.add_port_mappings(
+            ecs.PortMapping(
+                container_port=service.container_port,
+                protocol=ecs.Protocol.TCP
+            )
         )
 
-        # Output the ALB DNS name
-        CfnOutput(
-            self, "LoadBalancerDNS",
-            value=f"http://{alb.load_balancer_dns_name}"
+        strategies = [
+            ecs.CapacityProviderStrategy(
+                capacity_provider=name,
+                base=weight.base or None,
+                weight=weight.weight
+            )
+            for name, weight in (("FARGATE", burst.fargate), ("FARGATE_SPOT", burst.fargate_spot))
+            if weight.base or weight.weight
+        ]
+
+        self.burst_service = ecs.FargateService(
+            self, "BurstService",
+            cluster=self.cluster,
+            task_definition=task_definition,
+            desired_count=burst.min_tasks,
+            security_groups=[app_security_group],
+            vpc_subnets=ec2.SubnetSelection(
+                subnets=vpc.private_subnets
+            ),
+            capacity_provider_strategies=strategies,
+            circuit_breaker=ecs.DeploymentCircuitBreaker(rollback=True)
         )
+        self.burst_service.attach_to_application_target_group(target_group)
 
-# Create the app and stack
-app = App()
-EcsStack(app, "EcsStack")
-app.synth() 
\ No newline at end of file
+        # Scale on the same target group metric, above the EC2 service target,
+        # so burst tasks only run while the EC2 service is behind
+        requests_per_target = burst.requests_per_target or int((service.requests_per_target or 500) * 1.25)
+        task_count = self.burst_service.auto_scale_task_count(
+            min_capacity=burst.min_tasks,
+            max_capacity=burst.max_tasks
+        )
+        task_count.scale_on_request_count(
+            "BurstRequestCountScaling",
+            requests_per_target=requests_per_target,
+            target_group=target_group,
+            scale_out_cooldown=Duration.seconds(30),
+            scale_in_cooldown=Duration.seconds(120)
+        )
@@ -0,0 +1,253 @@
+from dataclasses import dataclass, field, fields, is_dataclass, replace
+from enum import Enum
+import json
+import math
+import typing
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from aws_cdk import aws_codebuild as codebuild, aws_ec2 as ec2
+
+from stacks.alb_stack import AlbTuningProps, EdgeCacheProps
+from stacks.asg_stack import AsgScalingProps, Gp3VolumeProps, LaunchOptionsProps, MixedInstancesProps
+from stacks.ecs_stack import EcsServiceProps, FargateBurstProps
+from stacks.cache_stack import CacheProps
+from stacks.pipeline_stack import BuildProps
+from stacks.rds_parameter_profiles import default_max_connections, instance_spec, resolve_parameter_profile
+from stacks.rds_stack import CapacityMode, CapacityProps, InstrumentationProps, ProxyProps, ReaderFleetProps
+from stacks.subnet_planner import SubnetPlan, SubnetPlanProps, TierDemand, plan_subnets
+from stacks.vpc_stack import (
+    INTERFACE_ENDPOINTS, ISOLATED_SUBNETS, PRIVATE_SUBNETS, PUBLIC_SUBNETS, EgressProps
+)
+
+# Load balancer nodes need at least 8 free addresses per subnet, plus a NAT gateway
+PUBLIC_ADDRESSES_PER_AZ = 9
+
+
+@dataclass(frozen=True)
+class DatabaseSizing:
+    """Aurora writer/reader sizing (see RDSStack)."""
+    instance_type: str = "t4g.medium"
+    parameter_profile: Optional[str] = None
+    readers: Optional[ReaderFleetProps] = None
+    capacity: CapacityProps = field(default_factory=CapacityProps)
+    # Performance Insights, Enhanced Monitoring and log exports; None disables them
+    instrumentation: Optional[InstrumentationProps] = None
+    # RDS Proxy in front of the writer; None connects the app to the cluster
+    proxy: Optional[ProxyProps] = None
+
+    def max_connections(self) -> int:
+        """Connections the writer accepts: the parameter profile's, else Aurora's default."""
+        if self.capacity.writer is CapacityMode.SERVERLESS:
+            # About 2 GiB per ACU; max_connections follows the maximum capacity
+            return default_max_connections(self.capacity.max_acu * 2)
+        instance_type = ec2.InstanceType(self.instance_type)
+        if self.parameter_profile is not None:
+            return resolve_parameter_profile(self.parameter_profile, instance_type).max_connections
+        return default_max_connections(instance_spec(instance_type)[1])
+
+
+@dataclass(frozen=True)
+class EnvironmentProfile:
+    """
+    Sizing for every stack in one environment.
+
+    `db_connections_per_app_server` and `db_connections_per_task` are the
+    application's connection pool sizes; at full scale-out the pools must fit
+    the writer's max_connections.
+    """
+    name: str
+    max_azs: int = 2
+    vpc_cidr: str = "10.10.0.0/16"
+    address_growth_factor: float = 2.0
+    egress: EgressProps = field(default_factory=EgressProps)
+    app_instance_type: str = "t3.micro"
+    app_scaling: AsgScalingProps = field(default_factory=AsgScalingProps)
+    # With a mixed instances policy, app_scaling capacities count vCPUs
+    app_mixed_instances: Optional[MixedInstancesProps] = None
+    app_launch_options: LaunchOptionsProps = field(default_factory=LaunchOptionsProps)
+    ecs_service: EcsServiceProps = field(default_factory=EcsServiceProps)
+    ecs_burst: Optional[FargateBurstProps] = field(default_factory=FargateBurstProps)
+    database: DatabaseSizing = field(default_factory=DatabaseSizing)
+    cache: CacheProps = field(default_factory=CacheProps)
+    alb_tuning: AlbTuningProps = field(default_factory=AlbTuningProps)
+    # CloudFront in front of the ALB; also restricts the ALB to CloudFront
+    edge_cache: Optional[EdgeCacheProps] = None
+    build: BuildProps = field(default_factory=BuildProps)
+    db_connections_per_app_server: int = 20
+    db_connections_per_task: int = 4
+
+    @property
+    def max_app_servers(self) -> int:
+        """App server instances at maximum capacity, when every instance is the smallest weight."""
+        if self.app_mixed_instances is None:
+            return self.app_scaling.max_capacity
+        return math.ceil(self.app_scaling.max_capacity / self.app_mixed_instances.min_weight)
+
+    def max_app_connections(self, compute_backend: str) -> int:
+        """Database connections the application opens at maximum capacity."""
+        if compute_backend == "ecs":
+            tasks = self.ecs_service.max_tasks + (self.ecs_burst.max_tasks if self.ecs_burst else 0)
+            return tasks * self.db_connections_per_task
+        return self.max_app_servers * self.db_connections_per_app_server
+
+    def subnet_demand(self, compute_backend: str) -> List[Tuple[str, TierDemand]]:
+        """Addresses each subnet tier needs at maximum capacity."""
+        if compute_backend == "ecs":
+            # awsvpc: every task has its own ENI next to the container instances
+            burst_tasks = self.ecs_burst.max_tasks if self.ecs_burst else 0
+            compute = self.ecs_service.max_instances + self.ecs_service.max_tasks + burst_tasks
+        else:
+            compute = self.max_app_servers
+        endpoints = len(INTERFACE_ENDPOINTS) if self.egress.interface_endpoints else 0
+        readers = self.database.readers.max_capacity if self.database.readers else 0
+        cache_nodes = self.cache.shards * (1 + self.cache.replicas_per_shard)
+        return [
+            (PUBLIC_SUBNETS, TierDemand(per_az=PUBLIC_ADDRESSES_PER_AZ)),
+            (PRIVATE_SUBNETS, TierDemand(spread=compute, per_az=endpoints)),
+            (ISOLATED_SUBNETS, TierDemand(spread=1 + readers + cache_nodes)),
+        ]
+
+    def subnet_plan(self, compute_backend: str) -> SubnetPlan:
+        """Subnet sizes for this profile; raises ValueError when they don't fit `vpc_cidr`."""
+        return plan_subnets(
+            SubnetPlanProps(
+                vpc_cidr=self.vpc_cidr,
+                az_count=self.max_azs,
+                growth_factor=self.address_growth_factor
+            ),
+            self.subnet_demand(compute_backend)
+        )
+
+    def validate(self, compute_backend: str) -> None:
+        # Aurora and the ALB need subnets in at least two AZs
+        if self.max_azs < 2:
+            raise ValueError(f"Profile {self.name!r}: max_azs must be at least 2, got {self.max_azs}")
+        self.app_scaling.validate()
+        if self.app_mixed_instances is not None:
+            self.app_mixed_instances.validate()
+        self.app_launch_options.validate()
+        self.ecs_service.validate()
+        if self.ecs_burst is not None:
+            self.ecs_burst.validate()
+        self.database.capacity.validate()
+        if self.database.readers is not None:
+            self.database.readers.validate()
+        if self.database.instrumentation is not None:
+            self.database.instrumentation.validate()
+        if self.database.proxy is not None:
+            self.database.proxy.validate()
+        self.cache.validate()
+        self.alb_tuning.validate()
+        if self.edge_cache is not None:
+            self.edge_cache.validate()
+        self.build.validate()
+        self.subnet_plan(compute_backend)
+
+        max_connections = self.database.max_connections()
+        app_connections = self.max_app_connections(compute_backend)
+        if app_connections > max_connections:
+            raise ValueError(
+                f"Profile {self.name!r}: at maximum capacity the {compute_backend} backend opens "
+                f"{app_connections} database connections, but the writer accepts {max_connections}; "
+                f"lower the maximum capacity or pool size, or use a larger database"
+            )
+
+
+PROFILES: Dict[str, EnvironmentProfile] = {
+    profile.name: profile
+    for profile in (
+        # Smallest footprint: single NAT, single DB instance
+        EnvironmentProfile(name="dev"),
+        EnvironmentProfile(
+            name="staging",
+            app_instance_type="t3.medium",
+            egress=EgressProps(interface_endpoints=True),
+            app_scaling=AsgScalingProps(min_capacity=2, max_capacity=4, desired_capacity=2),
+            database=DatabaseSizing(
+                instance_type="t4g.large",
+                parameter_profile="oltp-small",
+                readers=ReaderFleetProps(instances=1, min_capacity=1, max_capacity=2)
+            ),
+            cache=CacheProps(node_type="cache.t4g.small")
+        ),
+        # Three AZs, NAT per AZ, non-burstable Graviton-first app servers with
+        # on-demand base capacity and Spot above it (capacities in vCPUs)
+        EnvironmentProfile(
+            name="prod",
+            max_azs=3,
+            egress=EgressProps(nat_per_az=True, interface_endpoints=True),
+            app_instance_type="c6i.large",
+            app_scaling=AsgScalingProps(min_capacity=6, max_capacity=24, desired_capacity=6),
+            app_mixed_instances=MixedInstancesProps(on_demand_base_capacity=6, on_demand_percentage_above_base=50),
+            app_launch_options=LaunchOptionsProps(
+                root_volume=Gp3VolumeProps(20, iops=3000, throughput_mibps=250),
+                detailed_monitoring=True,
+                require_imdsv2=True
+            ),
+            ecs_service=EcsServiceProps(min_tasks=3, max_tasks=30, instance_type="c6i.xlarge",
+                                        min_instances=3, max_instances=12),
+            ecs_burst=FargateBurstProps(max_tasks=30),
+            database=DatabaseSizing(
+                instance_type="r6g.large",
+                parameter_profile="oltp-large",
+                readers=ReaderFleetProps(instances=1, min_capacity=1, max_capacity=3),
+                instrumentation=InstrumentationProps(),
+                proxy=ProxyProps()
+            ),
+            # A replica per AZ; reads spread over the reader endpoint
+            cache=CacheProps(node_type="cache.r7g.large", replicas_per_shard=2),
+            # Longer drain for in-flight requests during scale-in and deploys
+            alb_tuning=AlbTuningProps(deregistration_delay_seconds=60),
+            build=BuildProps(synth_compute_type=codebuild.ComputeType.LARGE)
+        ),
+    )
+}
+
+
+def load_profile(name_or_path: str) -> EnvironmentProfile:
+    """
+    Look up a named profile, or load a custom one from a JSON file.
+
+    The file names a `base` profile (default "dev") and overrides its fields;
+    nested props are merged field by field and enums are given by member
+    name, e.g. {"name": "perf", "base": "prod", "app_scaling": {"max_capacity": 20},
+    "build": {"synth_compute_type": "X_LARGE"}}.
+    """
+    if name_or_path in PROFILES:
+        return PROFILES[name_or_path]
+    if not name_or_path.endswith(".json"):
+        raise ValueError(f"Unknown profile {name_or_path!r}, expected one of {sorted(PROFILES)} or a .json file")
+    with open(name_or_path) as profile_file:
+        overrides = json.load(profile_file)
+    base = overrides.pop("base", "dev")
+    if base not in PROFILES:
+        raise ValueError(f"Unknown base profile {base!r}, expected one of {sorted(PROFILES)}")
+    return _merge(PROFILES[base], overrides)
+
+
+def _merge(props: Any, overrides: Mapping[str, Any]) -> Any:
+    hints = typing.get_type_hints(type(props))
+    names = {f.name for f in fields(props)}
+    changes = {}
+    for name, value in overrides.items():
+        if name not in names:
+            raise ValueError(f"{type(props).__name__} has no field {name!r}")
+        changes[name] = _convert(hints[name], getattr(props, name), value)
+    return replace(props, **changes)
+
+
+def _convert(hint: Any, current: Any, value: Any) -> Any:
+    if value is None:
+        return None
+    # Optional[X] -> X
+    args = [arg for arg in typing.get_args(hint) if arg is not type(None)]
+    if typing.get_origin(hint) is typing.Union and len(args) == 1:
+        hint = args[0]
+    if is_dataclass(hint) and isinstance(value, dict):
+        return _merge(current if current is not None else hint(), value)
+    if isinstance(hint, type) and issubclass(hint, Enum):
+        return hint[value]
+    if typing.get_origin(hint) is tuple:
+        item_type = typing.get_args(hint)[0]
+        return tuple(item_type(**item) if is_dataclass(item_type) else item for item in value)
+    return value
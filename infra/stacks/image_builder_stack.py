@@ -0,0 +1,270 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+import hashlib
+import json
+
+from aws_cdk import (
+    Stack,
+    aws_ec2 as ec2,
+    aws_iam as iam,
+    aws_imagebuilder as imagebuilder,
+    custom_resources as cr,
+    CfnOutput
+)
+from constructs import Construct
+
+from stacks.asg_stack import BAKED_APPLICATION_PATH, USERDATA_PATH
+
+# Agents baked into the AMI, installed at build time and checked by validation
+AGENT_PACKAGES = ("aws-cfn-bootstrap", "amazon-cloudwatch-agent")
+# Latest Amazon Linux 2023 image managed by Image Builder
+PARENT_IMAGE_NAME = "amazon-linux-2023-x86/x.x.x"
+
+
+def content_hash(*parts: str) -> str:
+    """Short SHA-256 of `parts`, used to name immutable Image Builder resources."""
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()[:8]
+
+
+@dataclass(frozen=True)
+class ImageBuilderProps:
+    """
+    AMI build settings.
+
+    A new AMI is built on `schedule_expression` (when the parent image or
+    components have updates) and whenever the baked content changes on deploy.
+    """
+    ami_parameter_name: str = "/app-server/ami-id"
+    schedule_expression: str = "cron(0 3 ? * SUN *)"
+    build_instance_types: Tuple[str, ...] = ("t3.small",)
+    version: str = "1.0.0"
+
+
+class ImageBuilderStack(Stack):
+    """
+    Image Builder Stack for the application server AMI.
+
+    This stack:
+    1. Bakes the application into an Amazon Linux 2023 AMI
+       - aws-cfn-bootstrap and the CloudWatch agent
+       - application/userdata.sh, run unchanged at build time
+
+    2. Builds on a schedule and on deploys that change the baked content
+       - Build instances run in the private subnets with the app security group
+
+    3. Publishes the latest AMI ID to an SSM parameter
+       - ASG Stack launches from it (`ami_parameter_name`); EC2 resolves it at
+         each launch, so new builds reach new instances without a deploy
+       - Created at the stock AMI, then only written by Image Builder, so
+         deploys never roll it back; until the first build publishes, the
+         app servers run the full setup at boot
+
+    Dependencies:
+    - VPC Stack (network, subnets, security groups)
+    """
+    def __init__(self, scope: Construct, construct_id: str,
+                 vpc: ec2.Vpc,
+                 app_security_group: ec2.SecurityGroup,
+                 image: Optional[ImageBuilderProps] = None,
+                 **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        image = image or ImageBuilderProps()
+        self.ami_parameter_name = image.ami_parameter_name
+
+        with open(USERDATA_PATH, "r") as f:
+            application_script = f.read()
+
+        # Build document: install the agents, then run the application script as-is
+        component_document = "\n".join([
+            "name: AppServer",
+            "schemaVersion: 1.0",
+            "phases:",
+            "  - name: build",
+            "    steps:",
+            "      - name: InstallAgents",
+            "        action: ExecuteBash",
+            "        inputs:",
+            "          commands:",
+            f"            - dnf install -y {' '.join(AGENT_PACKAGES)}",
+            "            - systemctl enable amazon-cloudwatch-agent",
+            "      - name: WriteApplicationScript",
+            "        action: CreateFile",
+            "        inputs:",
+            f"          - path: {BAKED_APPLICATION_PATH}",
+            "            permissions: '0755'",
+            "            overwrite: true",
+            "            content: |",
+            *[f"              {line}" for line in application_script.splitlines()],
+            "      - name: RunApplicationScript",
+            "        action: ExecuteBash",
+            "        inputs:",
+            "          commands:",
+            f"            - {BAKED_APPLICATION_PATH}",
+            "  - name: validate",
+            "    steps:",
+            "      - name: CheckAgents",
+            "        action: ExecuteBash",
+            "        inputs:",
+            "          commands:",
+            f"            - rpm -q {' '.join(AGENT_PACKAGES)}",
+        ])
+
+        # Components and recipes are immutable per version, so names carry a
+        # hash of everything they are built from
+        component_hash = content_hash(component_document)
+        recipe_hash = content_hash(component_document, PARENT_IMAGE_NAME, image.version)
+
+        component = imagebuilder.CfnComponent(
+            self, "AppServerComponent",
+            name=f"app-server-{component_hash}",
+            platform="Linux",
+            version=image.version,
+            data=component_document
+        )
+
+        recipe = imagebuilder.CfnImageRecipe(
+            self, "AppServerRecipe",
+            name=f"app-server-{recipe_hash}",
+            version=image.version,
+            parent_image=self.format_arn(
+                service="imagebuilder",
+                account="aws",
+                resource="image",
+                resource_name=PARENT_IMAGE_NAME
+            ),
+            components=[
+                imagebuilder.CfnImageRecipe.ComponentConfigurationProperty(
+                    component_arn=component.attr_arn
+                )
+            ]
+        )
+
+        # Build instances need SSM for Image Builder and nothing else
+        build_role = iam.Role(
+            self, "ImageBuilderInstanceRole",
+            assumed_by=iam.ServicePrincipal("ec2.amazonaws.com"),
+            managed_policies=[
+                iam.ManagedPolicy.from_aws_managed_policy_name("AmazonSSMManagedInstanceCore"),
+                iam.ManagedPolicy.from_aws_managed_policy_name("EC2InstanceProfileForImageBuilder")
+            ]
+        )
+        instance_profile = iam.CfnInstanceProfile(
+            self, "ImageBuilderInstanceProfile",
+            roles=[build_role.role_name]
+        )
+
+        infrastructure = imagebuilder.CfnInfrastructureConfiguration(
+            self, "AppServerInfrastructure",
+            name=f"{construct_id}-app-server",
+            instance_profile_name=instance_profile.ref,
+            instance_types=list(image.build_instance_types),
+            # Build in a private subnet with the same egress as the app servers
+            subnet_id=vpc.private_subnets[0].subnet_id,
+            security_group_ids=[app_security_group.security_group_id],
+            terminate_instance_on_failure=True
+        )
+
+        # Parameter the ASG reads. Image Builder owns its value: it is created at
+        # the stock AMI and never written by CloudFormation again, so deploys of
+        # this stack don't replace the latest build with the stock AMI.
+        create_parameter = cr.AwsSdkCall(
+            service="ssm",
+            action="putParameter",
+            parameters={
+                "Name": image.ami_parameter_name,
+                "Description": "Latest application server AMI built by Image Builder",
+                "Value": ec2.MachineImage.latest_amazon_linux2023().get_image(self).image_id,
+                "Type": "String",
+                "DataType": "aws:ec2:image",
+                "Overwrite": False
+            },
+            physical_resource_id=cr.PhysicalResourceId.of(image.ami_parameter_name),
+            # Kept from an earlier deployment of this stack
+            ignore_error_codes_matching="ParameterAlreadyExists"
+        )
+        cr.AwsCustomResource(
+            self, "AmiParameter",
+            on_create=create_parameter,
+            on_delete=cr.AwsSdkCall(
+                service="ssm",
+                action="deleteParameter",
+                parameters={"Name": image.ami_parameter_name},
+                ignore_error_codes_matching="ParameterNotFound"
+            ),
+            policy=cr.AwsCustomResourcePolicy.from_sdk_calls(
+                resources=[self.format_arn(
+                    service="ssm",
+                    resource="parameter",
+                    resource_name=image.ami_parameter_name.lstrip("/")
+                )]
+            )
+        )
+
+        distribution = imagebuilder.CfnDistributionConfiguration(
+            self, "AppServerDistribution",
+            name=f"{construct_id}-app-server",
+            distributions=[
+                imagebuilder.CfnDistributionConfiguration.DistributionProperty(
+                    region=self.region,
+                    ami_distribution_configuration={
+                        "Name": "app-server-{{ imagebuilder:buildDate }}"
+                    }
+                )
+            ]
+        )
+        # Publish each new AMI ID to the SSM parameter. DistributionProperty has no
+        # ssm_parameter_configurations as of aws-cdk-lib 2.192.0, so it is set raw.
+        distribution.add_property_override(
+            "Distributions.0.SsmParameterConfigurations",
+            [{"ParameterName": image.ami_parameter_name, "DataType": "aws:ec2:image"}]
+        )
+
+        self.image_pipeline = imagebuilder.CfnImagePipeline(
+            self, "AppServerImagePipeline",
+            name=f"{construct_id}-app-server",
+            image_recipe_arn=recipe.attr_arn,
+            infrastructure_configuration_arn=infrastructure.attr_arn,
+            distribution_configuration_arn=distribution.attr_arn,
+            schedule=imagebuilder.CfnImagePipeline.ScheduleProperty(
+                schedule_expression=image.schedule_expression,
+                pipeline_execution_start_condition="EXPRESSION_MATCH_AND_DEPENDENCY_UPDATES_AVAILABLE"
+            ),
+            image_tests_configuration=imagebuilder.CfnImagePipeline.ImageTestsConfigurationProperty(
+                image_tests_enabled=True,
+                timeout_minutes=60
+            )
+        )
+
+        # Start a build whenever a deploy changes the baked content
+        start_build = cr.AwsSdkCall(
+            service="imagebuilder",
+            action="startImagePipelineExecution",
+            parameters={
+                "imagePipelineArn": self.image_pipeline.attr_arn,
+                "clientToken": recipe_hash
+            },
+            physical_resource_id=cr.PhysicalResourceId.of(recipe_hash)
+        )
+        cr.AwsCustomResource(
+            self, "StartImageBuild",
+            on_create=start_build,
+            on_update=start_build,
+            policy=cr.AwsCustomResourcePolicy.from_sdk_calls(
+                resources=[self.image_pipeline.attr_arn]
+            )
+        )
+
+        # Output the pipeline ARN for manual or pipeline-triggered builds
+        CfnOutput(
+            self, "ImagePipelineArn",
+            value=self.image_pipeline.attr_arn,
+            description="Image Builder pipeline for the application server AMI"
+        )
+
+        CfnOutput(
+            self, "AmiParameterName",
+            value=image.ami_parameter_name,
+            description="SSM parameter holding the latest application server AMI ID",
+            export_name="AppServerAmiParameter"
+        )
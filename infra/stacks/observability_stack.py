@@ -0,0 +1,333 @@
+from dataclasses import dataclass
+import math
+from typing import List, Optional, Sequence
+
+from aws_cdk import (
+    Stack,
+    aws_autoscaling as autoscaling,
+    aws_cloudwatch as cloudwatch,
+    aws_cloudwatch_actions as cloudwatch_actions,
+    aws_ecs as ecs,
+    aws_elasticloadbalancingv2 as elbv2,
+    aws_rds as rds,
+    aws_sns as sns,
+    CfnOutput,
+    Duration
+)
+from constructs import Construct
+
+
+@dataclass(frozen=True)
+class AlarmThresholds:
+    """
+    Alarm thresholds.
+
+    An alarm fires when `datapoints_to_alarm` of the last `evaluation_periods`
+    one-minute periods breach. Metrics published every five minutes (EC2 CPU
+    without detailed monitoring) use five-minute periods instead.
+    """
+    latency_p90_seconds: float = 0.5
+    latency_p99_seconds: float = 1.5
+    error_rate_percent: float = 1.0
+    min_healthy_hosts: int = 1
+    db_cpu_percent: float = 80
+    # Share of max_connections; needs db_max_connections
+    db_connections_percent: float = 80
+    compute_cpu_percent: float = 85
+    # Minutes the ASG may sit at max capacity
+    at_max_capacity_minutes: int = 15
+    evaluation_periods: int = 5
+    datapoints_to_alarm: int = 3
+
+    def validate(self) -> None:
+        if not 0 < self.latency_p90_seconds <= self.latency_p99_seconds:
+            raise ValueError("Latency thresholds must satisfy 0 < p90 <= p99")
+        for name in ("error_rate_percent", "db_cpu_percent", "db_connections_percent", "compute_cpu_percent"):
+            if not 0 < getattr(self, name) <= 100:
+                raise ValueError(f"{name} must be in (0, 100], got {getattr(self, name)}")
+        if not 1 <= self.datapoints_to_alarm <= self.evaluation_periods:
+            raise ValueError("datapoints_to_alarm must be in [1, evaluation_periods]")
+
+
+class ObservabilityStack(Stack):
+    """
+    Observability Stack for the application.
+
+    This stack:
+    1. Builds one dashboard from the constructs of the other stacks
+       - ALB latency (p50/p90/p99), request rate, 5xx and healthy hosts
+       - Compute capacity (ASG or ECS service)
+       - Aurora CPU, connections and, with Performance Insights, DB load
+       - NAT gateway throughput and port allocation errors
+
+    2. Adds alarms with configurable thresholds
+       - Composite "latency regression" and "saturation" alarms notify the
+         alarm topic; the alarms they combine do not notify on their own
+       - Healthy host count below the minimum notifies directly
+
+    Dependencies:
+    - VPC Stack (NAT gateways)
+    - ALB Stack (load balancer, target group)
+    - RDS Stack (Aurora cluster)
+    - ASG Stack or ECS Stack (compute)
+    """
+    PERIOD = Duration.minutes(1)
+    # EC2 metrics without detailed monitoring
+    BASIC_MONITORING_PERIOD = Duration.minutes(5)
+
+    def __init__(self, scope: Construct, construct_id: str,
+                 alb: elbv2.ApplicationLoadBalancer,
+                 target_group: elbv2.ApplicationTargetGroup,
+                 aurora_cluster: rds.DatabaseCluster,
+                 nat_gateway_ids: Sequence[str],
+                 asg: Optional[autoscaling.AutoScalingGroup] = None,
+                 ecs_service: Optional[ecs.BaseService] = None,
+                 db_max_connections: Optional[int] = None,
+                 performance_insights: bool = False,
+                 asg_detailed_monitoring: bool = False,
+                 thresholds: Optional[AlarmThresholds] = None,
+                 **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        thresholds = thresholds or AlarmThresholds()
+        thresholds.validate()
+        self.thresholds = thresholds
+
+        # Composite alarms notify this topic; subscribe on-call endpoints to it
+        self.alarm_topic = sns.Topic(self, "AlarmTopic", display_name="Application alarms")
+
+        # --- Metrics ---
+        latency = {
+            stat: target_group.metrics.target_response_time(statistic=stat, period=self.PERIOD, label=stat)
+            for stat in ("p50", "p90", "p99")
+        }
+        requests = alb.metrics.request_count(period=self.PERIOD, label="Requests")
+        elb_5xx = alb.metrics.http_code_elb(elbv2.HttpCodeElb.ELB_5XX_COUNT, period=self.PERIOD, label="ELB 5xx")
+        target_5xx = target_group.metrics.http_code_target(
+            elbv2.HttpCodeTarget.TARGET_5XX_COUNT, period=self.PERIOD, label="Target 5xx"
+        )
+        error_rate = cloudwatch.MathExpression(
+            expression="100 * (FILL(elb5xx, 0) + FILL(target5xx, 0)) / requests",
+            using_metrics={"elb5xx": elb_5xx, "target5xx": target_5xx, "requests": requests},
+            period=self.PERIOD,
+            label="5xx rate (%)"
+        )
+        healthy_hosts = target_group.metrics.healthy_host_count(period=self.PERIOD, label="Healthy")
+        unhealthy_hosts = target_group.metrics.unhealthy_host_count(period=self.PERIOD, label="Unhealthy")
+
+        db_cpu = aurora_cluster.metric_cpu_utilization(period=self.PERIOD, label="CPU")
+        db_connections = aurora_cluster.metric_database_connections(period=self.PERIOD, label="Connections")
+        # DB load (average active sessions) from Performance Insights, one line per
+        # role; the search also finds readers added by auto scaling after deploy
+        db_load = [
+            cloudwatch.MathExpression(
+                expression=(
+                    "SEARCH('{AWS/RDS,DBClusterIdentifier,Role} MetricName=\"DBLoad\" "
+                    f"DBClusterIdentifier=\"{aurora_cluster.cluster_identifier}\"', "
+                    f"'Average', {int(self.PERIOD.to_seconds())})"
+                ),
+                using_metrics={},
+                period=self.PERIOD,
+                label="DBLoad"
+            )
+        ]
+
+        nat_bytes = [
+            self._nat_metric(nat_id, metric_name, f"{label} {index}")
+            for index, nat_id in enumerate(nat_gateway_ids, start=1)
+            for metric_name, label in (("BytesOutToDestination", "Out"), ("BytesInFromDestination", "In"))
+        ]
+        nat_port_errors = [
+            self._nat_metric(nat_id, "ErrorPortAllocation", f"Port allocation errors {index}")
+            for index, nat_id in enumerate(nat_gateway_ids, start=1)
+        ]
+
+        # --- Alarms ---
+        latency_alarms = [
+            self._alarm("LatencyP90", latency["p90"], thresholds.latency_p90_seconds,
+                        "Target response time p90 above threshold"),
+            self._alarm("LatencyP99", latency["p99"], thresholds.latency_p99_seconds,
+                        "Target response time p99 above threshold"),
+            self._alarm("ErrorRate", error_rate, thresholds.error_rate_percent,
+                        "5xx responses above threshold share of requests"),
+        ]
+
+        # Fewer healthy targets than the minimum: pages on its own
+        healthy_hosts_alarm = self._alarm(
+            "HealthyHosts", healthy_hosts, thresholds.min_healthy_hosts,
+            "Healthy targets below minimum",
+            comparison=cloudwatch.ComparisonOperator.LESS_THAN_THRESHOLD,
+            treat_missing=cloudwatch.TreatMissingData.BREACHING
+        )
+        healthy_hosts_alarm.add_alarm_action(cloudwatch_actions.SnsAction(self.alarm_topic))
+
+        saturation_alarms = [
+            self._alarm("DatabaseCpu", db_cpu, thresholds.db_cpu_percent, "Aurora CPU above threshold"),
+        ]
+        if db_max_connections:
+            saturation_alarms.append(self._alarm(
+                "DatabaseConnections", db_connections,
+                db_max_connections * thresholds.db_connections_percent / 100,
+                "Aurora connections close to max_connections"
+            ))
+        for index, metric in enumerate(nat_port_errors, start=1):
+            # Any port allocation error means the NAT gateway ran out of source ports
+            saturation_alarms.append(self._alarm(
+                f"NatPortAllocation{index}", metric, 0, "NAT gateway port allocation errors",
+                datapoints=1
+            ))
+
+        compute_widgets: List[cloudwatch.IWidget] = []
+        if asg is not None:
+            asg_name = asg.auto_scaling_group_name
+            # Capacity units: instances, or vCPUs with a weighted mixed instances policy
+            in_service = self._asg_metric(asg_name, "GroupInServiceCapacity", "In service")
+            desired = self._asg_metric(asg_name, "GroupDesiredCapacity", "Desired")
+            max_size = self._asg_metric(asg_name, "GroupMaxSize", "Max")
+            compute_widgets.append(self._graph("ASG capacity", [in_service, desired, max_size]))
+            # Without detailed monitoring EC2 publishes CPU every five minutes;
+            # shorter periods would leave most datapoints missing
+            cpu_period = self.PERIOD if asg_detailed_monitoring else self.BASIC_MONITORING_PERIOD
+            cpu_periods_per_minute = self.PERIOD.to_seconds() / cpu_period.to_seconds()
+            asg_cpu = cloudwatch.Metric(
+                namespace="AWS/EC2",
+                metric_name="CPUUtilization",
+                dimensions_map={"AutoScalingGroupName": asg_name},
+                period=cpu_period,
+                label="CPU"
+            )
+            compute_widgets.append(self._graph("ASG CPU (%)", [asg_cpu]))
+            saturation_alarms.append(self._alarm(
+                "ComputeCpu", asg_cpu, thresholds.compute_cpu_percent, "App server CPU above threshold",
+                periods=math.ceil(thresholds.evaluation_periods * cpu_periods_per_minute),
+                datapoints=math.ceil(thresholds.datapoints_to_alarm * cpu_periods_per_minute)
+            ))
+            # Desired capacity pinned at max: scaling has nothing left to add
+            at_max = cloudwatch.MathExpression(
+                expression="IF(desired >= maxsize, 1, 0)",
+                using_metrics={"desired": desired, "maxsize": max_size},
+                period=self.PERIOD,
+                label="At max capacity"
+            )
+            saturation_alarms.append(self._alarm(
+                "AtMaxCapacity", at_max, 1, "Auto Scaling group at max capacity",
+                comparison=cloudwatch.ComparisonOperator.GREATER_THAN_OR_EQUAL_TO_THRESHOLD,
+                periods=thresholds.at_max_capacity_minutes,
+                datapoints=thresholds.at_max_capacity_minutes
+            ))
+        if ecs_service is not None:
+            service_cpu = ecs_service.metric_cpu_utilization(period=self.PERIOD, label="CPU")
+            service_memory = ecs_service.metric_memory_utilization(period=self.PERIOD, label="Memory")
+            compute_widgets.append(self._graph("ECS service utilization (%)", [service_cpu, service_memory]))
+            saturation_alarms.append(self._alarm(
+                "ComputeCpu", service_cpu, thresholds.compute_cpu_percent, "ECS service CPU above threshold"
+            ))
+
+        self.latency_regression_alarm = cloudwatch.CompositeAlarm(
+            self, "LatencyRegression",
+            alarm_description="Latency or error rate regressed",
+            alarm_rule=cloudwatch.AlarmRule.any_of(*latency_alarms)
+        )
+        self.saturation_alarm = cloudwatch.CompositeAlarm(
+            self, "Saturation",
+            alarm_description="Database, compute or NAT capacity saturated",
+            alarm_rule=cloudwatch.AlarmRule.any_of(*saturation_alarms)
+        )
+        for alarm in (self.latency_regression_alarm, self.saturation_alarm):
+            alarm.add_alarm_action(cloudwatch_actions.SnsAction(self.alarm_topic))
+
+        # --- Dashboard ---
+        self.dashboard = cloudwatch.Dashboard(
+            self, "PerformanceDashboard",
+            dashboard_name=f"{construct_id}-performance",
+            default_interval=Duration.hours(3)
+        )
+        self.dashboard.add_widgets(
+            cloudwatch.AlarmStatusWidget(
+                title="Alarms",
+                alarms=[self.latency_regression_alarm, self.saturation_alarm, healthy_hosts_alarm],
+                width=24,
+                height=3
+            )
+        )
+        self.dashboard.add_widgets(
+            self._graph("Target response time (s)", list(latency.values())),
+            self._graph("Requests / min", [requests]),
+            self._graph("5xx", [elb_5xx, target_5xx], right=[error_rate])
+        )
+        self.dashboard.add_widgets(
+            self._graph("Targets", [healthy_hosts, unhealthy_hosts]),
+            *compute_widgets
+        )
+        self.dashboard.add_widgets(
+            self._graph("Aurora CPU (%)", [db_cpu]),
+            self._graph("Aurora connections", [db_connections]),
+            *([self._graph("Aurora DB load (sessions)", db_load)] if performance_insights else [])
+        )
+        if nat_gateway_ids:
+            self.dashboard.add_widgets(
+                self._graph("NAT throughput (bytes / min)", nat_bytes),
+                self._graph("NAT port allocation errors", nat_port_errors)
+            )
+
+        # Output the dashboard name and alarm topic
+        CfnOutput(
+            self, "DashboardName",
+            value=self.dashboard.dashboard_name,
+            description="CloudWatch performance dashboard"
+        )
+
+        CfnOutput(
+            self, "AlarmTopicArn",
+            value=self.alarm_topic.topic_arn,
+            description="SNS topic for composite alarms",
+            export_name="AlarmTopicArn"
+        )
+
+    def _alarm(self, alarm_id: str, metric: cloudwatch.IMetric, threshold: float, description: str,
+               comparison: cloudwatch.ComparisonOperator = cloudwatch.ComparisonOperator.GREATER_THAN_THRESHOLD,
+               treat_missing: cloudwatch.TreatMissingData = cloudwatch.TreatMissingData.NOT_BREACHING,
+               periods: Optional[int] = None,
+               datapoints: Optional[int] = None) -> cloudwatch.Alarm:
+        return cloudwatch.Alarm(
+            self, f"{alarm_id}Alarm",
+            metric=metric,
+            threshold=threshold,
+            comparison_operator=comparison,
+            evaluation_periods=periods or self.thresholds.evaluation_periods,
+            datapoints_to_alarm=datapoints or self.thresholds.datapoints_to_alarm,
+            treat_missing_data=treat_missing,
+            alarm_description=description
+        )
+
+    def _nat_metric(self, nat_gateway_id: str, metric_name: str, label: str) -> cloudwatch.Metric:
+        return cloudwatch.Metric(
+            namespace="AWS/NATGateway",
+            metric_name=metric_name,
+            dimensions_map={"NatGatewayId": nat_gateway_id},
+            statistic="Sum",
+            period=self.PERIOD,
+            label=label
+        )
+
+    def _asg_metric(self, asg_name: str, metric_name: str, label: str) -> cloudwatch.Metric:
+        # Group metrics are published once group metrics collection is enabled (ASG Stack)
+        return cloudwatch.Metric(
+            namespace="AWS/AutoScaling",
+            metric_name=metric_name,
+            dimensions_map={"AutoScalingGroupName": asg_name},
+            statistic="Maximum",
+            period=self.PERIOD,
+            label=label
+        )
+
+    @staticmethod
+    def _graph(title: str, left: Sequence[cloudwatch.IMetric],
+               right: Optional[Sequence[cloudwatch.IMetric]] = None) -> cloudwatch.GraphWidget:
+        return cloudwatch.GraphWidget(
+            title=title,
+            left=list(left),
+            right=list(right or []),
+            width=8,
+            height=6
+        )
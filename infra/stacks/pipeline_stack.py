@@ -1,3 +1,8 @@
+import shlex
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import jsii
 from aws_cdk import (
     Stack,
     aws_codepipeline as codepipeline,
@@ -10,12 +15,197 @@ from aws_cdk import (
     SecretValue,
     Environment
 )
-from constructs import Construct
+from constructs import Construct, IValidation
+
+
+# CDK CLI release that matches aws-cdk-lib in requirements.txt
+CDK_CLI_VERSION = "2.1010.0"
+
+# Dependency caches kept between builds (CodeBuild runs as root)
+NPM_CACHE_DIR = "/root/.npm"
+PIP_CACHE_DIR = "/root/.cache/pip"
+
+BUILD_CACHE_MODES = ("s3", "local", "none")
+
+# Inputs to synth, relative to infra/; a commit that changes none of them
+# skips the deploy stages (see scripts/change_detection.py)
+INFRA_SOURCES = ("app.py", "cdk.json", "cdk.context.json", "requirements.txt", "stacks", "scripts", "../application")
+
+# Artifact bucket prefix for the hashes of what was last deployed
+DEPLOY_STATE_PREFIX = "deploy-state"
+
+
+@dataclass(frozen=True)
+class BuildProps:
+    """
+    CodeBuild settings shared by the synth and deploy projects.
+
+    `cache` keeps the npm and pip caches between builds: "s3" stores them in
+    the artifact bucket, "local" keeps them (and Docker layers) on the build
+    host, which only helps when builds run close together. `arm` uses the
+    Graviton build image. Deploys mostly wait on CloudFormation, so they get
+    a smaller compute type than synth.
+    """
+    synth_compute_type: codebuild.ComputeType = codebuild.ComputeType.MEDIUM
+    deploy_compute_type: codebuild.ComputeType = codebuild.ComputeType.SMALL
+    arm: bool = False
+    cache: str = "s3"
+    cdk_cli_version: str = CDK_CLI_VERSION
+    python_version: str = "3.11"
+    nodejs_version: str = "22"
+
+    def validate(self) -> None:
+        if self.cache not in BUILD_CACHE_MODES:
+            raise ValueError(f"cache must be one of {BUILD_CACHE_MODES}")
+        for compute_type in (self.synth_compute_type, self.deploy_compute_type):
+            # Lambda compute has no Docker daemon and no local cache
+            if compute_type.value.startswith("BUILD_LAMBDA") or compute_type == codebuild.ComputeType.ATTRIBUTE_BASED:
+                raise ValueError(f"Unsupported build compute type {compute_type.value}")
+
+    @property
+    def build_image(self) -> codebuild.IBuildImage:
+        if self.arm:
+            return codebuild.LinuxArmBuildImage.AMAZON_LINUX_2023_STANDARD_3_0
+        return codebuild.LinuxBuildImage.STANDARD_7_0
+
+
+@dataclass(frozen=True)
+class LoadTestProps:
+    """
+    Post-deploy load test (scripts/load_test.py) against a stack output.
+
+    The target is `scheme`://<output `output_key` of `stack_name`>. The
+    profile, tolerances and pinned baseline are read from `config_path`
+    (relative to infra/). A passing run that improves on the baseline in every
+    metric is promoted under DEPLOY_STATE_PREFIX/load-test/, keyed by the
+    config's hash, and later runs gate on it. The stage fails when results
+    regress past the baseline; changing the config resets it to the pinned one.
+    """
+    stack_name: str
+    output_key: str = "LoadBalancerDNS"
+    scheme: str = "http"
+    config_path: str = "scripts/load_test.json"
+
+
+def build_cache(build: BuildProps, bucket: s3.IBucket, project: str) -> codebuild.Cache:
+    """Cache for `project` per `build.cache`; the paths come from the buildspec."""
+    if build.cache == "s3":
+        # One prefix per project so they don't overwrite each other's archive
+        return codebuild.Cache.bucket(bucket, prefix=f"codebuild-cache/{project}")
+    if build.cache == "local":
+        return codebuild.Cache.local(
+            codebuild.LocalCacheMode.CUSTOM,
+            codebuild.LocalCacheMode.DOCKER_LAYER,
+            codebuild.LocalCacheMode.SOURCE
+        )
+    return codebuild.Cache.none()
+
+
+def deployment_waves(stacks: Sequence[Stack]) -> List[List[Stack]]:
+    """
+    Group `stacks` into waves that can deploy in parallel.
+
+    A stack deploys in the wave after the last stack it depends on; only
+    dependencies within `stacks` count. Raises ValueError on cycles.
+    """
+    members = {stack.node.path: stack for stack in stacks}
+    levels: Dict[str, int] = {}
+    visiting = set()
+
+    def level(stack: Stack) -> int:
+        path = stack.node.path
+        if path in levels:
+            return levels[path]
+        if path in visiting:
+            raise ValueError(f"Dependency cycle through stack {stack.stack_name}")
+        visiting.add(path)
+        dependencies = [dep for dep in stack.dependencies if dep.node.path in members]
+        levels[path] = 1 + max((level(dep) for dep in dependencies), default=-1)
+        visiting.discard(path)
+        return levels[path]
+
+    waves: List[List[Stack]] = []
+    for stack in stacks:
+        wave = level(stack)
+        while len(waves) <= wave:
+            waves.append([])
+        waves[wave].append(stack)
+    return waves
+
+
+@jsii.implements(IValidation)
+class _WaveOrderValidation:
+    """
+    Checks the waves against the dependencies known at synth time.
+
+    Cross-stack references add dependencies only once the app is prepared,
+    after the waves are built; a stack must never share or precede the wave
+    of a stack it references.
+    """
+    def __init__(self, waves: List[List[Stack]]) -> None:
+        self._wave_of = {stack.node.path: index for index, wave in enumerate(waves) for stack in wave}
+        self._stacks = [stack for wave in waves for stack in wave]
+
+    def validate(self) -> List[str]:
+        errors = []
+        for stack in self._stacks:
+            for dep in stack.dependencies:
+                dep_wave = self._wave_of.get(dep.node.path)
+                if dep_wave is not None and dep_wave >= self._wave_of[stack.node.path]:
+                    errors.append(
+                        f"{stack.stack_name} depends on {dep.stack_name} but is not in a later deploy wave; "
+                        f"declare the dependency in app.py with add_dependency"
+                    )
+        return errors
+
 
 class PipelineStack(Stack):
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+    """
+    Pipeline Stack for continuous deployment.
+
+    This stack:
+    1. Synthesizes the app once (Synth stage)
+       - With `synth_context` (-c key=value), the context this app was
+         synthesized with, so the pipeline deploys the same profile and
+         compute backend
+       - Pinned CDK CLI and Python requirements
+       - npm/pip caches kept between builds (see BuildProps)
+
+    2. Updates itself (Self_Update stage) before deploying anything else
+       - A changed pipeline restarts the execution on its new definition
+
+    3. Deploys the other stacks in waves computed from the stack dependency graph
+       - One CodeBuild action per stack; actions in a wave run in parallel
+       - Each action deploys its stack from the synthesized cloud assembly
+       - Per-stack deploy times go to the build log and CloudWatch
+         (DEPLOY_METRIC_NAMESPACE / DeployDuration by Stack)
+
+    4. Load tests the deployed app (optional, see LoadTestProps)
+       - p50/p95/p99 latency, error rate and RPS go to the build log and
+         DEPLOY_STATE_PREFIX/load-test/ in the artifact bucket
+       - Fails the pipeline when results regress past the baseline; runs
+         that improve on it in every metric become the next baseline
+
+    5. Skips unchanged work
+       - Commits that change no INFRA_SOURCES skip synth and every deploy stage
+       - A stack whose template and assets hash the same as its last successful
+         deploy is not deployed again
+       - Hashes of the last deploy live under DEPLOY_STATE_PREFIX in the
+         artifact bucket
+    """
+    DEPLOY_METRIC_NAMESPACE = "Pipeline"
+
+    def __init__(self, scope: Construct, construct_id: str,
+                 deploy_stacks: Optional[Sequence[Stack]] = None,
+                 build: Optional[BuildProps] = None,
+                 load_test: Optional[LoadTestProps] = None,
+                 synth_context: Optional[Mapping[str, str]] = None,
+                 **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        build = build or BuildProps()
+        build.validate()
+
         # Create artifact bucket with encryption
         artifact_bucket = s3.Bucket(
             self, "ArtifactBucket",
@@ -30,7 +220,9 @@ class PipelineStack(Stack):
             self, "VPCInfraPipeline",
             pipeline_name="vpc-infrastructure-pipeline",
             artifact_bucket=artifact_bucket,
-            cross_account_keys=True
+            cross_account_keys=True,
+            # V2 for stage entry conditions (and per-action-minute billing)
+            pipeline_type=codepipeline.PipelineType.V2
         )
 
         # Source stage
@@ -75,30 +267,38 @@ class PipelineStack(Stack):
             ]
         ))
         
+        synth_command = " ".join(["cdk synth", *(
+            f"-c {shlex.quote(f'{key}={value}')}" for key, value in sorted((synth_context or {}).items())
+        )])
         build_project = codebuild.PipelineProject(
             self, "BuildProject",
             environment=codebuild.BuildEnvironment(
-                build_image=codebuild.LinuxBuildImage.STANDARD_7_0,
+                build_image=build.build_image,
                 privileged=True,
-                compute_type=codebuild.ComputeType.SMALL
+                compute_type=build.synth_compute_type
             ),
+            cache=build_cache(build, artifact_bucket, "synth"),
             environment_variables={
-                "ENV": codebuild.BuildEnvironmentVariable(value="prod"),
+                **self._toolchain_variables(build),
                 "AWS_ACCOUNT_ID": codebuild.BuildEnvironmentVariable(value=Stack.of(self).account),
-                "AWS_REGION": codebuild.BuildEnvironmentVariable(value=Stack.of(self).region)
+                "AWS_REGION": codebuild.BuildEnvironmentVariable(value=Stack.of(self).region),
+                **self._deploy_state_variables(artifact_bucket),
+                "INFRA_SOURCES": codebuild.BuildEnvironmentVariable(value=" ".join(INFRA_SOURCES))
             },
             role=build_role,
             build_spec=codebuild.BuildSpec.from_object({
                 "version": "0.2",
+                "env": {
+                    "exported-variables": ["INFRA_CHANGED"]
+                },
                 "phases": {
                     "install": {
                         "runtime-versions": {
-                            "python": "3.11",
-                            "nodejs": "22"
+                            "python": build.python_version,
+                            "nodejs": build.nodejs_version
                         },
                         "commands": [
-                            "npm install -g aws-cdk",
-                            "pip install --upgrade pip",
+                            "npm install -g \"aws-cdk@$CDK_CLI_VERSION\"",
                             "pip install -r infra/requirements.txt"
                         ]
                     },
@@ -106,34 +306,269 @@ class PipelineStack(Stack):
                         "commands": [
                             "cd infra",
                             "aws sts get-caller-identity",
-                            "echo 'Running pre-build checks...'"
+                            "echo 'Running pre-build checks...'",
+                            "SOURCE_HASH=$(python scripts/change_detection.py source-hash $INFRA_SOURCES)",
+                            "DEPLOYED_SOURCE_HASH=$(aws s3 cp \"s3://$DEPLOY_STATE/source.sha256\" - 2>/dev/null || true)",
+                            "if [ \"$SOURCE_HASH\" = \"$DEPLOYED_SOURCE_HASH\" ]; then INFRA_CHANGED=false; else INFRA_CHANGED=true; fi",
+                            "echo \"infra-changed=$INFRA_CHANGED source-hash=$SOURCE_HASH\""
                         ]
                     },
                     "build": {
                         "commands": [
-                            "echo 'Starting CDK deployment...'",
-                            "cdk synth || exit 1",
-                            "cdk deploy --require-approval never --all || exit 1",
-                            "echo 'Deployment completed successfully'"
+                            "mkdir -p cdk.out",
+                            "if [ \"$INFRA_CHANGED\" = true ]; then "
+                            f"echo 'Synthesizing CDK app...' && {synth_command} && "
+                            "python scripts/change_detection.py stack-hashes cdk.out > cdk.out/stack-hashes.json || exit 1; "
+                            "else echo 'No infrastructure changes, skipping synth'; fi",
+                            "echo \"$SOURCE_HASH\" > cdk.out/source.sha256"
                         ]
                     }
                 },
                 "artifacts": {
                     "base-directory": "infra/cdk.out",
                     "files": ["**/*"]
+                },
+                "cache": {
+                    "paths": [f"{NPM_CACHE_DIR}/**/*", f"{PIP_CACHE_DIR}/**/*"]
                 }
             })
         )
 
         build_action = codepipeline_actions.CodeBuildAction(
-            action_name="Build_and_Deploy",
+            action_name="Synth",
             project=build_project,
             input=source_output,
-            outputs=[build_output]
+            outputs=[build_output],
+            variables_namespace="Synth"
         )
 
-        # Add build stage
+        # Add synth stage
         pipeline.add_stage(
-            stage_name="Build_and_Deploy",
+            stage_name="Synth",
             actions=[build_action]
+        )
+
+        deploy_project = self._deploy_project(build_role, build, artifact_bucket)
+        build_role.add_to_policy(iam.PolicyStatement(
+            actions=["cloudwatch:PutMetricData"],
+            resources=["*"],
+            conditions={"StringEquals": {"cloudwatch:namespace": self.DEPLOY_METRIC_NAMESPACE}}
+        ))
+        # Later stages only run when the commit changed an infra source
+        infra_changed = codepipeline.Conditions(conditions=[
+            codepipeline.Condition(
+                result=codepipeline.Result.SKIP,
+                rules=[codepipeline.Rule(
+                    name="InfraChanged",
+                    provider="VariableCheck",
+                    configuration={
+                        "Variable": build_action.variable("INFRA_CHANGED"),
+                        "Value": "true",
+                        "Operator": "EQ"
+                    }
+                )]
+            )
+        ])
+        # The pipeline updates itself before any wave, so the waves always run
+        # on its latest definition; a changed pipeline restarts the execution
+        pipeline.add_stage(
+            stage_name="Self_Update",
+            before_entry=infra_changed,
+            actions=[
+                codepipeline_actions.CodeBuildAction(
+                    action_name=self.stack_name,
+                    project=deploy_project,
+                    input=build_output,
+                    environment_variables={
+                        "STACK_NAME": codebuild.BuildEnvironmentVariable(value=self.stack_name)
+                    }
+                )
+            ]
+        )
+
+        # Deploy the other synthesized stacks wave by wave
+        waves = deployment_waves([stack for stack in deploy_stacks or [] if stack is not self])
+        self.node.add_validation(_WaveOrderValidation(waves))
+        for index, wave in enumerate(waves, start=1):
+            pipeline.add_stage(
+                stage_name=f"Deploy_Wave_{index}",
+                before_entry=infra_changed,
+                actions=[
+                    codepipeline_actions.CodeBuildAction(
+                        action_name=stack.stack_name,
+                        project=deploy_project,
+                        input=build_output,
+                        environment_variables={
+                            "STACK_NAME": codebuild.BuildEnvironmentVariable(value=stack.stack_name)
+                        }
+                    )
+                    for stack in wave
+                ]
+            )
+
+        if load_test:
+            pipeline.add_stage(
+                stage_name="Load_Test",
+                before_entry=infra_changed,
+                actions=[
+                    codepipeline_actions.CodeBuildAction(
+                        action_name="Load_Test",
+                        project=self._load_test_project(build_role, build, artifact_bucket, load_test),
+                        input=source_output
+                    )
+                ]
+            )
+
+        # Every stack is deployed; later commits with the same sources can skip
+        pipeline.add_stage(
+            stage_name="Record_Deployment",
+            before_entry=infra_changed,
+            actions=[
+                codepipeline_actions.CodeBuildAction(
+                    action_name="Record_Source_Hash",
+                    project=self._record_project(build_role, build, artifact_bucket),
+                    input=build_output
+                )
+            ]
+        )
+
+    @staticmethod
+    def _toolchain_variables(build: BuildProps) -> Dict[str, codebuild.BuildEnvironmentVariable]:
+        return {
+            "CDK_CLI_VERSION": codebuild.BuildEnvironmentVariable(value=build.cdk_cli_version),
+            "npm_config_cache": codebuild.BuildEnvironmentVariable(value=NPM_CACHE_DIR),
+            "PIP_CACHE_DIR": codebuild.BuildEnvironmentVariable(value=PIP_CACHE_DIR),
+        }
+
+    @staticmethod
+    def _deploy_state_variables(artifact_bucket: s3.IBucket) -> Dict[str, codebuild.BuildEnvironmentVariable]:
+        return {
+            "DEPLOY_STATE": codebuild.BuildEnvironmentVariable(
+                value=f"{artifact_bucket.bucket_name}/{DEPLOY_STATE_PREFIX}"
+            ),
+        }
+
+    def _load_test_project(self, build_role: iam.Role, build: BuildProps,
+                           artifact_bucket: s3.IBucket,
+                           load_test: LoadTestProps) -> codebuild.PipelineProject:
+        """CodeBuild project that load tests the deployed app and gates on the baseline."""
+        return codebuild.PipelineProject(
+            self, "LoadTestProject",
+            environment=codebuild.BuildEnvironment(
+                build_image=build.build_image,
+                compute_type=build.deploy_compute_type
+            ),
+            environment_variables={
+                **self._deploy_state_variables(artifact_bucket),
+                "TARGET_STACK": codebuild.BuildEnvironmentVariable(value=load_test.stack_name),
+                "TARGET_OUTPUT": codebuild.BuildEnvironmentVariable(value=load_test.output_key),
+                "TARGET_SCHEME": codebuild.BuildEnvironmentVariable(value=load_test.scheme),
+                "LOAD_TEST_CONFIG": codebuild.BuildEnvironmentVariable(value=load_test.config_path)
+            },
+            role=build_role,
+            build_spec=codebuild.BuildSpec.from_object({
+                "version": "0.2",
+                "phases": {
+                    "install": {
+                        "runtime-versions": {
+                            "python": build.python_version
+                        }
+                    },
+                    "build": {
+                        "commands": [
+                            "cd infra",
+                            "TARGET_HOST=$(aws cloudformation describe-stacks --stack-name \"$TARGET_STACK\" "
+                            "--query \"Stacks[0].Outputs[?OutputKey=='$TARGET_OUTPUT'].OutputValue\" --output text)",
+                            # Promoted baselines only hold for the config they were measured with
+                            "BASELINE=\"s3://$DEPLOY_STATE/load-test/baseline-$(sha256sum \"$LOAD_TEST_CONFIG\" "
+                            "| cut -c1-12).json\"",
+                            # Until a run is promoted, the pinned baseline in the config applies
+                            "aws s3 cp \"$BASELINE\" load-test-baseline.json || true",
+                            "python scripts/load_test.py run \"$TARGET_SCHEME://$TARGET_HOST\" "
+                            "--config \"$LOAD_TEST_CONFIG\" --baseline load-test-baseline.json "
+                            "--output load-test-results.json --promote load-test-promoted.json "
+                            "|| LOAD_TEST_FAILED=1",
+                            "aws s3 cp load-test-results.json "
+                            "\"s3://$DEPLOY_STATE/load-test/$CODEBUILD_RESOLVED_SOURCE_VERSION.json\" || true",
+                            "[ -z \"$LOAD_TEST_FAILED\" ]",
+                            "[ ! -f load-test-promoted.json ] || aws s3 cp load-test-promoted.json \"$BASELINE\""
+                        ]
+                    }
+                }
+            })
+        )
+
+    def _record_project(self, build_role: iam.Role, build: BuildProps,
+                        artifact_bucket: s3.IBucket) -> codebuild.PipelineProject:
+        """CodeBuild project that stores the deployed source hash."""
+        return codebuild.PipelineProject(
+            self, "RecordProject",
+            environment=codebuild.BuildEnvironment(
+                build_image=build.build_image,
+                compute_type=codebuild.ComputeType.SMALL
+            ),
+            environment_variables=self._deploy_state_variables(artifact_bucket),
+            role=build_role,
+            build_spec=codebuild.BuildSpec.from_object({
+                "version": "0.2",
+                "phases": {
+                    "build": {
+                        "commands": [
+                            "aws s3 cp source.sha256 \"s3://$DEPLOY_STATE/source.sha256\""
+                        ]
+                    }
+                }
+            })
+        )
+
+    def _deploy_project(self, build_role: iam.Role, build: BuildProps,
+                        artifact_bucket: s3.IBucket) -> codebuild.PipelineProject:
+        """CodeBuild project that deploys one stack ($STACK_NAME) from the cloud assembly."""
+        return codebuild.PipelineProject(
+            self, "DeployProject",
+            environment=codebuild.BuildEnvironment(
+                build_image=build.build_image,
+                privileged=True,
+                compute_type=build.deploy_compute_type
+            ),
+            cache=build_cache(build, artifact_bucket, "deploy"),
+            environment_variables={
+                **self._toolchain_variables(build),
+                **self._deploy_state_variables(artifact_bucket),
+                "METRIC_NAMESPACE": codebuild.BuildEnvironmentVariable(value=self.DEPLOY_METRIC_NAMESPACE)
+            },
+            role=build_role,
+            build_spec=codebuild.BuildSpec.from_object({
+                "version": "0.2",
+                "phases": {
+                    "install": {
+                        "runtime-versions": {
+                            "nodejs": build.nodejs_version
+                        },
+                        "commands": [
+                            "npm install -g \"aws-cdk@$CDK_CLI_VERSION\""
+                        ]
+                    },
+                    "build": {
+                        "commands": [
+                            "STACK_HASH=$(jq -r --arg stack \"$STACK_NAME\" '.[$stack] // empty' stack-hashes.json)",
+                            "DEPLOYED_HASH=$(aws s3 cp \"s3://$DEPLOY_STATE/stacks/$STACK_NAME.sha256\" - 2>/dev/null || true)",
+                            "if [ -n \"$STACK_HASH\" ] && [ \"$STACK_HASH\" = \"$DEPLOYED_HASH\" ]; then UNCHANGED=true; else UNCHANGED=false; fi",
+                            "START=$(date +%s)",
+                            # The input artifact is the cloud assembly; deploy only this stack
+                            "if [ \"$UNCHANGED\" = true ]; then echo \"deploy-skipped stack=$STACK_NAME hash=$STACK_HASH\"; "
+                            "else cdk deploy --app . --exclusively --require-approval never \"$STACK_NAME\" || exit 1; fi",
+                            "ELAPSED=$(( $(date +%s) - START ))",
+                            "echo \"deploy-timing stack=$STACK_NAME seconds=$ELAPSED unchanged=$UNCHANGED\"",
+                            "[ \"$UNCHANGED\" = true ] || aws cloudwatch put-metric-data --namespace \"$METRIC_NAMESPACE\" "
+                            "--metric-name DeployDuration --dimensions Stack=$STACK_NAME --unit Seconds --value $ELAPSED || true",
+                            "[ \"$UNCHANGED\" = true ] || [ -z \"$STACK_HASH\" ] || "
+                            "echo \"$STACK_HASH\" | aws s3 cp - \"s3://$DEPLOY_STATE/stacks/$STACK_NAME.sha256\""
+                        ]
+                    }
+                },
+                "cache": {
+                    "paths": [f"{NPM_CACHE_DIR}/**/*"]
+                }
+            })
         ) 
\ No newline at end of file
@@ -0,0 +1,193 @@
+from dataclasses import dataclass, field
+import math
+from typing import Dict, Mapping, Optional, Tuple
+
+from aws_cdk import aws_ec2 as ec2
+
+
+# vCPU count and memory (GiB) for the instance classes Aurora MySQL supports
+_MEMORY_OPTIMIZED_SIZES = {
+    "large": (2, 16),
+    "xlarge": (4, 32),
+    "2xlarge": (8, 64),
+    "4xlarge": (16, 128),
+    "8xlarge": (32, 256),
+    "12xlarge": (48, 384),
+    "16xlarge": (64, 512),
+    "24xlarge": (96, 768),
+}
+
+INSTANCE_SPECS: Dict[str, Tuple[int, int]] = {
+    "t3.medium": (2, 4),
+    "t3.large": (2, 8),
+    "t4g.medium": (2, 4),
+    "t4g.large": (2, 8),
+    **{
+        f"{family}.{size}": spec
+        for family in ("r5", "r6g", "r6i", "r7g", "r8g")
+        for size, spec in _MEMORY_OPTIMIZED_SIZES.items()
+    },
+}
+
+GIB = 1024 ** 3
+MIB = 1024 ** 2
+
+# Worst-case per-connection memory: sort, join and read buffers, thread stack
+# and network buffers
+PER_CONNECTION_BYTES = 3 * MIB
+
+# Share of instance memory the buffer pool and connections may use together;
+# the rest is left to the OS and Aurora's own processes
+USABLE_MEMORY_FRACTION = 0.9
+
+
+@dataclass(frozen=True)
+class ParameterProfile:
+    """
+    Named Aurora MySQL tuning profile.
+
+    Sizes are expressed relative to the instance (memory fraction, connections
+    per GiB, threads per vCPU) so one profile fits every instance class.
+    """
+    name: str
+    buffer_pool_fraction: float
+    connections_per_gib: int
+    max_connections_cap: int
+    thread_cache_per_vcpu: int
+    thread_concurrency_per_vcpu: int
+    table_open_cache: int
+    long_query_time_seconds: float
+
+
+PROFILES: Dict[str, ParameterProfile] = {
+    profile.name: profile
+    for profile in (
+        # Many short transactions on small instances: leave headroom for connections
+        ParameterProfile(
+            name="oltp-small",
+            buffer_pool_fraction=0.65,
+            connections_per_gib=60,
+            max_connections_cap=1000,
+            thread_cache_per_vcpu=8,
+            thread_concurrency_per_vcpu=2,
+            table_open_cache=2000,
+            long_query_time_seconds=1.0
+        ),
+        # High-concurrency OLTP on memory-optimized instances
+        ParameterProfile(
+            name="oltp-large",
+            buffer_pool_fraction=0.72,
+            connections_per_gib=50,
+            max_connections_cap=5000,
+            thread_cache_per_vcpu=16,
+            thread_concurrency_per_vcpu=2,
+            table_open_cache=8000,
+            long_query_time_seconds=0.5
+        ),
+        # Reporting and read replicas: favour cache over connection count
+        ParameterProfile(
+            name="read-heavy",
+            buffer_pool_fraction=0.78,
+            connections_per_gib=30,
+            max_connections_cap=3000,
+            thread_cache_per_vcpu=8,
+            thread_concurrency_per_vcpu=4,
+            table_open_cache=16000,
+            long_query_time_seconds=2.0
+        ),
+    )
+}
+
+
+@dataclass(frozen=True)
+class ResolvedParameters:
+    """Parameters for the cluster and instance parameter groups."""
+    cluster_parameters: Dict[str, str] = field(default_factory=dict)
+    instance_parameters: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def max_connections(self) -> Optional[int]:
+        value = self.instance_parameters.get("max_connections")
+        return int(value) if value is not None and value.isdigit() else None
+
+
+def instance_spec(instance_type: ec2.InstanceType) -> Tuple[int, int]:
+    """Return (vCPUs, memory GiB) for an Aurora instance type."""
+    name = instance_type.to_string()
+    if name not in INSTANCE_SPECS:
+        raise ValueError(f"No memory specification for Aurora instance type {name}")
+    return INSTANCE_SPECS[name]
+
+
+def default_max_connections(memory_gib: float) -> int:
+    """
+    Aurora MySQL's default max_connections for an instance with `memory_gib`:
+    GREATEST(log2(mem/805306368)*45, log2(mem/8187281408)*1000), at most 16000.
+    """
+    memory_bytes = memory_gib * GIB
+    return int(min(
+        max(math.log2(memory_bytes / 805306368) * 45, math.log2(memory_bytes / 8187281408) * 1000),
+        16000
+    ))
+
+
+def resolve_parameter_profile(profile_name: str,
+                              instance_type: ec2.InstanceType,
+                              overrides: Optional[Mapping[str, str]] = None) -> ResolvedParameters:
+    """
+    Derive parameter group settings for `profile_name` on `instance_type`.
+
+    `overrides` replace derived instance parameters. Raises ValueError if the
+    buffer pool plus worst-case connection memory does not fit the instance.
+    """
+    if profile_name not in PROFILES:
+        raise ValueError(f"Unknown parameter profile {profile_name!r}, expected one of {sorted(PROFILES)}")
+    profile = PROFILES[profile_name]
+    vcpus, memory_gib = instance_spec(instance_type)
+    memory_bytes = memory_gib * GIB
+
+    # Buffer pool is sized in whole MiB
+    buffer_pool_bytes = int(memory_bytes * profile.buffer_pool_fraction) // MIB * MIB
+    max_connections = min(profile.connections_per_gib * memory_gib, profile.max_connections_cap)
+
+    instance_parameters = {
+        "innodb_buffer_pool_size": str(buffer_pool_bytes),
+        "max_connections": str(max_connections),
+        "thread_cache_size": str(profile.thread_cache_per_vcpu * vcpus),
+        "innodb_thread_concurrency": str(profile.thread_concurrency_per_vcpu * vcpus),
+        "table_open_cache": str(profile.table_open_cache),
+        **{name: str(value) for name, value in (overrides or {}).items()},
+    }
+    cluster_parameters = {
+        "character_set_server": "utf8mb4",
+        "slow_query_log": "1",
+        "long_query_time": str(profile.long_query_time_seconds),
+        "log_output": "FILE",
+    }
+
+    _check_memory_fit(profile_name, instance_type, instance_parameters, memory_bytes)
+
+    return ResolvedParameters(
+        cluster_parameters=cluster_parameters,
+        instance_parameters=instance_parameters
+    )
+
+
+def _check_memory_fit(profile_name: str,
+                      instance_type: ec2.InstanceType,
+                      instance_parameters: Mapping[str, str],
+                      memory_bytes: int) -> None:
+    buffer_pool = instance_parameters["innodb_buffer_pool_size"]
+    connections = instance_parameters["max_connections"]
+    # Formula values such as {DBInstanceClassMemory*3/4} are evaluated by RDS
+    if not (buffer_pool.isdigit() and connections.isdigit()):
+        return
+
+    required = int(buffer_pool) + int(connections) * PER_CONNECTION_BYTES
+    available = int(memory_bytes * USABLE_MEMORY_FRACTION)
+    if required > available:
+        raise ValueError(
+            f"Parameter profile {profile_name!r} does not fit {instance_type.to_string()}: "
+            f"buffer pool ({int(buffer_pool) // MIB} MiB) plus {connections} connections "
+            f"need {required // MIB} MiB, but only {available // MIB} MiB is usable"
+        )
@@ -1,6 +1,14 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import List, Mapping, Optional, Tuple
+
 from aws_cdk import (
     Stack,
+    aws_applicationautoscaling as appscaling,
+    aws_cloudwatch as cloudwatch,
     aws_ec2 as ec2,
+    aws_kms as kms,
+    aws_logs as logs,
     aws_rds as rds,
     SecretValue,
     aws_secretsmanager as secretsmanager,
@@ -10,6 +18,153 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+from stacks.rds_parameter_profiles import resolve_parameter_profile
+
+# Header line of each slow query log entry, e.g.
+# "# Query_time: 2.345678  Lock_time: 0.000123 Rows_sent: 1  Rows_examined: 1000"
+SLOW_QUERY_HEADER_REGEX = (
+    r"Query_time: (?<query_time>[\d.]+)\s+Lock_time: (?<lock_time>[\d.]+)\s+"
+    r"Rows_sent: (?<rows_sent>\d+)\s+Rows_examined: (?<rows_examined>\d+)"
+)
+
+
+class CapacityMode(Enum):
+    """How an Aurora instance is sized."""
+    PROVISIONED = "provisioned"
+    SERVERLESS = "serverless"
+
+
+@dataclass(frozen=True)
+class CapacityProps:
+    """
+    Capacity mode for the writer and the readers.
+
+    Serverless v2 instances scale between `min_acu` and `max_acu` Aurora
+    Capacity Units (about 2 GiB of memory each). A provisioned writer can be
+    mixed with serverless readers and vice versa.
+    """
+    writer: CapacityMode = CapacityMode.PROVISIONED
+    readers: CapacityMode = CapacityMode.PROVISIONED
+    min_acu: float = 0.5
+    max_acu: float = 4
+
+    @property
+    def uses_serverless(self) -> bool:
+        return CapacityMode.SERVERLESS in (self.writer, self.readers)
+
+    def validate(self) -> None:
+        if not 0.5 <= self.min_acu <= self.max_acu <= 128:
+            raise ValueError(
+                "Serverless v2 capacity must satisfy 0.5 <= min_acu <= max_acu <= 128, "
+                f"got min={self.min_acu} max={self.max_acu}"
+            )
+        # ACUs are allocated in half-unit steps
+        if (self.min_acu * 2) % 1 or (self.max_acu * 2) % 1:
+            raise ValueError(f"ACU values must be multiples of 0.5, got min={self.min_acu} max={self.max_acu}")
+
+
+@dataclass(frozen=True)
+class InstrumentationProps:
+    """
+    Database instrumentation: Performance Insights, Enhanced Monitoring and
+    log export to CloudWatch Logs.
+
+    When the slow query log is exported, a metric filter counts the logged
+    queries (those slower than `slow_query_threshold_seconds`) and a saved
+    Logs Insights query reports their execution time. The threshold defaults
+    to the parameter profile's long_query_time, else 1s; an explicit one must
+    agree with the profile.
+    """
+    performance_insights: bool = True
+    performance_insights_retention: rds.PerformanceInsightRetention = rds.PerformanceInsightRetention.DEFAULT
+    # Defaults to the AWS managed key for RDS
+    performance_insights_key: Optional[kms.IKey] = None
+    # Enhanced Monitoring granularity; 0 disables it
+    monitoring_interval_seconds: int = 1
+    log_exports: Tuple[str, ...] = ("slowquery", "error")
+    log_retention: logs.RetentionDays = logs.RetentionDays.ONE_MONTH
+    slow_query_threshold_seconds: Optional[float] = None
+    metric_namespace: str = "AuroraSlowQueries"
+
+    def validate(self) -> None:
+        if self.monitoring_interval_seconds not in (0, 1, 5, 10, 15, 30, 60):
+            raise ValueError(
+                "monitoring_interval_seconds must be one of 0, 1, 5, 10, 15, 30, 60, "
+                f"got {self.monitoring_interval_seconds}"
+            )
+        unknown_logs = set(self.log_exports) - {"audit", "error", "general", "slowquery"}
+        if unknown_logs:
+            raise ValueError(f"Unsupported Aurora MySQL log exports: {sorted(unknown_logs)}")
+        if self.slow_query_threshold_seconds is not None and self.slow_query_threshold_seconds <= 0:
+            raise ValueError(f"slow_query_threshold_seconds must be positive, got {self.slow_query_threshold_seconds}")
+        if self.performance_insights_key is not None and not self.performance_insights:
+            raise ValueError("performance_insights_key requires performance_insights")
+
+
+@dataclass(frozen=True)
+class ReaderFleetProps:
+    """
+    Aurora reader fleet served through the cluster reader endpoint.
+
+    `instances` readers are created with the cluster. Aurora replica auto
+    scaling then keeps the reader count between `min_capacity` and
+    `max_capacity`, tracking average reader CPU and, when set, average
+    reader connections.
+    """
+    instances: int = 1
+    min_capacity: int = 1
+    max_capacity: int = 3
+    target_cpu_percent: float = 60
+    target_connections: Optional[float] = None
+    scale_in_cooldown_seconds: int = 300
+    scale_out_cooldown_seconds: int = 60
+
+    def validate(self) -> None:
+        # Aurora supports up to 15 replicas per cluster
+        if not 0 <= self.min_capacity <= self.max_capacity <= 15:
+            raise ValueError(
+                "Reader capacity must satisfy 0 <= min_capacity <= max_capacity <= 15, "
+                f"got min={self.min_capacity} max={self.max_capacity}"
+            )
+        if not 0 <= self.instances <= self.max_capacity:
+            raise ValueError(
+                f"Initial reader count {self.instances} must be between 0 and max_capacity {self.max_capacity}"
+            )
+        if not 0 < self.target_cpu_percent <= 100:
+            raise ValueError(f"target_cpu_percent must be in (0, 100], got {self.target_cpu_percent}")
+        if self.target_connections is not None and self.target_connections <= 0:
+            raise ValueError(f"target_connections must be positive, got {self.target_connections}")
+
+
+@dataclass(frozen=True)
+class ProxyProps:
+    """
+    RDS Proxy connection pooling between the application tier and Aurora.
+
+    `max_connections_percent` and `max_idle_connections_percent` are relative
+    to the writer's `max_connections`.
+    """
+    max_connections_percent: int = 90
+    max_idle_connections_percent: int = 50
+    idle_client_timeout_seconds: int = 1800
+    borrow_timeout_seconds: int = 120
+    require_tls: bool = True
+
+    def validate(self) -> None:
+        if not 1 <= self.max_connections_percent <= 100:
+            raise ValueError(f"max_connections_percent must be in [1, 100], got {self.max_connections_percent}")
+        if not 0 <= self.max_idle_connections_percent <= self.max_connections_percent:
+            raise ValueError(
+                "max_idle_connections_percent must be between 0 and max_connections_percent, "
+                f"got {self.max_idle_connections_percent}"
+            )
+        # RDS Proxy limits: idle client timeout 1s-8h, borrow timeout up to 1h
+        if not 1 <= self.idle_client_timeout_seconds <= 28800:
+            raise ValueError(f"idle_client_timeout_seconds must be in [1, 28800], got {self.idle_client_timeout_seconds}")
+        if not 1 <= self.borrow_timeout_seconds <= 3600:
+            raise ValueError(f"borrow_timeout_seconds must be in [1, 3600], got {self.borrow_timeout_seconds}")
+
+
 class RDSStack(Stack):
     """
     RDS Stack for Aurora MySQL cluster.
@@ -28,52 +183,189 @@ class RDSStack(Stack):
        - Multi-AZ deployment
        - Automated backups enabled
        - Deletion protection in production
+
+    4. Optional reader fleet (`readers`)
+       - Aurora Replicas behind the cluster reader endpoint
+       - Replica auto scaling on reader CPU and connection count
+
+    5. Optional RDS Proxy (`proxy`)
+       - Pools connections from the application servers
+       - Absorbs connection storms during scale-out and instance refresh
+
+    6. Optional parameter profile (`parameter_profile`)
+       - Buffer pool, connection, thread and slow query settings derived
+         from the instance type (see rds_parameter_profiles)
+       - Instance settings apply to provisioned instances only; serverless
+         instances size their buffer pool and connections from ACUs
+
+    7. Capacity mode (`capacity`)
+       - Provisioned or Aurora Serverless v2 writer and readers
+
+    8. Optional instrumentation (`instrumentation`)
+       - Performance Insights and Enhanced Monitoring
+       - Slow query and error logs in CloudWatch Logs with a slow query
+         count metric and a Logs Insights query for their duration
     
     Dependencies:
     - VPC Stack (network, subnets, security groups)
     """
+    DB_USERNAME = "testuser"
+
     def __init__(self, scope: Construct, construct_id: str, 
                  vpc: ec2.Vpc,
                  db_security_group: ec2.SecurityGroup,
+                 readers: Optional[ReaderFleetProps] = None,
+                 proxy: Optional[ProxyProps] = None,
+                 app_security_group: Optional[ec2.SecurityGroup] = None,
+                 instance_type: Optional[ec2.InstanceType] = None,
+                 parameter_profile: Optional[str] = None,
+                 parameter_overrides: Optional[Mapping[str, str]] = None,
+                 capacity: Optional[CapacityProps] = None,
+                 instrumentation: Optional[InstrumentationProps] = None,
                  **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        capacity = capacity or CapacityProps()
+        capacity.validate()
+        if readers is not None:
+            readers.validate()
+        if instrumentation is not None:
+            instrumentation.validate()
+        # Performance Insights publishes DBLoad per instance (Observability Stack)
+        self.performance_insights = instrumentation is not None and instrumentation.performance_insights
+        if proxy is not None:
+            proxy.validate()
+            if app_security_group is None:
+                raise ValueError("app_security_group is required when an RDS Proxy is configured")
+
+        db_password = SecretValue.unsafe_plain_text("password1234!")
+
+        engine = rds.DatabaseClusterEngine.aurora_mysql(
+            version=rds.AuroraMysqlEngineVersion.VER_3_04_3
+        )
+        # Smallest instance size for dev
+        instance_type = instance_type or ec2.InstanceType.of(
+            ec2.InstanceClass.T4G,
+            ec2.InstanceSize.MEDIUM
+        )
+
+        # With a proxy, reference the database security group from this stack.
+        # add_proxy opens the cluster port (a cluster attribute) from the proxy,
+        # and that ingress rule must live here rather than in VPCStack to avoid
+        # a cyclic cross-stack reference.
+        cluster_security_group = db_security_group
+        if proxy is not None:
+            cluster_security_group = ec2.SecurityGroup.from_security_group_id(
+                self, "ClusterSecurityGroup",
+                db_security_group.security_group_id,
+                allow_all_outbound=False
+            )
+
         # Create parameter group for Aurora MySQL (minimal settings for dev)
+        cluster_parameters = {
+            "character_set_server": "utf8mb4"  # Minimal setting for basic UTF-8 support
+        }
+        instance_parameter_group = None
+        self.parameters = None
+        if parameter_profile is not None:
+            # Profile settings are checked against the instance's memory at synth time
+            self.parameters = resolve_parameter_profile(parameter_profile, instance_type, parameter_overrides)
+            cluster_parameters = self.parameters.cluster_parameters
+            instance_parameter_group = rds.ParameterGroup(
+                self, "AuroraInstanceParameterGroup",
+                engine=engine,
+                description=f"Instance parameter group ({parameter_profile} profile)",
+                parameters=self.parameters.instance_parameters
+            )
+        elif parameter_overrides:
+            raise ValueError("parameter_overrides requires a parameter_profile")
+
+        exports_slow_query_log = instrumentation is not None and "slowquery" in instrumentation.log_exports
+        if exports_slow_query_log:
+            # The slow query log is only exported when written to a file
+            threshold = instrumentation.slow_query_threshold_seconds
+            profile_threshold = cluster_parameters.get("long_query_time")
+            if threshold is not None and profile_threshold is not None and float(profile_threshold) != threshold:
+                raise ValueError(
+                    f"slow_query_threshold_seconds={threshold} conflicts with the parameter profile's "
+                    f"long_query_time={profile_threshold}; drop one or set long_query_time in parameter_overrides"
+                )
+            cluster_parameters = {
+                "slow_query_log": "1",
+                "long_query_time": str(threshold if threshold is not None else 1.0),
+                **cluster_parameters,
+                "log_output": "FILE"
+            }
+
         parameter_group = rds.ParameterGroup(
             self, "AuroraParameterGroup",
-            engine=rds.DatabaseClusterEngine.aurora_mysql(
-                version=rds.AuroraMysqlEngineVersion.VER_3_04_3
-            ),
-            parameters={
-                "character_set_server": "utf8mb4"  # Minimal setting for basic UTF-8 support
-            }
+            engine=engine,
+            parameters=cluster_parameters
         )
 
+        def cluster_instance(index: int, mode: CapacityMode, is_writer: bool) -> rds.IClusterInstance:
+            instance_id = f"Instance{index}"
+            instance_identifier = f"population-db-dev{index}"
+            if mode is CapacityMode.SERVERLESS:
+                return rds.ClusterInstance.serverless_v2(
+                    instance_id,
+                    instance_identifier=instance_identifier,
+                    # The first serverless reader follows the writer's capacity so it can take over on failover
+                    scale_with_writer=not is_writer and index == 2
+                )
+            return rds.ClusterInstance.provisioned(
+                instance_id,
+                instance_identifier=instance_identifier,
+                instance_type=instance_type,
+                parameter_group=instance_parameter_group,
+                # Keep the logical IDs the instances had under instance_props so
+                # existing clusters are updated in place rather than replaced
+                is_from_legacy_instance_props=True
+            )
+
+        # Writer plus the initial readers; single instance for dev when no readers are configured
+        writer = cluster_instance(1, capacity.writer, is_writer=True)
+        reader_instances: List[rds.IClusterInstance] = [
+            cluster_instance(index, capacity.readers, is_writer=False)
+            for index in range(2, 2 + (readers.instances if readers else 0))
+        ]
+
         # Create Aurora MySQL cluster (dev configuration)
         self.aurora_cluster = rds.DatabaseCluster(
             self, "AuroraCluster",
-            engine=rds.DatabaseClusterEngine.aurora_mysql(
-                version=rds.AuroraMysqlEngineVersion.VER_3_04_3
-            ),
-            credentials=rds.Credentials.from_password("testuser", SecretValue.unsafe_plain_text("password1234!")),
-            instance_props=rds.InstanceProps(
-                vpc=vpc,
-                vpc_subnets=ec2.SubnetSelection(
-                    subnets=vpc.isolated_subnets
-                ),
-                instance_type=ec2.InstanceType.of(  # Smallest instance size for dev
-                    ec2.InstanceClass.T4G,
-                    ec2.InstanceSize.MEDIUM
-                ),
-                security_groups=[db_security_group]
+            engine=engine,
+            credentials=rds.Credentials.from_password(self.DB_USERNAME, db_password),
+            vpc=vpc,
+            vpc_subnets=ec2.SubnetSelection(
+                subnets=vpc.isolated_subnets
             ),
-            instances=1,  # Single instance for dev
+            security_groups=[cluster_security_group],
+            writer=writer,
+            readers=reader_instances,
+            # Capacity bounds for any Serverless v2 instances in the cluster
+            serverless_v2_min_capacity=capacity.min_acu if capacity.uses_serverless else None,
+            serverless_v2_max_capacity=capacity.max_acu if capacity.uses_serverless else None,
             parameter_group=parameter_group,
+            # Instrumentation (all disabled when not configured)
+            enable_performance_insights=instrumentation.performance_insights if instrumentation else None,
+            performance_insight_retention=(
+                instrumentation.performance_insights_retention
+                if instrumentation and instrumentation.performance_insights else None
+            ),
+            performance_insight_encryption_key=instrumentation.performance_insights_key if instrumentation else None,
+            monitoring_interval=(
+                Duration.seconds(instrumentation.monitoring_interval_seconds)
+                if instrumentation and instrumentation.monitoring_interval_seconds else None
+            ),
+            cloudwatch_logs_exports=list(instrumentation.log_exports) if instrumentation else None,
+            cloudwatch_logs_retention=(
+                instrumentation.log_retention
+                if instrumentation and instrumentation.log_exports else None
+            ),
             backup=rds.BackupProps(
                 retention=Duration.days(1),  # Minimum backup retention for dev
                 preferred_window="03:00-04:00"
             ),
-            instance_identifier_base="population-db-dev",
             port=3306,
             default_database_name="Population",
             removal_policy=RemovalPolicy.DESTROY,  # For dev environment
@@ -87,3 +379,162 @@ class RDSStack(Stack):
             description="Aurora Cluster Endpoint",
             export_name="AuroraClusterEndpoint"
         )
+
+        # Output the reader endpoint so the application can split read traffic.
+        # Without readers Aurora resolves it to the writer.
+        CfnOutput(
+            self, "ClusterReadEndpoint",
+            value=self.aurora_cluster.cluster_read_endpoint.hostname,
+            description="Aurora Cluster Reader Endpoint",
+            export_name="AuroraClusterReadEndpoint"
+        )
+
+        if capacity.uses_serverless:
+            # Serverless v2 scaling bounds for capacity dashboards
+            CfnOutput(
+                self, "ServerlessMinCapacity",
+                value=str(capacity.min_acu),
+                description="Aurora Serverless v2 minimum capacity (ACU)"
+            )
+            CfnOutput(
+                self, "ServerlessMaxCapacity",
+                value=str(capacity.max_acu),
+                description="Aurora Serverless v2 maximum capacity (ACU)"
+            )
+
+        if readers is not None:
+            self._add_reader_auto_scaling(readers)
+
+        if exports_slow_query_log:
+            self._add_slow_query_metrics(instrumentation)
+
+        if proxy is not None:
+            self._add_proxy(proxy, vpc, app_security_group, db_password)
+
+    def _add_reader_auto_scaling(self, readers: ReaderFleetProps) -> None:
+        """Register the cluster's replica count with Application Auto Scaling."""
+        self.reader_scaling = appscaling.ScalableTarget(
+            self, "ReaderScalableTarget",
+            service_namespace=appscaling.ServiceNamespace.RDS,
+            scalable_dimension="rds:cluster:ReadReplicaCount",
+            resource_id=f"cluster:{self.aurora_cluster.cluster_identifier}",
+            min_capacity=readers.min_capacity,
+            max_capacity=readers.max_capacity
+        )
+        # The cluster and its instances must be available before scaling is registered
+        self.reader_scaling.node.add_dependency(self.aurora_cluster)
+
+        # Scale on average reader CPU
+        self.reader_scaling.scale_to_track_metric(
+            "ReaderCpuScaling",
+            target_value=readers.target_cpu_percent,
+            predefined_metric=appscaling.PredefinedMetric.RDS_READER_AVERAGE_CPU_UTILIZATION,
+            scale_in_cooldown=Duration.seconds(readers.scale_in_cooldown_seconds),
+            scale_out_cooldown=Duration.seconds(readers.scale_out_cooldown_seconds)
+        )
+
+        # Optionally scale on average reader connections as well
+        if readers.target_connections is not None:
+            self.reader_scaling.scale_to_track_metric(
+                "ReaderConnectionScaling",
+                target_value=readers.target_connections,
+                predefined_metric=appscaling.PredefinedMetric.RDS_READER_AVERAGE_DATABASE_CONNECTIONS,
+                scale_in_cooldown=Duration.seconds(readers.scale_in_cooldown_seconds),
+                scale_out_cooldown=Duration.seconds(readers.scale_out_cooldown_seconds)
+            )
+
+        CfnOutput(
+            self, "ReaderCapacityBounds",
+            value=f"{readers.min_capacity}-{readers.max_capacity}",
+            description="Aurora replica auto scaling bounds (min-max)"
+        )
+
+    def _add_slow_query_metrics(self, instrumentation: InstrumentationProps) -> None:
+        """Count slow query log entries in CloudWatch and save a query for their duration."""
+        slow_query_log_group = logs.LogGroup.from_log_group_name(
+            self, "SlowQueryLogGroup",
+            f"/aws/rds/cluster/{self.aurora_cluster.cluster_identifier}/slowquery"
+        )
+        # Each entry is one multi-line event (# Time, # User@Host, # Query_time,
+        # then the statement), so match a term anywhere in it. Only queries
+        # over long_query_time are logged; every entry counts.
+        metric_filter = logs.MetricFilter(
+            self, "SlowQueryCountFilter",
+            log_group=slow_query_log_group,
+            filter_pattern=logs.FilterPattern.all_terms("Query_time:"),
+            metric_namespace=instrumentation.metric_namespace,
+            metric_name="SlowQueryCount",
+            metric_value="1",
+            unit=cloudwatch.Unit.COUNT
+        )
+        # The log group is created by the cluster's log retention resources
+        metric_filter.node.add_dependency(self.aurora_cluster)
+        self.slow_query_metrics = {"SlowQueryCount": metric_filter.metric(statistic="Sum")}
+
+        # Metric filters cannot read a value out of a multi-line event; Logs
+        # Insights parses the execution time from the header line instead
+        self.slow_query_definition = logs.QueryDefinition(
+            self, "SlowQueryDuration",
+            query_definition_name=f"{self.stack_name}/slow-query-duration",
+            log_groups=[slow_query_log_group],
+            query_string=logs.QueryString(
+                parse_statements=[f"@message /{SLOW_QUERY_HEADER_REGEX}/"],
+                stats=(
+                    "count(*) as queries, avg(query_time), pct(query_time, 99), max(query_time), "
+                    "sum(rows_examined) by bin(5m)"
+                )
+            )
+        )
+        self.slow_query_definition.node.add_dependency(self.aurora_cluster)
+
+    def _add_proxy(self, proxy: ProxyProps,
+                   vpc: ec2.Vpc,
+                   app_security_group: ec2.SecurityGroup,
+                   db_password: SecretValue) -> None:
+        """Put an RDS Proxy between the application servers and the cluster."""
+        # RDS Proxy authenticates to the cluster with a Secrets Manager secret
+        proxy_secret = secretsmanager.Secret(
+            self, "ProxySecret",
+            description="Aurora credentials used by RDS Proxy",
+            secret_object_value={
+                "username": SecretValue.unsafe_plain_text(self.DB_USERNAME),
+                "password": db_password
+            }
+        )
+
+        # Security group for the proxy: application servers in; the proxy to
+        # Aurora rules are added by add_proxy
+        proxy_security_group = ec2.SecurityGroup(
+            self, "ProxySecurityGroup",
+            vpc=vpc,
+            description="Security group for RDS Proxy",
+            allow_all_outbound=False
+        )
+        proxy_security_group.add_ingress_rule(
+            peer=app_security_group,
+            connection=ec2.Port.tcp(3306),
+            description="Allow traffic from Application servers"
+        )
+
+        self.db_proxy = self.aurora_cluster.add_proxy(
+            "RDSProxy",
+            secrets=[proxy_secret],
+            vpc=vpc,
+            vpc_subnets=ec2.SubnetSelection(
+                subnets=vpc.isolated_subnets
+            ),
+            security_groups=[proxy_security_group],
+            max_connections_percent=proxy.max_connections_percent,
+            max_idle_connections_percent=proxy.max_idle_connections_percent,
+            idle_client_timeout=Duration.seconds(proxy.idle_client_timeout_seconds),
+            borrow_timeout=Duration.seconds(proxy.borrow_timeout_seconds),
+            require_tls=proxy.require_tls
+        )
+
+        # Output the proxy endpoint for the application to use instead of the cluster endpoint
+        CfnOutput(
+            self, "ProxyEndpoint",
+            value=self.db_proxy.endpoint,
+            description="RDS Proxy Endpoint",
+            export_name="AuroraProxyEndpoint"
+        )
@@ -0,0 +1,123 @@
+from dataclasses import dataclass, field
+import ipaddress
+import math
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+
+# Addresses AWS reserves in every subnet (network, router, DNS, future, broadcast)
+RESERVED_ADDRESSES_PER_SUBNET = 5
+
+# Subnet sizes ec2.Vpc accepts
+MIN_PREFIX = 16
+MAX_PREFIX = 28
+
+
+@dataclass(frozen=True)
+class TierDemand:
+    """
+    Addresses a subnet tier needs.
+
+    `spread` addresses are shared across the AZs (instances, awsvpc tasks,
+    database instances); `per_az` addresses are needed in every AZ
+    (endpoint ENIs, load balancer and NAT gateway nodes).
+    """
+    spread: int = 0
+    per_az: int = 0
+
+
+@dataclass(frozen=True)
+class SubnetPlanProps:
+    """
+    Inputs to the subnet plan.
+
+    Each tier gets the smallest subnet that holds its demand times
+    `growth_factor`, but never smaller than /`max_prefix` so existing /24
+    subnets keep their size. With `survive_az_loss`, spread demand is sized
+    for the remaining AZs taking over a failed AZ's share.
+    """
+    vpc_cidr: str = "10.10.0.0/16"
+    az_count: int = 2
+    growth_factor: float = 2.0
+    max_prefix: int = 24
+    survive_az_loss: bool = True
+
+    def validate(self) -> None:
+        network = ipaddress.ip_network(self.vpc_cidr)
+        if not MIN_PREFIX <= network.prefixlen <= MAX_PREFIX:
+            raise ValueError(f"VPC CIDR must be between /{MIN_PREFIX} and /{MAX_PREFIX}, got {self.vpc_cidr}")
+        if self.az_count < 1:
+            raise ValueError(f"az_count must be at least 1, got {self.az_count}")
+        if self.growth_factor < 1:
+            raise ValueError(f"growth_factor must be at least 1, got {self.growth_factor}")
+        if not MIN_PREFIX <= self.max_prefix <= MAX_PREFIX:
+            raise ValueError(f"max_prefix must be between {MIN_PREFIX} and {MAX_PREFIX}, got {self.max_prefix}")
+
+
+@dataclass(frozen=True)
+class SubnetPlan:
+    """Subnet size per tier and the CIDRs ec2.Vpc will allocate, per tier in AZ order."""
+    vpc_cidr: str
+    az_count: int
+    cidr_masks: Dict[str, int]
+    cidrs: Dict[str, List[str]] = field(default_factory=dict)
+    unallocated_addresses: int = 0
+
+    def usable_addresses(self, tier: str) -> int:
+        return 2 ** (32 - self.cidr_masks[tier]) - RESERVED_ADDRESSES_PER_SUBNET
+
+
+def subnet_prefix(required_addresses: int, max_prefix: int = MAX_PREFIX) -> int:
+    """Longest prefix (smallest subnet, at most /`max_prefix`) with `required_addresses` usable."""
+    size = 2 ** math.ceil(math.log2(max(required_addresses, 1) + RESERVED_ADDRESSES_PER_SUBNET))
+    prefix = min(32 - int(math.log2(size)), max_prefix)
+    if prefix < MIN_PREFIX:
+        raise ValueError(f"{required_addresses} addresses do not fit a /{MIN_PREFIX} subnet")
+    return prefix
+
+
+def plan_subnets(props: SubnetPlanProps, tiers: Sequence[Tuple[str, TierDemand]]) -> SubnetPlan:
+    """
+    Size each tier and check the subnets fit the VPC CIDR.
+
+    Tiers are allocated in order, one subnet per AZ, each aligned to its
+    size, which is how ec2.IpAddresses.cidr lays them out. Raises
+    ValueError when they run past the end of the VPC CIDR.
+    """
+    props.validate()
+    # AZs that carry the spread demand, with one AZ lost if planned for
+    sharing_azs = props.az_count - 1 if props.survive_az_loss and props.az_count > 1 else props.az_count
+
+    cidr_masks: Dict[str, int] = {}
+    for name, demand in tiers:
+        required = math.ceil(demand.spread / sharing_azs) + demand.per_az
+        cidr_masks[name] = subnet_prefix(math.ceil(required * props.growth_factor), props.max_prefix)
+
+    network = ipaddress.ip_network(props.vpc_cidr)
+    next_address = int(network.network_address)
+    end = int(network.broadcast_address) + 1
+    cidrs: Dict[str, List[str]] = {}
+    for name, _ in tiers:
+        block = 2 ** (32 - cidr_masks[name])
+        cidrs[name] = []
+        for _ in range(props.az_count):
+            start = -(-next_address // block) * block
+            if start + block > end:
+                raise ValueError(
+                    f"Subnet plan does not fit {props.vpc_cidr}: {props.az_count} AZs of "
+                    f"{_describe(cidr_masks)} need more addresses; use a larger VPC CIDR, "
+                    f"fewer AZs or a lower growth factor"
+                )
+            cidrs[name].append(f"{ipaddress.ip_address(start)}/{cidr_masks[name]}")
+            next_address = start + block
+
+    return SubnetPlan(
+        vpc_cidr=props.vpc_cidr,
+        az_count=props.az_count,
+        cidr_masks=cidr_masks,
+        cidrs=cidrs,
+        unallocated_addresses=end - next_address
+    )
+
+
+def _describe(cidr_masks: Mapping[str, int]) -> str:
+    return ", ".join(f"{name} /{mask}" for name, mask in cidr_masks.items())
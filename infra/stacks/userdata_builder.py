@@ -0,0 +1,183 @@
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+import base64
+import gzip
+import json
+import re
+
+from aws_cdk import Token
+
+
+# EC2 limit on raw user data, checked after compression
+MAX_USER_DATA_BYTES = 16 * 1024
+
+STAGE_DIR = "/opt/app-setup/stages"
+STATE_DIR = "/run/app-setup"
+LOG_DIR = "/var/log/app-setup"
+TIMING_LOG = f"{LOG_DIR}/timings.log"
+
+_BOUNDARY = "==APP-SETUP-BOUNDARY=="
+_STAGE_NAME = re.compile(r"^[a-z0-9][a-z0-9-]*$")
+
+
+@dataclass(frozen=True)
+class SetupStage:
+    """
+    One boot-time setup step.
+
+    `script` is written to the instance unchanged and executed as its own
+    process, so heredocs, line continuations and functions keep working.
+    Scripts without a shebang run under bash. Stages whose `depends_on` have
+    all succeeded run concurrently.
+    """
+    name: str
+    script: str
+    depends_on: Tuple[str, ...] = ()
+
+
+def stage_waves(stages: Sequence[SetupStage]) -> List[List[str]]:
+    """
+    Group stages into waves that can run concurrently.
+
+    A stage runs in the wave after the last of its dependencies. Raises
+    ValueError for invalid names, unknown dependencies and cycles.
+    """
+    by_name: Dict[str, SetupStage] = {}
+    for stage in stages:
+        if not _STAGE_NAME.match(stage.name):
+            raise ValueError(f"Stage name {stage.name!r} must be lowercase letters, digits and dashes")
+        if stage.name in by_name:
+            raise ValueError(f"Duplicate stage name {stage.name!r}")
+        by_name[stage.name] = stage
+    for stage in stages:
+        unknown = [dep for dep in stage.depends_on if dep not in by_name]
+        if unknown:
+            raise ValueError(f"Stage {stage.name!r} depends on unknown stages {unknown}")
+
+    levels: Dict[str, int] = {}
+    visiting = set()
+
+    def level(name: str) -> int:
+        if name in levels:
+            return levels[name]
+        if name in visiting:
+            raise ValueError(f"Dependency cycle through stage {name!r}")
+        visiting.add(name)
+        levels[name] = 1 + max((level(dep) for dep in by_name[name].depends_on), default=-1)
+        visiting.discard(name)
+        return levels[name]
+
+    waves: List[List[str]] = []
+    for stage in stages:
+        wave = level(stage.name)
+        while len(waves) <= wave:
+            waves.append([])
+        waves[wave].append(stage.name)
+    return waves
+
+
+def build_user_data(stages: Sequence[SetupStage]) -> bytes:
+    """
+    Render `stages` as a gzip-compressed multipart cloud-init document.
+
+    A cloud-config part writes every stage script to disk unchanged, and a
+    shell script part runs them wave by wave. Each stage logs to
+    LOG_DIR/<stage>.log and its timing goes to TIMING_LOG and the cloud-init
+    output log. Raises ValueError if a script contains unresolved tokens or
+    the compressed document exceeds the EC2 user data limit.
+    """
+    waves = stage_waves(stages)
+    for stage in stages:
+        # The document is compressed at synth time, so values must be known now
+        if Token.is_unresolved(stage.script):
+            raise ValueError(f"Stage {stage.name!r} contains unresolved tokens")
+        if _BOUNDARY in stage.script:
+            raise ValueError(f"Stage {stage.name!r} contains the MIME boundary")
+
+    # JSON is valid YAML, and keeps every script byte-for-byte intact
+    cloud_config = {
+        "write_files": [
+            {
+                "path": f"{STAGE_DIR}/{stage.name}.sh",
+                "permissions": "0755",
+                "content": _with_shebang(stage.script),
+            }
+            for stage in stages
+        ]
+    }
+    dependencies = {stage.name: stage.depends_on for stage in stages}
+
+    document = "\n".join([
+        f'Content-Type: multipart/mixed; boundary="{_BOUNDARY}"',
+        "MIME-Version: 1.0",
+        "",
+        f"--{_BOUNDARY}",
+        'Content-Type: text/cloud-config; charset="utf-8"',
+        "MIME-Version: 1.0",
+        "",
+        "#cloud-config",
+        json.dumps(cloud_config, indent=1),
+        f"--{_BOUNDARY}",
+        'Content-Type: text/x-shellscript; charset="utf-8"',
+        "MIME-Version: 1.0",
+        "",
+        _runner_script(waves, dependencies),
+        f"--{_BOUNDARY}--",
+        "",
+    ])
+
+    # Fixed mtime keeps the template stable between synths
+    compressed = gzip.compress(document.encode("utf-8"), mtime=0)
+    if len(compressed) > MAX_USER_DATA_BYTES:
+        raise ValueError(
+            f"Compressed user data is {len(compressed)} bytes, over the {MAX_USER_DATA_BYTES} byte limit"
+        )
+    return compressed
+
+
+def build_user_data_base64(stages: Sequence[SetupStage]) -> str:
+    """Base64 form of build_user_data, as launch templates expect."""
+    return base64.b64encode(build_user_data(stages)).decode("ascii")
+
+
+def _with_shebang(script: str) -> str:
+    return script if script.startswith("#!") else f"#!/bin/bash\n{script}"
+
+
+def _runner_script(waves: List[List[str]], dependencies: Dict[str, Tuple[str, ...]]) -> str:
+    lines = [
+        "#!/bin/bash",
+        f"mkdir -p {STATE_DIR} {LOG_DIR}",
+        "",
+        "# run_stage <name> <wave> <dependencies...>",
+        "run_stage() {",
+        "    local name=$1 wave=$2 dep start rc elapsed; shift 2",
+        "    for dep in \"$@\"; do",
+        f"        if [ ! -e {STATE_DIR}/$dep.ok ]; then",
+        f"            echo \"app-setup stage=$name wave=$wave status=skipped dependency=$dep\" | tee -a {TIMING_LOG}",
+        "            return 1",
+        "        fi",
+        "    done",
+        "    start=$(date +%s.%N)",
+        f"    {STAGE_DIR}/$name.sh > {LOG_DIR}/$name.log 2>&1",
+        "    rc=$?",
+        "    elapsed=$(echo \"$start $(date +%s.%N)\" | awk '{printf \"%.2f\", $2 - $1}')",
+        f"    [ $rc -eq 0 ] && touch {STATE_DIR}/$name.ok",
+        f"    echo \"app-setup stage=$name wave=$wave status=$rc seconds=$elapsed\" | tee -a {TIMING_LOG}",
+        "    return $rc",
+        "}",
+        "",
+        "boot_start=$(date +%s.%N)",
+        "failed=0",
+    ]
+    for number, wave in enumerate(waves, start=1):
+        lines.append(f"# Wave {number}")
+        for name in wave:
+            lines.append(" ".join(["run_stage", name, str(number), *dependencies[name], "&"]))
+        lines.append("for pid in $(jobs -p); do wait \"$pid\" || failed=1; done")
+    lines += [
+        "total=$(echo \"$boot_start $(date +%s.%N)\" | awk '{printf \"%.2f\", $2 - $1}')",
+        f"echo \"app-setup stage=total status=$failed seconds=$total\" | tee -a {TIMING_LOG}",
+        "exit $failed",
+    ]
+    return "\n".join(lines)
@@ -1,3 +1,6 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
 from aws_cdk import (
     Stack,
     aws_ec2 as ec2,
@@ -5,39 +8,149 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+from stacks.subnet_planner import SubnetPlan, SubnetPlanProps, TierDemand, plan_subnets
+
+
+# Port the application listens on (application/userdata.sh), the target
+# group port and the app security group ingress
+APP_PORT = 8443
+
+# Free gateway endpoints, routed from the subnet route tables
+GATEWAY_ENDPOINTS = {
+    "S3": ec2.GatewayVpcEndpointAwsService.S3,
+    "DynamoDB": ec2.GatewayVpcEndpointAwsService.DYNAMODB,
+}
+
+# Interface endpoints for the AWS APIs the instances and tasks call
+INTERFACE_ENDPOINTS = {
+    # Session Manager
+    "SSM": ec2.InterfaceVpcEndpointAwsService.SSM,
+    "SSMMessages": ec2.InterfaceVpcEndpointAwsService.SSM_MESSAGES,
+    "EC2Messages": ec2.InterfaceVpcEndpointAwsService.EC2_MESSAGES,
+    # CloudWatch agent
+    "CloudWatchLogs": ec2.InterfaceVpcEndpointAwsService.CLOUDWATCH_LOGS,
+    "CloudWatchMonitoring": ec2.InterfaceVpcEndpointAwsService.CLOUDWATCH_MONITORING,
+    "SecretsManager": ec2.InterfaceVpcEndpointAwsService.SECRETS_MANAGER,
+    # Image pulls (layers are served from S3 through the gateway endpoint)
+    "ECRApi": ec2.InterfaceVpcEndpointAwsService.ECR,
+    "ECRDocker": ec2.InterfaceVpcEndpointAwsService.ECR_DOCKER,
+}
+
+
+# Subnet tiers in allocation order
+PUBLIC_SUBNETS = "Public"
+PRIVATE_SUBNETS = "Private"
+ISOLATED_SUBNETS = "RDS"
+SUBNET_TIERS = (PUBLIC_SUBNETS, PRIVATE_SUBNETS, ISOLATED_SUBNETS)
+
+
+@dataclass(frozen=True)
+class EgressProps:
+    """
+    Egress from the private subnets.
+
+    Endpoints keep AWS service traffic off the NAT gateway: no NAT data
+    processing charge and no cross-AZ hop. Gateway endpoints are free;
+    interface endpoints are billed per endpoint per AZ-hour, so they are off
+    unless `interface_endpoints` is set (staging and prod profiles).
+    `nat_per_az` puts a NAT gateway in every AZ so the rest of the egress
+    stays in its AZ and has no single NAT as a bottleneck.
+    """
+    nat_per_az: bool = False
+    gateway_endpoints: bool = True
+    interface_endpoints: bool = False
+
+
+def nat_gateway_count(egress: EgressProps) -> Optional[int]:
+    """NAT gateways for ec2.Vpc: None means one per AZ."""
+    return None if egress.nat_per_az else 1
+
+
+def add_vpc_endpoints(vpc: ec2.Vpc, egress: EgressProps) -> Dict[str, str]:
+    """Add the configured endpoints to `vpc` and return their IDs by name."""
+    endpoint_ids = {}
+    if egress.gateway_endpoints:
+        for name, service in GATEWAY_ENDPOINTS.items():
+            # Route tables of every subnet, including the isolated ones
+            endpoint = vpc.add_gateway_endpoint(f"{name}GatewayEndpoint", service=service)
+            endpoint_ids[name] = endpoint.vpc_endpoint_id
+    if egress.interface_endpoints:
+        for name, service in INTERFACE_ENDPOINTS.items():
+            # One ENI per AZ in the private subnets; private DNS makes the
+            # default service hostnames resolve to it
+            endpoint = vpc.add_interface_endpoint(
+                f"{name}InterfaceEndpoint",
+                service=service,
+                subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
+                private_dns_enabled=True
+            )
+            endpoint_ids[name] = endpoint.vpc_endpoint_id
+    return endpoint_ids
+
+
 class VPCStack(Stack):
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+    # AWS-managed prefix list of CloudFront origin-facing addresses
+    CLOUDFRONT_PREFIX_LIST_NAME = "com.amazonaws.global.cloudfront.origin-facing"
+
+    def __init__(self, scope: Construct, construct_id: str,
+                 restrict_alb_to_cloudfront: bool = False,
+                 egress: Optional[EgressProps] = None,
+                 max_azs: int = 2,
+                 subnet_plan: Optional[SubnetPlan] = None,
+                 app_port: int = APP_PORT,
+                 **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        egress = egress or EgressProps()
+        nat_provider = ec2.NatProvider.gateway()
+
+        # Subnet sizes per tier (see subnet_planner); /24s on 10.10.0.0/16 by default
+        subnet_plan = subnet_plan or plan_subnets(
+            SubnetPlanProps(az_count=max_azs),
+            [(tier, TierDemand()) for tier in SUBNET_TIERS]
+        )
+        if subnet_plan.az_count != max_azs:
+            raise ValueError(f"Subnet plan is for {subnet_plan.az_count} AZs, but max_azs is {max_azs}")
+        self.subnet_plan = subnet_plan
+
         # Create VPC
         self.vpc = ec2.Vpc(
             self, 
             "MainVPC",
-            max_azs=2,
-            ip_addresses=ec2.IpAddresses.cidr("10.10.0.0/16"),
-            nat_gateways=1,
+            max_azs=max_azs,
+            ip_addresses=ec2.IpAddresses.cidr(subnet_plan.vpc_cidr),
+            nat_gateway_provider=nat_provider,
+            nat_gateways=nat_gateway_count(egress),
             subnet_configuration=[
                 # Public subnet for NAT Gateway and Load Balancers
                 ec2.SubnetConfiguration(
-                    name="Public",
+                    name=PUBLIC_SUBNETS,
                     subnet_type=ec2.SubnetType.PUBLIC,
-                    cidr_mask=24
+                    cidr_mask=subnet_plan.cidr_masks[PUBLIC_SUBNETS]
                 ),
                 # Private subnet with internet access through NAT Gateway
                 ec2.SubnetConfiguration(
-                    name="Private",
+                    name=PRIVATE_SUBNETS,
                     subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS,
-                    cidr_mask=24
+                    cidr_mask=subnet_plan.cidr_masks[PRIVATE_SUBNETS]
                 ),
                 # Isolated subnet for RDS with no internet access
                 ec2.SubnetConfiguration(
-                    name="RDS",
+                    name=ISOLATED_SUBNETS,
                     subnet_type=ec2.SubnetType.PRIVATE_ISOLATED,
-                    cidr_mask=24
+                    cidr_mask=subnet_plan.cidr_masks[ISOLATED_SUBNETS]
                 )
             ]
         )
 
+        # NAT gateways by AZ, in AZ order
+        self.nat_gateway_ids: List[str] = [
+            gateway.gateway_id for gateway in nat_provider.configured_gateways
+        ]
+
+        # Keep AWS service traffic off the NAT gateway
+        self.endpoint_ids = add_vpc_endpoints(self.vpc, egress)
+
         # Create ALB Security Group
         self.alb_security_group = ec2.SecurityGroup(
             self, "ALBSG",
@@ -47,11 +160,23 @@ class VPCStack(Stack):
         )
 
         # Allow inbound HTTP/HTTPS traffic to ALB
-        self.alb_security_group.add_ingress_rule(
-            peer=ec2.Peer.any_ipv4(),
-            connection=ec2.Port.tcp(80),
-            description="Allow HTTP traffic"
-        )
+        if restrict_alb_to_cloudfront:
+            # Only CloudFront edge locations may reach the ALB (see ALBStack edge cache)
+            cloudfront_prefix_list = ec2.PrefixList.from_lookup(
+                self, "CloudFrontOriginFacing",
+                prefix_list_name=self.CLOUDFRONT_PREFIX_LIST_NAME
+            )
+            self.alb_security_group.add_ingress_rule(
+                peer=ec2.Peer.prefix_list(cloudfront_prefix_list.prefix_list_id),
+                connection=ec2.Port.tcp(80),
+                description="Allow HTTP traffic from CloudFront"
+            )
+        else:
+            self.alb_security_group.add_ingress_rule(
+                peer=ec2.Peer.any_ipv4(),
+                connection=ec2.Port.tcp(80),
+                description="Allow HTTP traffic"
+            )
        
 
         # Create Application Security Group
@@ -65,7 +190,7 @@ class VPCStack(Stack):
         # Allow inbound traffic from ALB to Application
         self.app_security_group.add_ingress_rule(
             peer=self.alb_security_group,
-            connection=ec2.Port.tcp(8443),
+            connection=ec2.Port.tcp(app_port),
             description="Allow HTTPs traffic from ALB"
         )
 
@@ -106,6 +231,21 @@ class VPCStack(Stack):
             description="Allow traffic from Application servers"
         )
 
+        # Create Cache Security Group
+        self.cache_security_group = ec2.SecurityGroup(
+            self, "CacheSecurityGroup",
+            vpc=self.vpc,
+            description="Security group for ElastiCache",
+            allow_all_outbound=False  # Restrict all outbound traffic by default
+        )
+
+        # Allow inbound traffic from Application to Cache
+        self.cache_security_group.add_ingress_rule(
+            peer=self.app_security_group,
+            connection=ec2.Port.tcp(6379),  # Redis/Valkey default port
+            description="Allow traffic from Application servers"
+        )
+
         # Output the VPC ID
         CfnOutput(
             self,
@@ -142,6 +282,16 @@ class VPCStack(Stack):
             export_name="IsolatedSubnets"
         )
 
+        # Output the VPC endpoint IDs
+        for name, endpoint_id in self.endpoint_ids.items():
+            CfnOutput(
+                self,
+                f"{name}EndpointId",
+                value=endpoint_id,
+                description=f"VPC endpoint ID for {name}",
+                export_name=f"{name}EndpointId"
+            )
+
         # Output Security Group IDs
         CfnOutput(
             self,
@@ -165,4 +315,12 @@ class VPCStack(Stack):
             value=self.db_security_group.security_group_id,
             description="Security Group ID for Database",
             export_name="DBSecurityGroup"
-        ) 
\ No newline at end of file
+        )
+
+        CfnOutput(
+            self,
+            "CacheSecurityGroupId",
+            value=self.cache_security_group.security_group_id,
+            description="Security Group ID for Cache",
+            export_name="CacheSecurityGroup"
+        )
@@ -0,0 +1,123 @@
+import aws_cdk as core
+import pytest
+from aws_cdk import aws_elasticloadbalancingv2 as elbv2
+
+from stacks.alb_stack import ALBStack
+from stacks.asg_stack import ASGStack
+from stacks.cache_stack import CacheStack
+from stacks.ecs_stack import EcsServiceProps, EcsStack
+from stacks.image_builder_stack import ImageBuilderStack
+from stacks.observability_stack import ObservabilityStack
+from stacks.rds_stack import RDSStack
+from stacks.vpc_stack import VPCStack
+
+ENV = core.Environment(account="123456789012", region="us-east-1")
+
+
+class StackFactory:
+    """
+    Builds stacks in one app, wired the way app.py wires them.
+
+    The VPC and ALB stacks a stack depends on are created on first use with
+    default settings; build them first to pass settings of their own.
+    """
+    def __init__(self):
+        self.app = core.App()
+        self._vpc_stack = None
+        self._alb_stack = None
+        self._rds_stack = None
+        self._ecs_stack = None
+
+    def vpc(self, **kwargs) -> VPCStack:
+        if self._vpc_stack is None:
+            self._vpc_stack = VPCStack(self.app, "VPCStack", env=ENV, **kwargs)
+        elif kwargs:
+            raise ValueError("The VPC stack is already built")
+        return self._vpc_stack
+
+    def alb(self, **kwargs) -> ALBStack:
+        if self._alb_stack is None:
+            vpc_stack = self.vpc()
+            self._alb_stack = ALBStack(self.app, "ALBStack",
+                vpc=vpc_stack.vpc,
+                alb_sg=vpc_stack.alb_security_group,
+                env=ENV,
+                **kwargs
+            )
+        elif kwargs:
+            raise ValueError("The ALB stack is already built")
+        return self._alb_stack
+
+    def rds(self, with_app_security_group: bool = False, **kwargs) -> RDSStack:
+        vpc_stack = self.vpc()
+        if with_app_security_group:
+            kwargs["app_security_group"] = vpc_stack.app_security_group
+        self._rds_stack = RDSStack(self.app, "RDSStack",
+            vpc=vpc_stack.vpc,
+            db_security_group=vpc_stack.db_security_group,
+            env=ENV,
+            **kwargs
+        )
+        return self._rds_stack
+
+    def cache(self, **kwargs) -> CacheStack:
+        vpc_stack = self.vpc()
+        return CacheStack(self.app, "CacheStack",
+            vpc=vpc_stack.vpc,
+            cache_security_group=vpc_stack.cache_security_group,
+            env=ENV,
+            **kwargs
+        )
+
+    def ecs(self, **kwargs) -> EcsStack:
+        # The ALB forwards to the container port; awsvpc tasks register by IP
+        port = (kwargs.get("service") or EcsServiceProps()).container_port
+        vpc_stack = self._vpc_stack or self.vpc(app_port=port)
+        alb_stack = self._alb_stack or self.alb(target_type=elbv2.TargetType.IP, target_port=port)
+        self._ecs_stack = EcsStack(self.app, "EcsStack",
+            vpc=vpc_stack.vpc,
+            target_group=alb_stack.target_group,
+            app_security_group=vpc_stack.app_security_group,
+            env=ENV,
+            **kwargs
+        )
+        return self._ecs_stack
+
+    def asg(self, **kwargs) -> ASGStack:
+        vpc_stack = self.vpc()
+        return ASGStack(self.app, "ASGStack",
+            vpc=vpc_stack.vpc,
+            target_group=self.alb().target_group,
+            app_security_group=vpc_stack.app_security_group,
+            env=ENV,
+            **kwargs
+        )
+
+    def image_builder(self, construct_id: str = "ImageBuilderStack", **kwargs) -> ImageBuilderStack:
+        vpc_stack = self.vpc()
+        return ImageBuilderStack(self.app, construct_id,
+            vpc=vpc_stack.vpc,
+            app_security_group=vpc_stack.app_security_group,
+            env=ENV,
+            **kwargs
+        )
+
+    def observability(self, **kwargs) -> ObservabilityStack:
+        vpc_stack = self.vpc()
+        rds_stack = self._rds_stack or self.rds()
+        if "asg" not in kwargs:
+            kwargs["ecs_service"] = (self._ecs_stack or self.ecs()).service
+        alb_stack = self.alb()
+        return ObservabilityStack(self.app, "ObservabilityStack",
+            alb=alb_stack.alb,
+            target_group=alb_stack.target_group,
+            aurora_cluster=rds_stack.aurora_cluster,
+            nat_gateway_ids=vpc_stack.nat_gateway_ids,
+            env=ENV,
+            **kwargs
+        )
+
+
+@pytest.fixture
+def stacks() -> StackFactory:
+    return StackFactory()
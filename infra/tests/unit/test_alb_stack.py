@@ -0,0 +1,80 @@
+import aws_cdk.assertions as assertions
+import pytest
+
+from stacks.alb_stack import AlbTuningProps, EdgeCacheProps
+from stacks.vpc_stack import APP_PORT
+
+
+def test_edge_cache_fronts_alb_with_cloudfront(stacks):
+    vpc_stack = stacks.vpc(restrict_alb_to_cloudfront=True)
+    template = assertions.Template.from_stack(stacks.alb(edge_cache=EdgeCacheProps()))
+    vpc_template = assertions.Template.from_stack(vpc_stack)
+
+    template.has_resource_properties("AWS::CloudFront::Distribution", {
+        "DistributionConfig": assertions.Match.object_like({
+            "Origins": [assertions.Match.object_like({
+                "OriginShield": {"Enabled": True, "OriginShieldRegion": "us-east-1"}
+            })],
+            "CacheBehaviors": assertions.Match.array_with([
+                assertions.Match.object_like({"PathPattern": "/static/*", "Compress": True}),
+                assertions.Match.object_like({"PathPattern": "/api/*", "Compress": True})
+            ])
+        })
+    })
+    # Requests that bypass CloudFront are rejected by the listener and the security group
+    template.has_resource_properties("AWS::ElasticLoadBalancingV2::Listener", {
+        "DefaultActions": [assertions.Match.object_like({"Type": "fixed-response"})]
+    })
+    vpc_template.has_resource_properties("AWS::EC2::SecurityGroupIngress", {
+        "FromPort": 80,
+        "SourcePrefixListId": assertions.Match.any_value()
+    })
+
+
+def test_edge_cache_rejects_overlapping_paths():
+    with pytest.raises(ValueError):
+        EdgeCacheProps(static_path_patterns=("/api/*",)).validate()
+
+
+def test_tuning_adds_https_and_fast_target_registration(stacks):
+    template = assertions.Template.from_stack(stacks.alb(tuning=AlbTuningProps(
+        certificate_arn="arn:aws:acm:us-east-1:123456789012:certificate/example",
+        deregistration_delay_seconds=15
+    )))
+
+    template.has_resource_properties("AWS::ElasticLoadBalancingV2::Listener", {
+        "Port": 443,
+        "Protocol": "HTTPS"
+    })
+    template.has_resource_properties("AWS::ElasticLoadBalancingV2::Listener", {
+        "Port": 80,
+        "DefaultActions": [assertions.Match.object_like({"Type": "redirect"})]
+    })
+    template.has_resource_properties("AWS::ElasticLoadBalancingV2::TargetGroup", {
+        "HealthCheckIntervalSeconds": 10,
+        "HealthyThresholdCount": 2,
+        "TargetGroupAttributes": assertions.Match.array_with([
+            {"Key": "deregistration_delay.timeout_seconds", "Value": "15"},
+            {"Key": "load_balancing.algorithm.type", "Value": "least_outstanding_requests"}
+        ])
+    })
+
+
+def test_tuning_rejects_slow_start_with_least_outstanding_requests():
+    with pytest.raises(ValueError):
+        AlbTuningProps(slow_start_seconds=60).validate()
+
+
+def test_app_servers_are_reached_on_the_application_port(stacks):
+    template = assertions.Template.from_stack(stacks.alb())
+    vpc_template = assertions.Template.from_stack(stacks.vpc())
+
+    template.has_resource_properties("AWS::ElasticLoadBalancingV2::TargetGroup", {
+        "Port": APP_PORT,
+        "HealthCheckPort": str(APP_PORT),
+        "TargetType": "instance"
+    })
+    vpc_template.has_resource_properties("AWS::EC2::SecurityGroupIngress", {
+        "FromPort": APP_PORT,
+        "ToPort": APP_PORT
+    })
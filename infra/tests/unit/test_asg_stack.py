@@ -0,0 +1,339 @@
+import base64
+import gzip
+
+import aws_cdk.assertions as assertions
+import pytest
+from aws_cdk import aws_autoscaling as autoscaling, aws_ec2 as ec2
+
+from stacks.asg_stack import (
+    BAKED_APPLICATION_PATH,
+    SLEEP_HOOK_PATH,
+    USERDATA_PATH,
+    AsgScalingProps,
+    HostMetricsProps,
+    Gp3VolumeProps,
+    InstanceTypeOption,
+    LaunchOptionsProps,
+    MixedInstancesProps,
+    ScheduledScalingProps,
+    WarmPoolProps,
+    cloudwatch_agent_config,
+    instance_memory_gib,
+)
+
+
+def _user_data(template, template_id="AppServerTemplate"):
+    """Decompressed user data document of the launch template `template_id`."""
+    launch_template, = [
+        resource for logical_id, resource in template.find_resources("AWS::EC2::LaunchTemplate").items()
+        if logical_id.startswith(template_id)
+    ]
+    encoded = launch_template["Properties"]["LaunchTemplateData"]["UserData"]
+    return gzip.decompress(base64.b64decode(encoded)).decode()
+
+
+def test_default_scaling_props_are_valid():
+    AsgScalingProps().validate()
+
+
+def test_desired_capacity_must_be_within_bounds():
+    with pytest.raises(ValueError, match="desired_capacity"):
+        AsgScalingProps(min_capacity=2, max_capacity=4, desired_capacity=1).validate()
+
+
+def test_predictive_scaling_needs_request_count_target():
+    with pytest.raises(ValueError, match="requests_per_target"):
+        AsgScalingProps(requests_per_target=None).validate()
+
+
+def test_scheduled_action_must_change_capacity():
+    peak = ScheduledScalingProps(name="MorningPeak", schedule="0 8 * * MON-FRI")
+    with pytest.raises(ValueError, match="at least one capacity"):
+        AsgScalingProps(scheduled_actions=(peak,)).validate()
+
+
+def test_agent_config_collects_high_resolution_metrics_per_group():
+    config = cloudwatch_agent_config(HostMetricsProps(procstat_patterns=("gunicorn",)))
+
+    assert config["agent"]["metrics_collection_interval"] == 10
+    assert config["metrics"]["append_dimensions"] == {"AutoScalingGroupName": "${aws:AutoScalingGroupName}"}
+    collected = config["metrics"]["metrics_collected"]
+    assert {"mem", "diskio", "net", "netstat", "procstat"} <= set(collected)
+    assert collected["procstat"][0]["pattern"] == "gunicorn"
+
+
+def test_agent_config_parameter_is_named_per_stack(stacks):
+    template = assertions.Template.from_stack(stacks.asg())
+
+    template.has_resource_properties("AWS::SSM::Parameter", {
+        "Name": "/ASGStack/cloudwatch-agent-config",
+        "Type": "String",
+        "Value": assertions.Match.serialized_json(assertions.Match.object_like({
+            "metrics": assertions.Match.object_like({"namespace": "AppServer"})
+        }))
+    })
+    assert "-c ssm:/ASGStack/cloudwatch-agent-config" in _user_data(template)
+
+
+def test_agent_collection_interval_must_be_supported():
+    with pytest.raises(ValueError, match="collection_interval_seconds"):
+        HostMetricsProps(collection_interval_seconds=15).validate()
+
+
+def test_mixed_instances_props_reject_duplicate_types():
+    with pytest.raises(ValueError, match="unique"):
+        MixedInstancesProps(instance_types=(
+            InstanceTypeOption("m7g.large", 2), InstanceTypeOption("m7g.large", 2)
+        )).validate()
+
+
+def test_mixed_instances_props_detect_graviton_types():
+    props = MixedInstancesProps(instance_types=(InstanceTypeOption("m6i.large", 2), InstanceTypeOption("m7g.xlarge", 4)))
+
+    assert props.uses_arm
+    assert props.min_weight == 2
+    assert not MixedInstancesProps(instance_types=(InstanceTypeOption("m6i.large", 2),)).uses_arm
+
+
+@pytest.mark.parametrize("volume", [
+    # More than 500 IOPS per GiB, above the gp3 maximum, more throughput than IOPS / 4
+    Gp3VolumeProps(4, iops=3000),
+    Gp3VolumeProps(100, iops=20000),
+    Gp3VolumeProps(100, throughput_mibps=1000),
+])
+def test_gp3_volume_limits(volume):
+    with pytest.raises(ValueError, match="gp3"):
+        volume.validate()
+
+
+def test_launch_options_reject_duplicate_mount_points():
+    options = LaunchOptionsProps(
+        data_volumes=(Gp3VolumeProps(100, mount_point="/data"),),
+        instance_store_mount_point="/data"
+    )
+    with pytest.raises(ValueError, match="unique"):
+        options.validate()
+
+
+def test_user_data_runs_the_application_setup(stacks):
+    template = assertions.Template.from_stack(stacks.asg())
+
+    document = _user_data(template)
+    with open(USERDATA_PATH) as f:
+        application_script = f.read()
+    assert '"path": "/opt/app-setup/stages/application.sh"' in document
+    assert application_script.splitlines()[-1] in document
+
+
+def test_baked_ami_falls_back_to_the_full_setup_until_built(stacks):
+    template = assertions.Template.from_stack(stacks.asg(ami_parameter_name="/app-server/ami-id"))
+
+    # Resolved by EC2 at launch, so new builds reach scale-outs without a deploy
+    template.has_resource_properties("AWS::EC2::LaunchTemplate", {
+        "LaunchTemplateData": assertions.Match.object_like({"ImageId": "resolve:ssm:/app-server/ami-id"})
+    })
+    assert not template.find_parameters("*", {"Type": "AWS::SSM::Parameter::Value<AWS::EC2::Image::Id>"})
+    document = _user_data(template)
+    with open(USERDATA_PATH) as f:
+        application_script = f.read()
+    assert f"[ -e {BAKED_APPLICATION_PATH} ] && exit 0" in document
+    assert application_script.splitlines()[-1] in document
+    assert "rpm -q amazon-cloudwatch-agent || yum install" in document
+
+
+def test_warm_pool_instances_complete_the_ready_hook(stacks):
+    template = assertions.Template.from_stack(stacks.asg(warm_pool=WarmPoolProps()))
+
+    template.has_resource_properties("AWS::AutoScaling::WarmPool", {"PoolState": "Stopped"})
+    template.has_resource_properties("AWS::AutoScaling::LifecycleHook", {
+        "LifecycleHookName": "app-ready",
+        "LifecycleTransition": "autoscaling:EC2_INSTANCE_LAUNCHING",
+        "DefaultResult": "ABANDON"
+    })
+    # Group ARNs are autoScalingGroup:<uuid>:autoScalingGroupName/<name>
+    template.has_resource_properties("AWS::IAM::Policy", {
+        "PolicyDocument": {"Statement": assertions.Match.array_with([{
+            "Action": "autoscaling:CompleteLifecycleAction",
+            "Effect": "Allow",
+            "Resource": {"Fn::Join": ["", [
+                "arn:", {"Ref": "AWS::Partition"},
+                ":autoscaling:us-east-1:123456789012:autoScalingGroup:*:autoScalingGroupName/ASGStack-AppServerASG*"
+            ]]}
+        }])}
+    })
+    document = _user_data(template)
+    assert "app-ready-signal.service" in document
+    assert SLEEP_HOOK_PATH not in document
+
+
+def test_hibernated_pool_sizes_the_root_volume_and_signals_on_resume(stacks):
+    template = assertions.Template.from_stack(stacks.asg(
+        instance_type=ec2.InstanceType("m6i.large"),
+        warm_pool=WarmPoolProps(pool_state=autoscaling.PoolState.HIBERNATED)
+    ))
+
+    # 8 GiB of RAM on top of the 8 GiB AMI root volume
+    template.has_resource_properties("AWS::EC2::LaunchTemplate", {
+        "LaunchTemplateData": assertions.Match.object_like({
+            "HibernationOptions": {"Configured": True},
+            "BlockDeviceMappings": [{
+                "DeviceName": "/dev/xvda",
+                "Ebs": assertions.Match.object_like({"Encrypted": True, "VolumeSize": 16})
+            }]
+        })
+    })
+    assert SLEEP_HOOK_PATH in _user_data(template)
+
+
+def test_hibernation_rejects_a_root_volume_smaller_than_ram(stacks):
+    with pytest.raises(ValueError, match="at least 16 GiB"):
+        stacks.asg(
+            instance_type=ec2.InstanceType("m6i.large"),
+            warm_pool=WarmPoolProps(pool_state=autoscaling.PoolState.HIBERNATED),
+            launch_options=LaunchOptionsProps(root_volume=Gp3VolumeProps(10))
+        )
+
+
+@pytest.mark.parametrize("instance_type, memory_gib", [
+    ("t3.micro", 1),
+    ("m6i.large", 8),
+    ("c7g.2xlarge", 16),
+    ("r6i.xlarge", 32),
+])
+def test_instance_memory_by_family_and_size(instance_type, memory_gib):
+    assert instance_memory_gib(instance_type) == memory_gib
+
+
+def test_scaling_tracks_requests_forecasts_and_follows_schedule(stacks):
+    template = assertions.Template.from_stack(stacks.asg(scaling=AsgScalingProps(
+        max_capacity=4,
+        predictive_max_capacity_buffer_percent=10,
+        scheduled_actions=(ScheduledScalingProps("MorningPeak", "0 8 * * MON-FRI", min_capacity=2),)
+    )))
+
+    template.has_resource_properties("AWS::AutoScaling::ScalingPolicy", {
+        "PolicyType": "TargetTrackingScaling",
+        "TargetTrackingConfiguration": {
+            "PredefinedMetricSpecification": assertions.Match.object_like({
+                "PredefinedMetricType": "ALBRequestCountPerTarget"
+            }),
+            "TargetValue": 500
+        }
+    })
+    template.has_resource_properties("AWS::AutoScaling::ScalingPolicy", {
+        "PolicyType": "PredictiveScaling",
+        "PredictiveScalingConfiguration": {
+            "Mode": "ForecastAndScale",
+            "SchedulingBufferTime": 300,
+            "MaxCapacityBreachBehavior": "IncreaseMaxCapacity",
+            "MaxCapacityBuffer": 10,
+            "MetricSpecifications": [{
+                "TargetValue": 500,
+                "PredefinedMetricPairSpecification": assertions.Match.object_like({
+                    "PredefinedMetricType": "ALBRequestCount"
+                })
+            }]
+        }
+    })
+    template.has_resource_properties("AWS::AutoScaling::ScheduledAction", {
+        "Recurrence": "0 8 * * MON-FRI",
+        "TimeZone": "UTC",
+        "MinSize": 2
+    })
+
+
+def test_scaling_tracks_agent_memory_and_connection_metrics(stacks):
+    template = assertions.Template.from_stack(stacks.asg(scaling=AsgScalingProps(
+        memory_target_percent=70, connections_per_instance=200
+    )))
+
+    for metric_name, target in (("mem_used_percent", 70), ("netstat_tcp_established", 200)):
+        template.has_resource_properties("AWS::AutoScaling::ScalingPolicy", {
+            "PolicyType": "TargetTrackingScaling",
+            "TargetTrackingConfiguration": {
+                "CustomizedMetricSpecification": {
+                    "Namespace": "AppServer",
+                    "MetricName": metric_name,
+                    "Statistic": "Average",
+                    "Dimensions": [{
+                        "Name": "AutoScalingGroupName",
+                        "Value": {"Ref": assertions.Match.string_like_regexp("AppServerASG")}
+                    }]
+                },
+                "TargetValue": target
+            }
+        })
+
+
+def test_mixed_instances_launch_graviton_types_from_the_arm64_template(stacks):
+    template = assertions.Template.from_stack(stacks.asg(mixed_instances=MixedInstancesProps()))
+
+    arm_template = {
+        "LaunchTemplateId": {"Ref": assertions.Match.string_like_regexp("AppServerArmTemplate")},
+        "Version": assertions.Match.any_value()
+    }
+    template.has_resource_properties("AWS::AutoScaling::AutoScalingGroup", {
+        "CapacityRebalance": True,
+        "MixedInstancesPolicy": {
+            "InstancesDistribution": {
+                "OnDemandAllocationStrategy": "prioritized",
+                "OnDemandBaseCapacity": 2,
+                "OnDemandPercentageAboveBaseCapacity": 25,
+                "SpotAllocationStrategy": "capacity-optimized"
+            },
+            "LaunchTemplate": {
+                "LaunchTemplateSpecification": assertions.Match.object_like({
+                    "LaunchTemplateId": {"Ref": assertions.Match.string_like_regexp("AppServerTemplate")}
+                }),
+                "Overrides": [
+                    {"InstanceType": "m7g.large", "WeightedCapacity": "2", "LaunchTemplateSpecification": arm_template},
+                    {"InstanceType": "m6g.large", "WeightedCapacity": "2", "LaunchTemplateSpecification": arm_template},
+                    {"InstanceType": "c7g.large", "WeightedCapacity": "2", "LaunchTemplateSpecification": arm_template},
+                    {"InstanceType": "m6i.large", "WeightedCapacity": "2"},
+                    {"InstanceType": "m5.large", "WeightedCapacity": "2"},
+                ]
+            }
+        }
+    })
+    template.has_resource_properties("AWS::EC2::LaunchTemplate", {
+        "LaunchTemplateData": assertions.Match.object_like({
+            "ImageId": {"Ref": assertions.Match.string_like_regexp("al2023amikernel61arm64")}
+        })
+    })
+    assert _user_data(template, "AppServerArmTemplate") == _user_data(template)
+
+
+def test_launch_templates_map_gp3_volumes_into_the_placement_group(stacks):
+    template = assertions.Template.from_stack(stacks.asg(launch_options=LaunchOptionsProps(
+        root_volume=Gp3VolumeProps(20, throughput_mibps=250),
+        data_volumes=(Gp3VolumeProps(100, iops=6000, throughput_mibps=500, mount_point="/data"),),
+        placement_strategy=ec2.PlacementGroupStrategy.SPREAD
+    )))
+
+    template.has_resource_properties("AWS::EC2::PlacementGroup", {"Strategy": "spread"})
+    template.has_resource_properties("AWS::EC2::LaunchTemplate", {
+        "LaunchTemplateData": assertions.Match.object_like({
+            "BlockDeviceMappings": [
+                {"DeviceName": "/dev/xvda", "Ebs": {
+                    "VolumeType": "gp3", "VolumeSize": 20, "Iops": 3000, "Throughput": 250, "Encrypted": True
+                }},
+                {"DeviceName": "/dev/sdf", "Ebs": {
+                    "VolumeType": "gp3", "VolumeSize": 100, "Iops": 6000, "Throughput": 500, "Encrypted": True
+                }},
+            ],
+            "Placement": {"GroupName": {"Fn::GetAtt": [
+                assertions.Match.string_like_regexp("AppServerPlacementGroup"), "GroupName"
+            ]}}
+        })
+    })
+    assert "/data" in _user_data(template)
+
+
+def test_cluster_placement_keeps_the_group_in_one_az(stacks):
+    template = assertions.Template.from_stack(stacks.asg(
+        launch_options=LaunchOptionsProps(placement_strategy=ec2.PlacementGroupStrategy.CLUSTER)
+    ))
+
+    template.has_resource_properties("AWS::EC2::PlacementGroup", {"Strategy": "cluster"})
+    group, = template.find_resources("AWS::AutoScaling::AutoScalingGroup").values()
+    assert len(group["Properties"]["VPCZoneIdentifier"]) == 1
@@ -0,0 +1,28 @@
+import aws_cdk.assertions as assertions
+
+from stacks.cache_stack import CacheProps
+
+
+def test_cache_exports_primary_and_reader_endpoints(stacks):
+    template = assertions.Template.from_stack(stacks.cache())
+
+    template.has_resource_properties("AWS::ElastiCache::ReplicationGroup", {
+        "ClusterMode": "disabled",
+        "NumCacheClusters": 2,
+        "MultiAZEnabled": True
+    })
+    template.has_output("CachePrimaryEndpoint", {"Export": {"Name": "CachePrimaryEndpoint"}})
+    template.has_output("CacheReaderEndpoint", {"Export": {"Name": "CacheReaderEndpoint"}})
+
+
+def test_cluster_mode_shards_the_replication_group(stacks):
+    template = assertions.Template.from_stack(
+        stacks.cache(cache=CacheProps(cluster_mode=True, shards=3, replicas_per_shard=2))
+    )
+
+    template.has_resource_properties("AWS::ElastiCache::ReplicationGroup", {
+        "CacheParameterGroupName": "default.valkey8.cluster.on",
+        "NumNodeGroups": 3,
+        "ReplicasPerNodeGroup": 2
+    })
+    template.has_output("CacheConfigurationEndpoint", {})
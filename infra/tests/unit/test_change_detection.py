@@ -0,0 +1,40 @@
+import aws_cdk as core
+import aws_cdk.aws_sns as sns
+
+from scripts.change_detection import source_hash, stack_hashes
+
+
+def _assembly(outdir, topic_name):
+    app = core.App(outdir=str(outdir))
+    stack = core.Stack(app, "Messaging")
+    sns.Topic(stack, "Topic", topic_name=topic_name)
+    core.Stack(app, "Empty")
+    app.synth()
+    return str(outdir)
+
+
+def test_stack_hash_changes_only_for_the_changed_stack(tmp_path):
+    before = stack_hashes(_assembly(tmp_path / "before", "orders"))
+    again = stack_hashes(_assembly(tmp_path / "again", "orders"))
+    after = stack_hashes(_assembly(tmp_path / "after", "payments"))
+
+    assert set(before) == {"Messaging", "Empty"}
+    assert before == again
+    assert after["Messaging"] != before["Messaging"]
+    assert after["Empty"] == before["Empty"]
+
+
+def test_source_hash_ignores_tests_and_bytecode(tmp_path):
+    (tmp_path / "stacks").mkdir()
+    (tmp_path / "stacks" / "app_stack.py").write_text("BUCKETS = 1\n")
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_app_stack.py").write_text("def test(): pass\n")
+    paths = [str(tmp_path)]
+    baseline = source_hash(paths)
+
+    (tmp_path / "tests" / "test_app_stack.py").write_text("def test(): assert True\n")
+    (tmp_path / "stacks" / "app_stack.pyc").write_bytes(b"\0")
+    assert source_hash(paths) == baseline
+
+    (tmp_path / "stacks" / "app_stack.py").write_text("BUCKETS = 2\n")
+    assert source_hash(paths) != baseline
@@ -0,0 +1,117 @@
+import aws_cdk.assertions as assertions
+import pytest
+
+from stacks.ecs_stack import (
+    CapacityProviderWeight,
+    EcsServiceProps,
+    FargateBurstProps,
+    fargate_task_size,
+)
+
+
+def test_service_spreads_then_binpacks_on_managed_capacity(stacks):
+    template = assertions.Template.from_stack(stacks.ecs())
+
+    template.has_resource_properties("AWS::ECS::Service", {
+        "PlacementStrategies": [
+            {"Type": "spread", "Field": "attribute:ecs.availability-zone"},
+            {"Type": "binpack", "Field": "MEMORY"}
+        ],
+        "LoadBalancers": [assertions.Match.object_like({"ContainerPort": 80})]
+    })
+    template.has_resource_properties("AWS::ECS::CapacityProvider", {
+        "AutoScalingGroupProvider": assertions.Match.object_like({
+            "ManagedScaling": assertions.Match.object_like({"Status": "ENABLED", "TargetCapacity": 90})
+        })
+    })
+
+
+
+def test_load_balancer_forwards_to_the_sample_image_port(stacks):
+    ecs_stack = stacks.ecs()
+    template = assertions.Template.from_stack(ecs_stack)
+    alb_template = assertions.Template.from_stack(stacks.alb())
+    vpc_template = assertions.Template.from_stack(stacks.vpc())
+
+    template.has_resource_properties("AWS::ECS::TaskDefinition", {
+        "ContainerDefinitions": [assertions.Match.object_like({
+            "PortMappings": [{"ContainerPort": 80, "Protocol": "tcp"}]
+        })]
+    })
+    alb_template.has_resource_properties("AWS::ElasticLoadBalancingV2::TargetGroup", {
+        "Port": 80,
+        "HealthCheckPort": "80",
+        "TargetType": "ip"
+    })
+    vpc_template.has_resource_properties("AWS::EC2::SecurityGroupIngress", {
+        "FromPort": 80,
+        "ToPort": 80,
+        "Description": "Allow HTTPs traffic from ALB"
+    })
+
+def test_service_scales_on_cpu_memory_and_requests(stacks):
+    template = assertions.Template.from_stack(stacks.ecs())
+
+    template.resource_count_is("AWS::ApplicationAutoScaling::ScalingPolicy", 3)
+    template.has_resource_properties("AWS::ApplicationAutoScaling::ScalingPolicy", {
+        "TargetTrackingScalingPolicyConfiguration": assertions.Match.object_like({
+            "PredefinedMetricSpecification": assertions.Match.object_like({
+                "PredefinedMetricType": "ALBRequestCountPerTarget"
+            }),
+            "TargetValue": 500
+        })
+    })
+
+
+def test_binpack_on_cpu_without_az_spread(stacks):
+    template = assertions.Template.from_stack(
+        stacks.ecs(service=EcsServiceProps(binpack_on="cpu", spread_across_azs=False))
+    )
+
+    template.has_resource_properties("AWS::ECS::Service", {
+        "PlacementStrategies": [{"Type": "binpack", "Field": "CPU"}]
+    })
+
+
+@pytest.mark.parametrize("container, expected", [
+    ((256, 256), (256, 512)),
+    ((256, 1500), (256, 2048)),
+    ((256, 3000), (512, 3072)),
+    ((2048, 20000), (4096, 20480)),
+])
+def test_fargate_task_size_rounds_up_to_a_valid_combination(container, expected):
+    assert fargate_task_size(*container) == expected
+
+
+def test_burst_service_runs_on_fargate_and_fargate_spot(stacks):
+    burst = FargateBurstProps(
+        fargate=CapacityProviderWeight(base=1, weight=1),
+        fargate_spot=CapacityProviderWeight(weight=4)
+    )
+    template = assertions.Template.from_stack(
+        stacks.ecs(service=EcsServiceProps(task_cpu=256, task_memory_mib=1500), burst=burst)
+    )
+
+    template.has_resource_properties("AWS::ECS::TaskDefinition", {
+        "RequiresCompatibilities": ["FARGATE"],
+        "Cpu": "256",
+        "Memory": "2048"
+    })
+    template.has_resource_properties("AWS::ECS::Service", {
+        "CapacityProviderStrategy": [
+            {"CapacityProvider": "FARGATE", "Base": 1, "Weight": 1},
+            {"CapacityProvider": "FARGATE_SPOT", "Weight": 4}
+        ]
+    })
+    # Burst tasks scale out above the EC2 service's request target
+    template.has_resource_properties("AWS::ApplicationAutoScaling::ScalingPolicy", {
+        "TargetTrackingScalingPolicyConfiguration": assertions.Match.object_like({"TargetValue": 625})
+    })
+
+
+def test_tasks_beyond_instance_enis_are_rejected():
+    # t3.medium: 3 ENIs, one of them the instance's own
+    with pytest.raises(ValueError, match="ENIs for 8 awsvpc tasks, but max_tasks is 10"):
+        EcsServiceProps(max_tasks=10).validate()
+    EcsServiceProps(max_tasks=10, max_instances=5).validate()
+    EcsServiceProps(max_tasks=10, tasks_per_instance=10, max_instances=1).validate()
@@ -0,0 +1,98 @@
+import json
+
+import aws_cdk.aws_cloudfront as cloudfront
+import aws_cdk.aws_codebuild as codebuild
+import pytest
+
+from stacks.environment_profiles import PROFILES, load_profile
+
+
+@pytest.mark.parametrize("profile_name", sorted(PROFILES))
+@pytest.mark.parametrize("compute_backend", ["asg", "ecs"])
+def test_named_profiles_are_consistent(profile_name, compute_backend):
+    PROFILES[profile_name].validate(compute_backend)
+
+
+def test_custom_profile_overrides_its_base(tmp_path):
+    path = tmp_path / "perf.json"
+    path.write_text(json.dumps({
+        "name": "perf",
+        "base": "prod",
+        "app_scaling": {"max_capacity": 20},
+        "database": {"readers": {"instances": 2}},
+        "build": {"synth_compute_type": "X_LARGE"}
+    }))
+
+    profile = load_profile(str(path))
+
+    assert profile.name == "perf"
+    assert profile.app_scaling.max_capacity == 20
+    assert profile.app_scaling.min_capacity == PROFILES["prod"].app_scaling.min_capacity
+    assert profile.database.readers.instances == 2
+    assert profile.database.instance_type == "r6g.large"
+    assert profile.build.synth_compute_type == codebuild.ComputeType.X_LARGE
+    profile.validate("asg")
+
+
+def test_capacity_beyond_database_connections_is_rejected(tmp_path):
+    path = tmp_path / "too-big.json"
+    path.write_text(json.dumps({"name": "too-big", "app_scaling": {"max_capacity": 20}}))
+
+    with pytest.raises(ValueError, match="400 database connections"):
+        load_profile(str(path)).validate("asg")
+
+
+def test_unknown_field_is_rejected(tmp_path):
+    path = tmp_path / "typo.json"
+    path.write_text(json.dumps({"name": "typo", "app_scaling": {"max_capcity": 20}}))
+
+    with pytest.raises(ValueError, match="max_capcity"):
+        load_profile(str(path))
+
+
+@pytest.mark.parametrize("profile_name, interface_endpoints", [("dev", False), ("staging", True), ("prod", True)])
+def test_interface_endpoints_are_enabled_outside_dev(profile_name, interface_endpoints):
+    assert PROFILES[profile_name].egress.interface_endpoints is interface_endpoints
+
+
+def test_custom_profile_sizes_the_cache_and_load_balancer(tmp_path):
+    path = tmp_path / "perf.json"
+    path.write_text(json.dumps({
+        "name": "perf",
+        "base": "prod",
+        "cache": {"shards": 2},
+        "alb_tuning": {"load_balancing_algorithm": "ROUND_ROBIN", "slow_start_seconds": 60}
+    }))
+
+    profile = load_profile(str(path))
+
+    # Two shards need cluster mode
+    with pytest.raises(ValueError, match="cluster_mode"):
+        profile.validate("asg")
+    assert profile.cache.node_type == "cache.r7g.large"
+    assert profile.alb_tuning.slow_start_seconds == 60
+
+
+def test_prod_pools_database_connections_through_a_proxy(tmp_path):
+    path = tmp_path / "direct.json"
+    path.write_text(json.dumps({"name": "direct", "base": "prod", "database": {"proxy": None}}))
+
+    assert PROFILES["prod"].database.proxy is not None
+    assert PROFILES["dev"].database.proxy is None
+    assert load_profile(str(path)).database.proxy is None
+
+
+def test_custom_profile_enables_the_edge_cache(tmp_path):
+    path = tmp_path / "edge.json"
+    path.write_text(json.dumps({
+        "name": "edge",
+        "edge_cache": {"api_max_ttl_seconds": 30, "static_path_patterns": ["/static/*"], "price_class": "PRICE_CLASS_ALL"}
+    }))
+
+    profile = load_profile(str(path))
+
+    assert PROFILES["dev"].edge_cache is None
+    assert profile.edge_cache.api_max_ttl_seconds == 30
+    assert profile.edge_cache.static_path_patterns == ("/static/*",)
+    assert profile.edge_cache.price_class == cloudfront.PriceClass.PRICE_CLASS_ALL
+    profile.validate("asg")
@@ -0,0 +1,70 @@
+import json
+
+import aws_cdk.assertions as assertions
+
+from stacks import image_builder_stack
+from stacks.asg_stack import USERDATA_PATH
+from stacks.image_builder_stack import ImageBuilderProps
+
+
+def _names(template):
+    component, = template.find_resources("AWS::ImageBuilder::Component").values()
+    recipe, = template.find_resources("AWS::ImageBuilder::ImageRecipe").values()
+    return component["Properties"]["Name"], recipe["Properties"]["Name"]
+
+
+def test_component_bakes_the_application_script(stacks):
+    template = assertions.Template.from_stack(stacks.image_builder())
+
+    component, = template.find_resources("AWS::ImageBuilder::Component").values()
+    with open(USERDATA_PATH) as f:
+        for line in f.read().splitlines():
+            assert f"              {line}".rstrip() in component["Properties"]["Data"]
+    template.has_resource_properties("AWS::ImageBuilder::ImagePipeline", {
+        "Schedule": assertions.Match.object_like({"ScheduleExpression": "cron(0 3 ? * SUN *)"})
+    })
+
+
+def test_ami_parameter_is_never_written_by_updates(stacks):
+    template = assertions.Template.from_stack(stacks.image_builder())
+
+    # Image Builder owns the value: no CloudFormation parameter, created once at the stock AMI
+    template.resource_count_is("AWS::SSM::Parameter", 0)
+    parameter, = [
+        resource for logical_id, resource in template.find_resources("Custom::AWS").items()
+        if logical_id.startswith("AmiParameter")
+    ]
+    assert "putParameter" in json.dumps(parameter["Properties"]["Create"])
+    assert "Update" not in parameter["Properties"]
+
+
+def test_distribution_publishes_the_ami_to_the_parameter(stacks):
+    template = assertions.Template.from_stack(stacks.image_builder())
+
+    template.has_resource_properties("AWS::ImageBuilder::DistributionConfiguration", {
+        "Distributions": [assertions.Match.object_like({
+            "SsmParameterConfigurations": [{"ParameterName": assertions.Match.any_value(), "DataType": "aws:ec2:image"}]
+        })]
+    })
+
+
+def test_build_inputs_outside_the_application_script_rename_the_component(stacks, monkeypatch):
+    original = stacks.image_builder()
+    monkeypatch.setattr(image_builder_stack, "AGENT_PACKAGES", ("amazon-cloudwatch-agent",))
+    changed = stacks.image_builder(construct_id="Changed")
+
+    component, recipe = _names(assertions.Template.from_stack(original))
+    changed_component, changed_recipe = _names(assertions.Template.from_stack(changed))
+    assert changed_component != component
+    assert changed_recipe != recipe
+
+
+def test_parent_image_and_version_rename_only_the_recipe(stacks, monkeypatch):
+    original = stacks.image_builder()
+    bumped = stacks.image_builder(construct_id="Bumped", image=ImageBuilderProps(version="1.0.1"))
+    monkeypatch.setattr(image_builder_stack, "PARENT_IMAGE_NAME", "amazon-linux-2023-arm64/x.x.x")
+    rebased = stacks.image_builder(construct_id="Rebased")
+
+    names = [_names(assertions.Template.from_stack(stack)) for stack in (original, bumped, rebased)]
+    assert len({component for component, _ in names}) == 1
+    assert len({recipe for _, recipe in names}) == 3
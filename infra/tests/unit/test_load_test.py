@@ -0,0 +1,99 @@
+import http.client
+import json
+
+import pytest
+
+from scripts import load_test
+from scripts.load_test import (
+    LoadProfile, LoadResults, LoadStage, Tolerance, improves, main, percentile, regressions, run_profile, stub_server
+)
+
+
+PROFILE = LoadProfile(stages=(LoadStage(duration_seconds=0.5, concurrency=4),), timeout_seconds=2)
+BASELINE = LoadResults(requests=100, errors=0, error_rate_percent=0.0, rps=20, p50_ms=30, p95_ms=40, p99_ms=50)
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 99) == 0.0
+
+
+def test_gate_passes_against_matching_stub():
+    with stub_server(latency_ms=20) as url:
+        results = run_profile(url, PROFILE)
+
+    assert results.requests > 0
+    assert results.errors == 0
+    assert results.p50_ms >= 20
+    assert regressions(results, BASELINE, Tolerance(latency_percent=200)) == []
+
+
+def test_gate_fails_on_latency_regression():
+    with stub_server(latency_ms=120) as url:
+        results = run_profile(url, PROFILE)
+
+    failures = regressions(results, BASELINE, Tolerance())
+    assert any(failure.startswith("p50_ms") for failure in failures)
+
+
+def test_gate_fails_on_errors():
+    with stub_server(status=503) as url:
+        results = run_profile(url, PROFILE)
+
+    assert results.error_rate_percent == 100.0
+    assert any(failure.startswith("error_rate_percent") for failure in regressions(results, BASELINE, Tolerance()))
+
+
+def test_malformed_responses_count_as_errors(monkeypatch):
+    def truncated(url, timeout):
+        raise http.client.IncompleteRead(b"partial")
+    monkeypatch.setattr(load_test.urllib.request, "urlopen", truncated)
+
+    results = run_profile("http://127.0.0.1:9", PROFILE)
+
+    assert results.requests > 0
+    assert results.error_rate_percent == 100.0
+
+
+def test_client_failures_are_raised(monkeypatch):
+    def broken(url, timeout):
+        raise RuntimeError("client bug")
+    monkeypatch.setattr(load_test, "_request", broken)
+
+    with pytest.raises(RuntimeError, match="client bug"):
+        run_profile("http://127.0.0.1:9", PROFILE)
+
+
+def test_improves_needs_every_metric_at_least_as_good():
+    faster = LoadResults(requests=100, errors=0, error_rate_percent=0.0, rps=25, p50_ms=20, p95_ms=30, p99_ms=40)
+
+    assert improves(faster, BASELINE)
+    assert improves(BASELINE, BASELINE)
+    # Within tolerance, but slower: passes the gate without becoming the baseline
+    assert not improves(LoadResults(**{**vars(faster), "p99_ms": 55}), BASELINE)
+
+
+def test_only_improving_runs_replace_the_pinned_baseline(tmp_path):
+    config = tmp_path / "load_test.json"
+    config.write_text(json.dumps({
+        "profile": {"stages": [{"duration_seconds": 0.5, "concurrency": 4}], "timeout_seconds": 2},
+        "baseline": {**vars(BASELINE), "p50_ms": 100, "p95_ms": 150, "p99_ms": 200, "rps": 1},
+        "tolerance": {"latency_percent": 50}
+    }))
+    baseline = tmp_path / "baseline.json"
+
+    def run(latency_ms):
+        with stub_server(latency_ms=latency_ms) as url:
+            return main([
+                "run", url, "--config", str(config), "--baseline", str(baseline), "--promote", str(baseline)
+            ])
+
+    # Beats the pinned baseline: promoted
+    assert run(latency_ms=20) == 0
+    promoted = LoadResults(**json.loads(baseline.read_text()))
+    # Slower than the promoted run, though within the pinned baseline: gated on the promoted one
+    assert run(latency_ms=120) == 1
+    assert LoadResults(**json.loads(baseline.read_text())) == promoted
@@ -0,0 +1,93 @@
+import json
+
+import aws_cdk.assertions as assertions
+import pytest
+
+from stacks.vpc_stack import EgressProps
+from stacks.observability_stack import AlarmThresholds
+from stacks.rds_stack import InstrumentationProps
+
+
+def _dashboard_body(template):
+    dashboard, = template.find_resources("AWS::CloudWatch::Dashboard").values()
+    return json.dumps(dashboard["Properties"]["DashboardBody"])
+
+
+def test_composite_alarms_notify_the_alarm_topic(stacks):
+    template = assertions.Template.from_stack(stacks.observability())
+
+    template.resource_count_is("AWS::CloudWatch::Dashboard", 1)
+    template.resource_count_is("AWS::CloudWatch::CompositeAlarm", 2)
+    template.has_resource_properties("AWS::CloudWatch::CompositeAlarm", {
+        "AlarmDescription": "Latency or error rate regressed",
+        "AlarmActions": [{"Ref": assertions.Match.string_like_regexp("AlarmTopic")}]
+    })
+
+
+def test_thresholds_are_configurable(stacks):
+    template = assertions.Template.from_stack(stacks.observability(
+        thresholds=AlarmThresholds(latency_p99_seconds=2.5),
+        db_max_connections=1000
+    ))
+
+    template.has_resource_properties("AWS::CloudWatch::Alarm", {
+        "AlarmDescription": "Target response time p99 above threshold",
+        "Threshold": 2.5
+    })
+    template.has_resource_properties("AWS::CloudWatch::Alarm", {
+        "AlarmDescription": "Aurora connections close to max_connections",
+        "Threshold": 800
+    })
+
+
+def test_nat_port_allocation_alarm_per_gateway(stacks):
+    stacks.vpc(egress=EgressProps(nat_per_az=True))
+    template = assertions.Template.from_stack(stacks.observability())
+
+    alarms = template.find_resources("AWS::CloudWatch::Alarm", {
+        "Properties": {"AlarmDescription": "NAT gateway port allocation errors"}
+    })
+    assert len(alarms) == 2
+
+
+
+@pytest.mark.parametrize("detailed_monitoring, period, evaluation_periods, datapoints", [
+    # Basic monitoring: the 5 minute window as one five-minute datapoint
+    (False, 300, 1, 1),
+    (True, 60, 5, 3),
+])
+def test_compute_cpu_alarm_follows_the_ec2_monitoring_period(
+        stacks, detailed_monitoring, period, evaluation_periods, datapoints):
+    template = assertions.Template.from_stack(stacks.observability(
+        asg=stacks.asg().asg, asg_detailed_monitoring=detailed_monitoring
+    ))
+
+    template.has_resource_properties("AWS::CloudWatch::Alarm", {
+        "AlarmDescription": "App server CPU above threshold",
+        "Metrics": [assertions.Match.object_like({
+            "MetricStat": assertions.Match.object_like({"Period": period})
+        })],
+        "EvaluationPeriods": evaluation_periods,
+        "DatapointsToAlarm": datapoints
+    })
+
+
+def test_db_load_is_graphed_only_with_performance_insights(stacks):
+    assert "DBLoad" not in _dashboard_body(assertions.Template.from_stack(stacks.observability()))
+
+
+def test_db_load_is_graphed_from_performance_insights(stacks):
+    rds_stack = stacks.rds(instrumentation=InstrumentationProps())
+    template = assertions.Template.from_stack(stacks.observability(
+        performance_insights=rds_stack.performance_insights
+    ))
+
+    # Searched per cluster role, so auto-scaled readers are graphed too
+    body = _dashboard_body(template)
+    assert "SEARCH('{AWS/RDS,DBClusterIdentifier,Role} MetricName=" in body
+    assert "DBLoad" in body
+
+
+def test_latency_thresholds_must_be_ordered():
+    with pytest.raises(ValueError, match="p90 <= p99"):
+        AlarmThresholds(latency_p90_seconds=2, latency_p99_seconds=1).validate()
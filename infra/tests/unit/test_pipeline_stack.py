@@ -0,0 +1,142 @@
+import json
+
+import aws_cdk as core
+import aws_cdk.aws_sns as sns
+import aws_cdk.assertions as assertions
+import pytest
+
+from stacks.pipeline_stack import CDK_CLI_VERSION, BuildProps, LoadTestProps, PipelineStack, deployment_waves
+
+
+def test_independent_stacks_share_a_wave():
+    app = core.App()
+    network = core.Stack(app, "Network")
+    database = core.Stack(app, "Database")
+    cache = core.Stack(app, "Cache")
+    compute = core.Stack(app, "Compute")
+    database.add_dependency(network)
+    cache.add_dependency(network)
+    compute.add_dependency(database)
+
+    waves = deployment_waves([network, database, cache, compute])
+
+    assert [[stack.stack_name for stack in wave] for wave in waves] == [
+        ["Network"], ["Database", "Cache"], ["Compute"]
+    ]
+
+
+def _pipeline_app(declare_dependency):
+    app = core.App()
+    producer = core.Stack(app, "Producer")
+    topic = sns.Topic(producer, "Topic")
+    consumer = core.Stack(app, "Consumer")
+    # A cross-stack reference makes Consumer depend on Producer only at synth
+    core.CfnOutput(consumer, "TopicArn", value=topic.topic_arn)
+    if declare_dependency:
+        consumer.add_dependency(producer)
+    pipeline = PipelineStack(app, "PipelineStack", deploy_stacks=[producer, consumer])
+    return app, pipeline
+
+
+def test_stacks_deploy_in_parallel_actions_per_wave():
+    _, pipeline = _pipeline_app(declare_dependency=True)
+    template = assertions.Template.from_stack(pipeline)
+
+    template.has_resource_properties("AWS::CodePipeline::Pipeline", {
+        "Stages": assertions.Match.array_with([
+            assertions.Match.object_like({
+                "Name": "Self_Update",
+                "Actions": [assertions.Match.object_like({"Name": "PipelineStack"})]
+            }),
+            assertions.Match.object_like({
+                "Name": "Deploy_Wave_1",
+                "Actions": [assertions.Match.object_like({"Name": "Producer"})]
+            }),
+            assertions.Match.object_like({
+                "Name": "Deploy_Wave_2",
+                "Actions": [assertions.Match.object_like({"Name": "Consumer"})]
+            }),
+        ])
+    })
+
+
+def test_undeclared_reference_between_waves_fails_synth():
+    app, _ = _pipeline_app(declare_dependency=False)
+
+    with pytest.raises(Exception, match="not in a later deploy wave"):
+        app.synth()
+
+
+def test_build_projects_cache_dependencies_and_pin_the_cli():
+    app = core.App()
+    pipeline = PipelineStack(app, "PipelineStack", build=BuildProps(arm=True))
+    template = assertions.Template.from_stack(pipeline)
+
+    template.has_resource_properties("AWS::CodeBuild::Project", {
+        "Cache": {"Type": "S3", "Location": assertions.Match.any_value()},
+        "Environment": assertions.Match.object_like({
+            "Type": "ARM_CONTAINER",
+            "ComputeType": "BUILD_GENERAL1_MEDIUM",
+            "EnvironmentVariables": assertions.Match.array_with([
+                {"Name": "CDK_CLI_VERSION", "Type": "PLAINTEXT", "Value": CDK_CLI_VERSION}
+            ])
+        })
+    })
+
+
+def test_build_cache_mode_is_validated():
+    with pytest.raises(ValueError, match="cache"):
+        BuildProps(cache="efs").validate()
+
+
+def test_deploy_stages_are_skipped_without_infra_changes():
+    _, pipeline = _pipeline_app(declare_dependency=True)
+    template = assertions.Template.from_stack(pipeline)
+
+    template.has_resource_properties("AWS::CodePipeline::Pipeline", {
+        "PipelineType": "V2",
+        "Stages": assertions.Match.array_with([
+            assertions.Match.object_like({
+                "Name": "Deploy_Wave_1",
+                "BeforeEntry": {"Conditions": [assertions.Match.object_like({
+                    "Result": "SKIP",
+                    "Rules": [assertions.Match.object_like({
+                        "Configuration": {"Variable": "#{Synth.INFRA_CHANGED}", "Value": "true", "Operator": "EQ"}
+                    })]
+                })]}
+            }),
+            assertions.Match.object_like({"Name": "Record_Deployment"}),
+        ])
+    })
+
+
+def test_load_test_promotes_only_improving_runs_per_config():
+    app = core.App()
+    pipeline = PipelineStack(app, "PipelineStack", load_test=LoadTestProps(stack_name="ALBStack"))
+    template = assertions.Template.from_stack(pipeline)
+
+    project, = [
+        resource for logical_id, resource in template.find_resources("AWS::CodeBuild::Project").items()
+        if logical_id.startswith("LoadTestProject")
+    ]
+    commands = json.loads(project["Properties"]["Source"]["BuildSpec"])["phases"]["build"]["commands"]
+    assert any("load-test/baseline-$(sha256sum \"$LOAD_TEST_CONFIG\"" in command for command in commands)
+    assert any("--baseline load-test-baseline.json" in command for command in commands)
+    assert any("--promote load-test-promoted.json" in command for command in commands)
+    # Only a run that passed the gate and improved on the baseline replaces it
+    assert commands[-2] == "[ -z \"$LOAD_TEST_FAILED\" ]"
+    assert commands[-1] == "[ ! -f load-test-promoted.json ] || aws s3 cp load-test-promoted.json \"$BASELINE\""
+
+
+def test_synth_uses_the_app_context():
+    app = core.App()
+    pipeline = PipelineStack(app, "PipelineStack", synth_context={"profile": "prod", "compute_backend": "ecs"})
+    template = assertions.Template.from_stack(pipeline)
+
+    project, = [
+        resource for logical_id, resource in template.find_resources("AWS::CodeBuild::Project").items()
+        if logical_id.startswith("BuildProject")
+    ]
+    commands = json.loads(project["Properties"]["Source"]["BuildSpec"])["phases"]["build"]["commands"]
+    assert any("cdk synth -c compute_backend=ecs -c profile=prod &&" in command for command in commands)
+    assert "ENV" not in [variable["Name"] for variable in project["Properties"]["Environment"]["EnvironmentVariables"]]
@@ -0,0 +1,30 @@
+import aws_cdk.aws_ec2 as ec2
+import pytest
+
+from stacks.rds_parameter_profiles import INSTANCE_SPECS, PROFILES, resolve_parameter_profile
+
+
+@pytest.mark.parametrize("profile_name", sorted(PROFILES))
+def test_profiles_fit_every_supported_instance_type(profile_name):
+    for instance_type in INSTANCE_SPECS:
+        resolve_parameter_profile(profile_name, ec2.InstanceType(instance_type))
+
+
+def test_profile_scales_with_instance_memory():
+    small = resolve_parameter_profile("oltp-large", ec2.InstanceType("r6g.large"))
+    large = resolve_parameter_profile("oltp-large", ec2.InstanceType("r6g.4xlarge"))
+
+    assert int(large.instance_parameters["innodb_buffer_pool_size"]) > \
+        7 * int(small.instance_parameters["innodb_buffer_pool_size"])
+    assert large.max_connections > small.max_connections
+    assert small.cluster_parameters["slow_query_log"] == "1"
+
+
+def test_override_that_exceeds_instance_memory_is_rejected():
+    with pytest.raises(ValueError, match="does not fit t4g.medium"):
+        resolve_parameter_profile("oltp-small", ec2.InstanceType("t4g.medium"), {"max_connections": 2000})
+
+
+def test_unknown_instance_type_is_rejected():
+    with pytest.raises(ValueError):
+        resolve_parameter_profile("oltp-small", ec2.InstanceType("m5.large"))
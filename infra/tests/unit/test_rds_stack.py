@@ -0,0 +1,145 @@
+import re
+
+import aws_cdk.assertions as assertions
+import pytest
+
+from stacks.rds_stack import (
+    SLOW_QUERY_HEADER_REGEX,
+    CapacityMode,
+    CapacityProps,
+    InstrumentationProps,
+    ProxyProps,
+    ReaderFleetProps,
+)
+
+# One Aurora MySQL slow query log entry, delivered as a single CloudWatch Logs event
+SLOW_QUERY_EVENT = (
+    "# Time: 2024-05-14T09:21:07.123456Z\n"
+    "# User@Host: admin[admin] @  [10.10.2.15]  Id:    42\n"
+    "# Query_time: 2.345678  Lock_time: 0.000123 Rows_sent: 1  Rows_examined: 1000\n"
+    "SET timestamp=1715678467;\n"
+    "SELECT COUNT(*) FROM orders WHERE status = 'open';"
+)
+
+
+def test_reader_fleet_scales_on_cpu_and_connections(stacks):
+    template = assertions.Template.from_stack(
+        stacks.rds(readers=ReaderFleetProps(instances=2, max_capacity=4, target_connections=300))
+    )
+
+    template.resource_count_is("AWS::RDS::DBInstance", 3)
+    template.has_resource_properties("AWS::ApplicationAutoScaling::ScalableTarget", {
+        "ScalableDimension": "rds:cluster:ReadReplicaCount",
+        "MinCapacity": 1,
+        "MaxCapacity": 4
+    })
+    template.has_resource_properties("AWS::ApplicationAutoScaling::ScalingPolicy", {
+        "TargetTrackingScalingPolicyConfiguration": assertions.Match.object_like({
+            "PredefinedMetricSpecification": {"PredefinedMetricType": "RDSReaderAverageDatabaseConnections"},
+            "TargetValue": 300
+        })
+    })
+    template.has_output("ClusterReadEndpoint", {"Export": {"Name": "AuroraClusterReadEndpoint"}})
+
+
+def test_reader_fleet_rejects_inverted_bounds():
+    with pytest.raises(ValueError):
+        ReaderFleetProps(min_capacity=3, max_capacity=2).validate()
+
+
+def test_proxy_pools_connections_to_cluster(stacks):
+    template = assertions.Template.from_stack(stacks.rds(
+        with_app_security_group=True,
+        proxy=ProxyProps(max_connections_percent=80, borrow_timeout_seconds=30)
+    ))
+
+    template.has_resource_properties("AWS::RDS::DBProxyTargetGroup", {
+        "ConnectionPoolConfigurationInfo": {
+            "ConnectionBorrowTimeout": 30,
+            "MaxConnectionsPercent": 80,
+            "MaxIdleConnectionsPercent": 50
+        }
+    })
+    template.has_output("ProxyEndpoint", {"Export": {"Name": "AuroraProxyEndpoint"}})
+
+
+def test_proxy_requires_app_security_group(stacks):
+    with pytest.raises(ValueError):
+        stacks.rds(proxy=ProxyProps())
+
+
+def test_serverless_readers_behind_provisioned_writer(stacks):
+    template = assertions.Template.from_stack(stacks.rds(
+        readers=ReaderFleetProps(instances=1),
+        capacity=CapacityProps(readers=CapacityMode.SERVERLESS, min_acu=1, max_acu=16)
+    ))
+
+    template.has_resource_properties("AWS::RDS::DBCluster", {
+        "ServerlessV2ScalingConfiguration": {"MinCapacity": 1, "MaxCapacity": 16}
+    })
+    template.has_resource_properties("AWS::RDS::DBInstance", {"DBInstanceClass": "db.t4g.medium"})
+    template.has_resource_properties("AWS::RDS::DBInstance", {"DBInstanceClass": "db.serverless"})
+    template.has_output("ServerlessMaxCapacity", {"Value": "16"})
+
+
+def test_serverless_capacity_rejects_partial_acu():
+    with pytest.raises(ValueError):
+        CapacityProps(writer=CapacityMode.SERVERLESS, max_acu=2.3).validate()
+
+
+def test_instrumentation_exports_slow_query_metrics(stacks):
+    template = assertions.Template.from_stack(stacks.rds(instrumentation=InstrumentationProps(
+        monitoring_interval_seconds=5,
+        slow_query_threshold_seconds=2
+    )))
+
+    template.has_resource_properties("AWS::RDS::DBCluster", {
+        "PerformanceInsightsEnabled": True,
+        "EnableCloudwatchLogsExports": ["slowquery", "error"]
+    })
+    template.has_resource_properties("AWS::RDS::DBInstance", {"MonitoringInterval": 5})
+    template.has_resource_properties("AWS::RDS::DBClusterParameterGroup", {
+        "Parameters": assertions.Match.object_like({"slow_query_log": "1", "log_output": "FILE"})
+    })
+    template.has_resource_properties("AWS::Logs::MetricFilter", {
+        "FilterPattern": '"Query_time:"',
+        "MetricTransformations": [assertions.Match.object_like({"MetricName": "SlowQueryCount"})]
+    })
+    template.resource_count_is("AWS::Logs::QueryDefinition", 1)
+
+
+def test_slow_query_threshold_follows_the_parameter_profile(stacks):
+    template = assertions.Template.from_stack(stacks.rds(
+        parameter_profile="oltp-large", instrumentation=InstrumentationProps()
+    ))
+
+    template.has_resource_properties("AWS::RDS::DBClusterParameterGroup", {
+        "Parameters": assertions.Match.object_like({"long_query_time": "0.5"})
+    })
+
+
+def test_slow_query_threshold_conflicting_with_the_profile_is_rejected(stacks):
+    with pytest.raises(ValueError, match="conflicts with the parameter profile's long_query_time=0.5"):
+        stacks.rds(
+            parameter_profile="oltp-large",
+            instrumentation=InstrumentationProps(slow_query_threshold_seconds=2)
+        )
+
+
+def test_slow_query_patterns_match_a_logged_entry(stacks):
+    rds_stack = stacks.rds(instrumentation=InstrumentationProps())
+    template = assertions.Template.from_stack(rds_stack)
+
+    # Quoted terms match anywhere in the event, across its lines
+    metric_filter, = template.find_resources("AWS::Logs::MetricFilter").values()
+    terms = re.findall(r'"([^"]+)"', metric_filter["Properties"]["FilterPattern"])
+    assert terms and all(term in SLOW_QUERY_EVENT for term in terms)
+    assert not all(term in "# Time: 2024-05-14T09:21:07.123456Z" for term in terms)
+
+    # Logs Insights named groups (?<name>) are (?P<name>) in Python
+    header = re.search(SLOW_QUERY_HEADER_REGEX.replace("(?<", "(?P<"), SLOW_QUERY_EVENT)
+    assert header.groupdict() == {
+        "query_time": "2.345678", "lock_time": "0.000123", "rows_sent": "1", "rows_examined": "1000"
+    }
+    query_definition, = template.find_resources("AWS::Logs::QueryDefinition").values()
+    assert SLOW_QUERY_HEADER_REGEX in query_definition["Properties"]["QueryString"]
@@ -0,0 +1,50 @@
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import pytest
+
+from stacks.subnet_planner import SubnetPlanProps, TierDemand, plan_subnets, subnet_prefix
+from stacks.vpc_stack import ISOLATED_SUBNETS, PRIVATE_SUBNETS, PUBLIC_SUBNETS, VPCStack
+
+
+def _tiers(private_spread):
+    return [
+        (PUBLIC_SUBNETS, TierDemand(per_az=9)),
+        (PRIVATE_SUBNETS, TierDemand(spread=private_spread, per_az=8)),
+        (ISOLATED_SUBNETS, TierDemand(spread=2)),
+    ]
+
+
+def test_subnet_prefix_leaves_room_for_reserved_addresses():
+    assert subnet_prefix(11) == 28
+    assert subnet_prefix(12) == 27
+    assert subnet_prefix(12, max_prefix=24) == 24
+
+
+def test_small_demand_keeps_the_existing_24s():
+    plan = plan_subnets(SubnetPlanProps(), _tiers(private_spread=4))
+
+    assert set(plan.cidr_masks.values()) == {24}
+    assert plan.cidrs[PUBLIC_SUBNETS] == ["10.10.0.0/24", "10.10.1.0/24"]
+    assert plan.cidrs[ISOLATED_SUBNETS] == ["10.10.4.0/24", "10.10.5.0/24"]
+
+
+def test_dense_tasks_get_larger_private_subnets_where_the_vpc_allocates_them():
+    # 600 tasks over 3 AZs, sized for one AZ lost, doubled for growth
+    plan = plan_subnets(SubnetPlanProps(az_count=3), _tiers(private_spread=600))
+    assert plan.cidr_masks[PRIVATE_SUBNETS] == 22
+    assert plan.usable_addresses(PRIVATE_SUBNETS) >= 2 * (300 + 8)
+
+    app = core.App()
+    stack = VPCStack(app, "VPCStack", max_azs=3, subnet_plan=plan,
+                     env=core.Environment(account="123456789012", region="us-east-1"))
+    template = assertions.Template.from_stack(stack)
+    allocated = {
+        resource["Properties"]["CidrBlock"]
+        for resource in template.find_resources("AWS::EC2::Subnet").values()
+    }
+    assert allocated == {cidr for cidrs in plan.cidrs.values() for cidr in cidrs}
+
+
+def test_plan_that_runs_out_of_addresses_fails():
+    with pytest.raises(ValueError, match="does not fit 10.10.0.0/20"):
+        plan_subnets(SubnetPlanProps(vpc_cidr="10.10.0.0/20", az_count=3), _tiers(private_spread=600))
@@ -0,0 +1,55 @@
+import gzip
+
+import aws_cdk as core
+import pytest
+
+from stacks.userdata_builder import (
+    MAX_USER_DATA_BYTES,
+    SetupStage,
+    build_user_data,
+    stage_waves,
+)
+
+
+def test_independent_stages_share_a_wave():
+    stages = [
+        SetupStage("application", "echo app"),
+        SetupStage("cloudwatch-agent", "echo agent"),
+        SetupStage("ready-signal", "echo ready", depends_on=("application", "cloudwatch-agent")),
+    ]
+
+    assert stage_waves(stages) == [["application", "cloudwatch-agent"], ["ready-signal"]]
+
+
+def test_dependency_cycles_are_rejected():
+    stages = [
+        SetupStage("a", "true", depends_on=("b",)),
+        SetupStage("b", "true", depends_on=("a",)),
+    ]
+
+    with pytest.raises(ValueError, match="cycle"):
+        stage_waves(stages)
+
+
+def test_scripts_are_embedded_unchanged():
+    script = "#!/bin/bash\ncat > /etc/app.conf <<'EOF'\n# keep me\nport = 8443\nEOF\nyum install -y \\\n    httpd\n"
+
+    document = gzip.decompress(build_user_data([SetupStage("application", script)])).decode()
+
+    assert "multipart/mixed" in document
+    assert '"content": "#!/bin/bash\\ncat > /etc/app.conf <<\'EOF\'\\n# keep me\\nport = 8443\\nEOF\\nyum install -y \\\\\\n    httpd\\n"' in document
+
+
+def test_oversized_user_data_is_rejected():
+    script = "".join(f"echo {i * 7919 % 104729:x}{i}\n" for i in range(20000))
+
+    with pytest.raises(ValueError, match=str(MAX_USER_DATA_BYTES)):
+        build_user_data([SetupStage("application", script)])
+
+
+def test_tokens_are_rejected():
+    app = core.App()
+    stack = core.Stack(app, "Stack")
+
+    with pytest.raises(ValueError, match="unresolved tokens"):
+        build_user_data([SetupStage("application", f"echo {stack.region}")])
@@ -0,0 +1,35 @@
+import aws_cdk.assertions as assertions
+
+from stacks.vpc_stack import EgressProps, GATEWAY_ENDPOINTS, INTERFACE_ENDPOINTS
+
+
+def test_endpoints_are_created_and_exported(stacks):
+    template = assertions.Template.from_stack(stacks.vpc(egress=EgressProps(interface_endpoints=True)))
+
+    template.resource_count_is("AWS::EC2::VPCEndpoint", len(GATEWAY_ENDPOINTS) + len(INTERFACE_ENDPOINTS))
+    template.has_resource_properties("AWS::EC2::VPCEndpoint", {
+        "VpcEndpointType": "Interface",
+        "PrivateDnsEnabled": True
+    })
+    template.has_output("S3EndpointId", {"Export": {"Name": "S3EndpointId"}})
+    template.has_output("ECRDockerEndpointId", {"Export": {"Name": "ECRDockerEndpointId"}})
+
+
+def test_single_nat_gateway_by_default(stacks):
+    assertions.Template.from_stack(stacks.vpc()).resource_count_is("AWS::EC2::NatGateway", 1)
+
+
+def test_nat_per_az_places_a_gateway_in_each_az(stacks):
+    template = assertions.Template.from_stack(
+        stacks.vpc(egress=EgressProps(nat_per_az=True))
+    )
+
+    template.resource_count_is("AWS::EC2::NatGateway", 2)
+    template.resource_count_is("AWS::EC2::VPCEndpoint", len(GATEWAY_ENDPOINTS))
+
+
+def test_only_gateway_endpoints_by_default(stacks):
+    template = assertions.Template.from_stack(stacks.vpc())
+
+    template.resource_count_is("AWS::EC2::VPCEndpoint", len(GATEWAY_ENDPOINTS))
+    template.has_output("S3EndpointId", {"Export": {"Name": "S3EndpointId"}})